@@ -0,0 +1,228 @@
+"""Times and memory-profiles the stages of the pipeline on synthetic tweets,
+and compares the measures with the saved baselines.
+
+Each stage runs in a fresh process, whose peak resident memory is measured
+above the memory of the process before the stage. The tweets are stored
+page by page like get_store does, and the later stages run chunk by chunk
+so that the largest sizes fit in memory.
+
+Usage:
+    python benchmarks/run_benchmarks.py
+    python benchmarks/run_benchmarks.py --sizes 10000 100000 1000000 10000000
+    python benchmarks/run_benchmarks.py --save
+
+The command exits with status 1 when a stage is slower, or uses more
+memory, than threshold times its baseline.
+"""
+
+# imports
+import argparse
+import json
+import multiprocessing
+import os
+import resource
+import sys
+import tempfile
+import time
+
+BASELINES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baselines.json")
+
+STAGES = ["normalize", "clean_tweets", "analytics", "plot_tweets"]
+
+# tweets of the synthetic search responses normalized at a time
+_BATCH_SIZE = 10000
+
+# rows cleaned and analysed at a time
+_CHUNKSIZE = 100000
+
+# differences under these are noise, whatever the threshold
+_MIN_SECONDS = 0.5
+_MIN_MEMORY_MB = 20
+
+
+def _peak_memory_mb():
+    # ru_maxrss is in kilobytes on linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def _normalize(folder, n_tweets, seed):
+    from tweetlytics.normalize import RESPONSE_COLUMNS, normalize_tweets
+    from tweetlytics.storage import TableAppender
+    from tweetlytics.synthetic import TweetGenerator
+
+    generator = TweetGenerator(seed=seed)
+    seconds = 0.0
+    with TableAppender(os.path.join(folder, "tweets_response.csv")) as table:
+        data, users = [], []
+        for page in generator.pages(n_tweets):
+            data += page["data"]
+            users += page["includes"]["users"]
+            if len(data) < _BATCH_SIZE and page["meta"].get("next_token"):
+                continue
+            # the generation of the tweets is not timed
+            start = time.perf_counter()
+            table.append(normalize_tweets(data, "vancouver", users).reindex(columns=RESPONSE_COLUMNS))
+            seconds += time.perf_counter() - start
+            data, users = [], []
+    return seconds
+
+
+def _clean_tweets(folder, n_tweets, seed):
+    from tweetlytics.tweetlytics import clean_tweets
+
+    start = time.perf_counter()
+    clean_tweets(os.path.join(folder, "tweets_response.csv"), chunksize=_CHUNKSIZE)
+    return time.perf_counter() - start
+
+
+def _analytics(folder, n_tweets, seed, sentiment_backend="lexicon"):
+    from tweetlytics.tweetlytics import analytics
+
+    start = time.perf_counter()
+    analytics(
+        os.path.join(folder, "clean_tweets.csv"),
+        store_json=False,
+        store_csvs=True,
+        chunksize=_CHUNKSIZE,
+        sentiment_backend=sentiment_backend,
+        approximate=True,
+    )
+    return time.perf_counter() - start
+
+
+def _plot_tweets(folder, n_tweets, seed):
+    from tweetlytics.tweetlytics import plot_tweets
+
+    start = time.perf_counter()
+    plot_tweets(
+        os.path.join(folder, "analysis_all_tweets.csv"),
+        analysis_tokens_sentiments_file=os.path.join(folder, "analysis_tokens_sentiments.csv"),
+        save_plots=False,
+        approximate=True,
+    )
+    return time.perf_counter() - start
+
+
+_STAGE_FUNCTIONS = {
+    "normalize": _normalize,
+    "clean_tweets": _clean_tweets,
+    "analytics": _analytics,
+    "plot_tweets": _plot_tweets,
+}
+
+
+def _measure(stage, folder, n_tweets, seed, options):
+    """Runs a stage in the current process, returning its seconds and the
+    growth of the peak memory in megabytes."""
+    # import the dependencies first, so they are not measured
+    import tweetlytics.tweetlytics  # noqa: F401
+
+    memory = _peak_memory_mb()
+    seconds = _STAGE_FUNCTIONS[stage](folder, n_tweets, seed, **options)
+    return {
+        "seconds": round(seconds, 3),
+        "memory_mb": round(max(_peak_memory_mb() - memory, 0.0), 1),
+    }
+
+
+def run_benchmarks(sizes, seed=0, sentiment_backend="lexicon", log=print):
+    """
+    Runs every stage of the pipeline on synthetic tweets of each size.
+
+    Parameters:
+    -----------
+    sizes : list of int
+        The numbers of tweets.
+    seed : int
+        Seed of the synthetic tweets. Default is 0
+    sentiment_backend : string
+        The sentiment backend of analytics. Default is 'lexicon'
+    log : callable
+        Called with a line for each measure. Default is print
+
+    Returns:
+    --------
+    results : dict
+        The seconds and memory_mb of each stage, by size and stage.
+    """
+    context = multiprocessing.get_context("spawn")
+    results = {}
+    for n_tweets in sizes:
+        results[str(n_tweets)] = {}
+        with tempfile.TemporaryDirectory() as folder:
+            for stage in STAGES:
+                options = {"sentiment_backend": sentiment_backend} if stage == "analytics" else {}
+                # a fresh process per stage, so its peak memory is its own
+                with context.Pool(1) as pool:
+                    measure = pool.apply(_measure, (stage, folder, n_tweets, seed, options))
+                results[str(n_tweets)][stage] = measure
+                log(f"{n_tweets:>10} {stage:<14} {measure['seconds']:>9.2f} s {measure['memory_mb']:>9.1f} MB")
+    return results
+
+
+def compare(results, baselines, threshold=1.25):
+    """
+    Lists the measures over threshold times their baseline.
+
+    Parameters:
+    -----------
+    results : dict
+        The measures returned by run_benchmarks.
+    baselines : dict
+        The saved measures, by size and stage.
+    threshold : float
+        The largest ratio of a measure to its baseline. Default is 1.25
+
+    Returns:
+    --------
+    regressions : list of string
+        A description of each regression.
+    """
+    regressions = []
+    for size, stages in results.items():
+        for stage, measure in stages.items():
+            baseline = baselines.get(size, {}).get(stage)
+            if baseline is None:
+                continue
+            for name, slack in [("seconds", _MIN_SECONDS), ("memory_mb", _MIN_MEMORY_MB)]:
+                if measure[name] > max(baseline[name] * threshold, baseline[name] + slack):
+                    regressions.append(
+                        f"{stage} on {size} tweets: {name} {measure[name]} "
+                        f"over the baseline {baseline[name]}"
+                    )
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000])
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--sentiment-backend", default="lexicon")
+    parser.add_argument("--threshold", type=float, default=1.25)
+    parser.add_argument("--baselines", default=BASELINES_PATH)
+    parser.add_argument(
+        "--save", action="store_true", help="save the measures as the new baselines"
+    )
+    args = parser.parse_args(argv)
+
+    results = run_benchmarks(args.sizes, args.seed, args.sentiment_backend)
+    baselines = {}
+    if os.path.exists(args.baselines):
+        with open(args.baselines) as file:
+            baselines = json.load(file)
+
+    if args.save:
+        baselines.update(results)
+        with open(args.baselines, "w") as file:
+            json.dump(baselines, file, indent=2, sort_keys=True)
+            file.write("\n")
+        return 0
+
+    regressions = compare(results, baselines, args.threshold)
+    for regression in regressions:
+        print("regression:", regression)
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,273 @@
+"""Cache of the outputs of the pipeline stages, addressed by the content of
+their inputs and their parameters."""
+
+# imports
+import hashlib
+import json
+import os
+import pickle
+import shutil
+
+try:
+    import fcntl
+except ImportError:
+    # windows
+    fcntl = None
+    import msvcrt
+
+import numpy as np
+import pandas as pd
+
+from tweetlytics.corpus import TokenCorpus
+
+_MANIFEST_FILE = "manifest.json"
+_LOCK_FILE = "manifest.lock"
+_RESULT_FILE = "result.pkl"
+
+# bytes read at a time when hashing files
+_READ_SIZE = 1 << 20
+
+
+class OutputCache:
+    """
+    Cache of the files written and the values returned by analytics and
+    plot_tweets, so a run on the same inputs with the same parameters
+    returns at once instead of analysing and rendering again.
+
+    Each run is identified by a fingerprint of the content of its input
+    files or tables and of its parameters. Its files and its pickled
+    result are copied into a folder of the cache, listed in a manifest.
+    When the cache grows over max_size bytes, the least recently used
+    runs are evicted.
+
+    Several processes can share a cache: the manifest is only read and
+    changed while holding a lock file, and a run evicted by another
+    process is a miss.
+
+    Parameters:
+    -----------
+    folder_path : string
+        The folder of the cache, created if missing.
+    max_size : int
+        The largest total size of the cached runs in bytes.
+        Default is 1000000000
+
+    Examples
+    --------
+    >>> cache = OutputCache("output/.cache")
+    >>> analytics("output/clean_tweets.csv", cache=cache)
+    >>> plot_tweets("output/analysis_all_tweets.csv", ..., cache=cache)
+    """
+
+    def __init__(self, folder_path, max_size=1000000000):
+        self.folder_path = folder_path
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(folder_path, exist_ok=True)
+        self._manifest_path = os.path.join(folder_path, _MANIFEST_FILE)
+        self._lock_path = os.path.join(folder_path, _LOCK_FILE)
+        with _FileLock(self._lock_path):
+            self.manifest = self._read_manifest()
+
+    def key(self, stage, inputs, params):
+        """
+        Returns the fingerprint of a run of a stage.
+
+        Parameters:
+        -----------
+        stage : string
+            The name of the stage.
+        inputs : list
+            The inputs of the run: paths of files or folders, dataframes,
+            Arrow tables, TokenCorpus or None.
+        params : dict
+            The parameters changing the outputs of the run, which must be
+            json serializable.
+
+        Returns:
+        --------
+        key : string or None
+            The hexadecimal fingerprint, or None when an input cannot be
+            fingerprinted, so the run is not cached.
+        """
+        digest = hashlib.blake2b(digest_size=16)
+        digest.update(json.dumps([stage, params], sort_keys=True, default=str).encode())
+        for data in inputs:
+            if not _update_digest(digest, data):
+                return None
+        return digest.hexdigest()
+
+    def load(self, key):
+        """
+        Restores the files of a cached run where they were written and
+        returns its result.
+
+        Parameters:
+        -----------
+        key : string
+            The fingerprint of the run.
+
+        Returns:
+        --------
+        result : object or None
+            The value returned by the run, or None when it is not cached.
+        """
+        with _FileLock(self._lock_path):
+            # other processes may have changed the cache
+            self.manifest = self._read_manifest()
+            entry = self.manifest.get(key)
+            entry_path = os.path.join(self.folder_path, key)
+            try:
+                if entry is None:
+                    raise FileNotFoundError(entry_path)
+                for name, file_path in entry["files"].items():
+                    os.makedirs(os.path.dirname(file_path) or ".", exist_ok=True)
+                    shutil.copyfile(os.path.join(entry_path, name), file_path)
+                with open(os.path.join(entry_path, _RESULT_FILE), "rb") as file:
+                    result = pickle.load(file)
+            except (FileNotFoundError, EOFError, pickle.UnpicklingError):
+                # a missing or partial run is dropped and run again
+                if entry is not None:
+                    self._remove(key)
+                    self._write_manifest()
+                self.misses += 1
+                return None
+            entry["used"] = self._clock()
+            self._write_manifest()
+        self.hits += 1
+        return result
+
+    def save(self, key, result, file_paths):
+        """
+        Caches the result and the files of a run.
+
+        Parameters:
+        -----------
+        key : string
+            The fingerprint of the run.
+        result : object
+            The picklable value returned by the run.
+        file_paths : list of string
+            The files written by the run, restored to the same paths.
+        """
+        with _FileLock(self._lock_path):
+            self.manifest = self._read_manifest()
+            entry_path = os.path.join(self.folder_path, key)
+            os.makedirs(entry_path, exist_ok=True)
+            files = {}
+            for file_path in file_paths:
+                name = os.path.basename(file_path)
+                shutil.copyfile(file_path, os.path.join(entry_path, name))
+                files[name] = os.path.abspath(file_path)
+            with open(os.path.join(entry_path, _RESULT_FILE), "wb") as file:
+                pickle.dump(result, file)
+            size = sum(
+                os.path.getsize(os.path.join(entry_path, name))
+                for name in [*files, _RESULT_FILE]
+            )
+            self.manifest[key] = {"files": files, "size": size, "used": self._clock()}
+            self._evict()
+            self._write_manifest()
+
+    def size(self):
+        """Returns the total size of the cached runs in bytes."""
+        return sum(entry["size"] for entry in self.manifest.values())
+
+    def clear(self):
+        """Removes every cached run."""
+        with _FileLock(self._lock_path):
+            self.manifest = self._read_manifest()
+            for key in list(self.manifest):
+                self._remove(key)
+            self._write_manifest()
+
+    def _evict(self):
+        """Removes the least recently used runs over max_size."""
+        total = self.size()
+        for key in sorted(self.manifest, key=lambda key: self.manifest[key]["used"]):
+            if total <= self.max_size:
+                break
+            total -= self.manifest[key]["size"]
+            self._remove(key)
+
+    def _remove(self, key):
+        del self.manifest[key]
+        shutil.rmtree(os.path.join(self.folder_path, key), ignore_errors=True)
+
+    def _clock(self):
+        return max((entry["used"] for entry in self.manifest.values()), default=0) + 1
+
+    def _read_manifest(self):
+        if not os.path.exists(self._manifest_path):
+            return {}
+        with open(self._manifest_path) as file:
+            return json.load(file)
+
+    def _write_manifest(self):
+        temp_path = self._manifest_path + ".tmp"
+        with open(temp_path, "w") as file:
+            json.dump(self.manifest, file)
+        os.replace(temp_path, self._manifest_path)
+
+
+class _FileLock:
+    """Holds an exclusive lock on a file, shared with other processes,
+    while the block runs."""
+
+    def __init__(self, file_path):
+        self.file_path = file_path
+        self._fd = None
+
+    def __enter__(self):
+        self._fd = os.open(self.file_path, os.O_RDWR | os.O_CREAT)
+        if fcntl is not None:
+            fcntl.flock(self._fd, fcntl.LOCK_EX)
+        else:
+            msvcrt.locking(self._fd, msvcrt.LK_LOCK, 1)
+        return self
+
+    def __exit__(self, *args):
+        if fcntl is not None:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+        else:
+            os.lseek(self._fd, 0, os.SEEK_SET)
+            msvcrt.locking(self._fd, msvcrt.LK_UNLCK, 1)
+        os.close(self._fd)
+        self._fd = None
+
+
+def _update_digest(digest, data):
+    """Adds the content of an input to a digest, returning False when the
+    input cannot be fingerprinted."""
+    if data is None:
+        digest.update(b"none")
+    elif isinstance(data, str):
+        if os.path.isdir(data):
+            for name in sorted(os.listdir(data)):
+                digest.update(name.encode())
+                _update_digest(digest, os.path.join(data, name))
+        else:
+            with open(data, "rb") as file:
+                for block in iter(lambda: file.read(_READ_SIZE), b""):
+                    digest.update(block)
+    elif isinstance(data, TokenCorpus):
+        digest.update("\n".join(data.vocabulary).encode())
+        digest.update(np.ascontiguousarray(data.token_ids).tobytes())
+        digest.update(np.ascontiguousarray(data.offsets).tobytes())
+    elif isinstance(data, pd.DataFrame):
+        schema = [list(map(str, data.columns)), list(map(str, data.dtypes))]
+        digest.update(json.dumps(schema).encode())
+        digest.update(pd.util.hash_pandas_object(data.index).to_numpy().tobytes())
+        for _, column in data.items():
+            try:
+                hashes = pd.util.hash_pandas_object(column, index=False)
+            except TypeError:
+                # lists and other unhashable values are hashed as text
+                hashes = pd.util.hash_pandas_object(column.astype(str), index=False)
+            digest.update(hashes.to_numpy().tobytes())
+    elif hasattr(data, "to_pandas"):
+        return _update_digest(digest, data.to_pandas())
+    else:
+        return False
+    return True
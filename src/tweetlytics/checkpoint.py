@@ -0,0 +1,186 @@
+"""Checkpoints recording how much of a keyword's search has been stored,
+so that ingestion can resume where it stopped."""
+
+# imports
+import json
+import os
+
+from tweetlytics.fetch import paginate_search
+
+
+def load_checkpoints(file_path):
+    """
+    Reads the checkpoints of every keyword from a .json file.
+
+    Parameters:
+    -----------
+    file_path : string
+        Path of the checkpoint file.
+
+    Returns:
+    --------
+    checkpoints : dict
+        The checkpoint of each keyword. Empty when the file does not exist.
+    """
+    if not os.path.exists(file_path):
+        return {}
+    with open(file_path) as file:
+        return json.load(file)
+
+
+def save_checkpoints(file_path, checkpoints):
+    """
+    Writes the checkpoints of every keyword to a .json file. The file is
+    replaced atomically so a crash never leaves a partial checkpoint.
+
+    Parameters:
+    -----------
+    file_path : string
+        Path of the checkpoint file.
+    checkpoints : dict
+        The checkpoint of each keyword.
+    """
+    temp_path = file_path + ".tmp"
+    with open(temp_path, "w") as file:
+        json.dump(checkpoints, file, indent=4, sort_keys=True)
+    os.replace(temp_path, file_path)
+
+
+def resume_search(
+    search_url, query_params, headers, checkpoint, max_tweets=None, save=None, **kwargs
+):
+    """
+    Yields the pages of a search that are missing from the store described
+    by ``checkpoint``, updating the checkpoint after every page.
+
+    A checkpoint holds the ``newest_id`` and ``oldest_id`` of the
+    contiguous range of tweets already stored and the ``start_time`` it
+    covers. When a search is interrupted (or stops at the tweet budget),
+    its ``query`` and last ``next_token`` are recorded as well. The
+    following searches are run in order:
+
+    - the interrupted search, continued from its ``next_token``
+    - tweets newer than ``newest_id`` (``since_id``)
+    - tweets older than ``oldest_id`` when ``start_time`` of the query is
+      earlier than the stored range (``until_id``)
+
+    An empty checkpoint runs the query as given.
+
+    Parameters:
+    -----------
+    search_url : string
+        The Twitter API search endpoint to query.
+    query_params : dict
+        The request parameters, including ``start_time`` and ``end_time``.
+    headers : dict
+        The request headers, including the authorization header.
+    checkpoint : dict
+        The checkpoint of the keyword. It is updated in place.
+    max_tweets : int or None
+        The total number of tweets to retrieve. Default is None.
+    save : callable or None
+        Called without arguments every time the checkpoint changes,
+        typically to write it to disk. Default is None.
+    **kwargs
+        Passed to ``paginate_search``.
+
+    Yields:
+    -------
+    page : dict
+        The json response of one search request.
+    """
+    fetched = 0
+    searched = set()
+    while max_tweets is None or fetched < max_tweets:
+        query = _next_query(checkpoint, query_params, searched)
+        if query is None:
+            return
+
+        if "next_token" not in checkpoint:
+            checkpoint.update(query=query, next_token=None, query_newest_id=None)
+        params = dict(query_params, **checkpoint["query"])
+        for key in ["start_time", "since_id", "until_id"]:
+            if key not in checkpoint["query"]:
+                params.pop(key, None)
+        if checkpoint["next_token"]:
+            params["next_token"] = checkpoint["next_token"]
+
+        budget = None if max_tweets is None else max_tweets - fetched
+        more_results = False
+        for page in paginate_search(search_url, params, headers, budget, **kwargs):
+            data = page.get("data", [])
+            fetched += len(data)
+            ids = [int(record["id"]) for record in data]
+            if ids:
+                # pages arrive from the newest to the oldest tweet
+                checkpoint["query_newest_id"] = str(
+                    max(ids + [int(checkpoint["query_newest_id"] or 0)])
+                )
+                checkpoint["query_oldest_id"] = str(min(ids))
+            checkpoint["next_token"] = page.get("meta", {}).get("next_token")
+            more_results = bool(checkpoint["next_token"]) or len(data) < page.get(
+                "meta", {}
+            ).get("result_count", len(data))
+            yield page
+            if save is not None:
+                save()
+
+        if more_results and max_tweets is not None and fetched >= max_tweets:
+            # stopped at the budget, continue below the oldest stored tweet next time
+            checkpoint["query"] = dict(
+                checkpoint["query"], until_id=checkpoint["query_oldest_id"]
+            )
+            checkpoint["next_token"] = None
+            if save is not None:
+                save()
+            return
+        _complete_query(checkpoint)
+        if save is not None:
+            save()
+
+
+def _next_query(checkpoint, query_params, searched):
+    """Returns the parameters of the next search to run for a checkpoint,
+    or None when the store covers the whole range of the query."""
+    if "next_token" in checkpoint:
+        return checkpoint["query"]
+    if "newest_id" not in checkpoint:
+        if "initial" in searched:
+            return None
+        searched.update(["initial", "newer"])
+        return {"start_time": query_params["start_time"], "end_time": query_params["end_time"]}
+    if "newer" not in searched:
+        searched.add("newer")
+        return {"since_id": checkpoint["newest_id"], "end_time": query_params["end_time"]}
+    if "older" not in searched and query_params["start_time"] < checkpoint["start_time"]:
+        searched.add("older")
+        return {
+            "start_time": query_params["start_time"],
+            "until_id": checkpoint["oldest_id"],
+            "end_time": query_params["end_time"],
+        }
+    return None
+
+
+def _complete_query(checkpoint):
+    """Merges the range of a finished search into the stored range."""
+    query = checkpoint.pop("query")
+    newest_id = checkpoint.pop("query_newest_id")
+    oldest_id = checkpoint.pop("query_oldest_id", None)
+    del checkpoint["next_token"]
+
+    if newest_id is None:
+        # the search found no tweets
+        if "newest_id" in checkpoint and "start_time" in query:
+            checkpoint["start_time"] = min(checkpoint["start_time"], query["start_time"])
+        return
+
+    if "newest_id" not in checkpoint:
+        checkpoint.update(
+            newest_id=newest_id, oldest_id=oldest_id, start_time=query["start_time"]
+        )
+        return
+    checkpoint["newest_id"] = str(max(int(checkpoint["newest_id"]), int(newest_id)))
+    checkpoint["oldest_id"] = str(min(int(checkpoint["oldest_id"]), int(oldest_id)))
+    if "start_time" in query:
+        checkpoint["start_time"] = min(checkpoint["start_time"], query["start_time"])
@@ -0,0 +1,219 @@
+"""Cleaning engine turning the text of each tweet into clean text,
+hashtags and word tokens in a single pass."""
+
+# imports
+import gc
+import re
+import time
+
+import numpy as np
+import pandas as pd
+
+from tweetlytics.dedup import DuplicateGroups
+from tweetlytics.instrument import active
+
+_RETWEET = re.compile(r"RT\s@.*:\s")
+_HASHTAG_TEXT = re.compile(r"#.*?(?=\s|$)")
+
+# each pattern with a substring every match contains, to skip texts without it
+_MENTION = (re.compile(r"@[A-Za-z0-9_]+"), "@")
+_HASHTAG = (re.compile(r"#[A-Za-z0-9_]+"), "#")
+_LINK = (re.compile(r"http\S+"), "http")
+_PUNCTUATION = (re.compile(r"[^\w\s]"), "")
+
+
+class TweetCleaner:
+    """
+    Cleans tweets one at a time, running every enabled step on a tweet
+    before moving to the next one instead of passing over the whole
+    column once per step.
+
+    The steps are run in this order: removal of the retweet prefix
+    (``RT @user: ``), conversion into lower case, extraction of hashtags,
+    removal of mentions, hashtags, links and punctuation, then
+    tokenization.
+
+    Parameters:
+    -----------
+    strip_retweet : Boolean
+        Remove the ``RT @user: `` prefix of retweets. Default is True
+    lowercase : Boolean
+        Convert the text into lower case. Default is True
+    remove_mentions : Boolean
+        Remove ``@user`` mentions. Default is True
+    remove_hashtags : Boolean
+        Remove hashtags from the text. Default is True
+    remove_links : Boolean
+        Remove links. Default is True
+    remove_punctuation : Boolean
+        Remove every character that is neither a word character nor
+        a whitespace. Default is True
+
+    Examples
+    --------
+    >>> TweetCleaner().clean("RT @user: Hello #World https://t.co/x")
+    ('hello  ', ['#world'], ['hello'], 1)
+    """
+
+    def __init__(
+        self,
+        strip_retweet=True,
+        lowercase=True,
+        remove_mentions=True,
+        remove_hashtags=True,
+        remove_links=True,
+        remove_punctuation=True,
+    ):
+        self.strip_retweet = strip_retweet
+        self.lowercase = lowercase
+        removals = [
+            ("mentions", _MENTION, remove_mentions),
+            ("hashtags", _HASHTAG, remove_hashtags),
+            ("links", _LINK, remove_links),
+            ("punctuation", _PUNCTUATION, remove_punctuation),
+        ]
+        self._removals = [pattern for _, pattern, enabled in removals if enabled]
+        self._removal_names = [name for name, _, enabled in removals if enabled]
+
+    def clean(self, text, tokenization=True, word_count=True):
+        """
+        Cleans the text of one tweet.
+
+        Parameters:
+        -----------
+        text : string
+            The text of the tweet.
+        tokenization : Boolean
+            Split the clean text into unique word tokens. Default is True
+        word_count : Boolean
+            Count the words of the clean text. Default is True
+
+        Returns:
+        --------
+        result : tuple
+            The clean text, the list of hashtags, the list of unique tokens
+            (None without tokenization) and the number of words (None
+            without tokenization or word count).
+        """
+        if self.strip_retweet and "RT" in text:
+            text = _RETWEET.sub("", text)
+        if self.lowercase:
+            text = text.lower()
+        hashtags = _HASHTAG_TEXT.findall(text) if "#" in text else []
+        for pattern, marker in self._removals:
+            if marker in text:
+                text = pattern.sub("", text)
+
+        if not tokenization:
+            return text, hashtags, None, None
+        tokens = text.split()
+        count = len(tokens) if word_count else None
+        return text, hashtags, list(set(tokens)), count
+
+    def _clean_timed(self, text, tokenization, word_count, seconds):
+        """Cleans the text of one tweet like clean, adding the time of each
+        step to the seconds list: the retweet prefix, lower case, hashtags,
+        each removal and tokenization."""
+        clock = time.perf_counter
+        start = clock()
+        if self.strip_retweet and "RT" in text:
+            text = _RETWEET.sub("", text)
+        now = clock()
+        seconds[0] += now - start
+        if self.lowercase:
+            text = text.lower()
+        start = clock()
+        seconds[1] += start - now
+        hashtags = _HASHTAG_TEXT.findall(text) if "#" in text else []
+        now = clock()
+        seconds[2] += now - start
+        for step, (pattern, marker) in enumerate(self._removals, 3):
+            if marker in text:
+                text = pattern.sub("", text)
+            start, now = now, clock()
+            seconds[step] += now - start
+
+        if not tokenization:
+            return text, hashtags, None, None
+        tokens = text.split()
+        count = len(tokens) if word_count else None
+        result = text, hashtags, list(set(tokens)), count
+        seconds[-1] += clock() - now
+        return result
+
+    def clean_frame(self, df, tokenization=True, word_count=True, dedup=False):
+        """
+        Cleans the text column of a dataframe in one traversal and adds the
+        hashtags, tokens and word_count columns. Missing texts stay missing.
+
+        Parameters:
+        -----------
+        df : dataframe
+            Tweets with a text column. It is modified in place.
+        tokenization : Boolean
+            Add the tokens column. Default is True
+        word_count : Boolean
+            Add the word_count column when tokenizing. Default is True
+        dedup : Boolean
+            Clean each distinct text once, such as the text shared by the
+            retweets of a tweet, and copy the results to its duplicates,
+            which then share the same hashtags and tokens lists.
+            Default is False
+
+        Returns:
+        --------
+        df : dataframe
+            The same dataframe with the cleaned columns.
+        """
+        missing = (np.nan, np.nan, np.nan, np.nan)
+        texts = df["text"]
+        if dedup:
+            groups = DuplicateGroups.from_values(texts)
+            texts = groups.representatives(texts)
+        # the results hold millions of small lists, pause the cyclic garbage
+        # collector so it does not rescan them over and over while they are built
+        gc_enabled = gc.isenabled()
+        gc.disable()
+        instrumentation = active()
+        try:
+            if instrumentation is None:
+                results = [
+                    self.clean(text, tokenization, word_count)
+                    if isinstance(text, str)
+                    else missing
+                    for text in texts
+                ]
+            else:
+                steps = ["strip_retweet", "lowercase", "find_hashtags"]
+                steps += ["remove_" + name for name in self._removal_names]
+                steps.append("tokenize")
+                seconds = [0.0] * len(steps)
+                results = [
+                    self._clean_timed(text, tokenization, word_count, seconds)
+                    if isinstance(text, str)
+                    else missing
+                    for text in texts
+                ]
+                for step, step_seconds in zip(steps, seconds):
+                    instrumentation.add("clean_tweets." + step, step_seconds, len(texts))
+            columns = ["text", "hashtags", "tokens", "word_count"]
+            if results:
+                cleaned = dict(zip(columns, map(list, zip(*results))))
+            else:
+                cleaned = dict.fromkeys(columns, [])
+            if not tokenization:
+                del cleaned["tokens"], cleaned["word_count"]
+            elif not word_count:
+                del cleaned["word_count"]
+
+            for column, values in cleaned.items():
+                dtype = None if column == "word_count" else object
+                if dedup:
+                    values = groups.broadcast(pd.Series(values, dtype=dtype), df.index)
+                else:
+                    values = pd.Series(values, index=df.index, dtype=dtype)
+                df[column] = values
+        finally:
+            if gc_enabled:
+                gc.enable()
+        return df
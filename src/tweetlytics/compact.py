@@ -0,0 +1,136 @@
+"""Compact dtypes for the dataframes of tweets, and a report of the memory
+they use."""
+
+# imports
+import numpy as np
+import pandas as pd
+
+# low-cardinality strings, stored as categoricals
+CATEGORY_COLUMNS = [
+    "keyword",
+    "lang",
+    "source",
+    "reply_settings",
+    "reference_type",
+    "sentiment_type",
+]
+
+# free text, stored as Arrow-backed strings when pyarrow is installed
+STRING_COLUMNS = ["text", "created_at", "author_username", "author_name"]
+
+# tweet and user ids, which the API returns as strings
+ID_COLUMNS = ["id", "author_id", "conversation_id", "in_reply_to_user_id", "reference_id"]
+
+# counts of a single tweet or user, stored as int32
+COUNT_COLUMNS = [
+    "retweetcount",
+    "reply_count",
+    "like_count",
+    "quote_count",
+    "word_count",
+    "author_followers_count",
+]
+
+
+def _string_dtype():
+    """Returns the Arrow-backed string dtype, or None without pyarrow."""
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        return None
+    return pd.StringDtype("pyarrow")
+
+
+def compact_frame(df):
+    """
+    Converts the columns of a dataframe of tweets into compact dtypes:
+    categoricals for the low-cardinality strings such as keyword and
+    lang, Arrow-backed strings for the text (kept as Python strings
+    without pyarrow), 64-bit integers for the ids, which are nullable when
+    missing values are present, and 32-bit integers for the counts.
+
+    The values are unchanged, only their storage is, so the compact
+    frame goes through clean_tweets, analytics and the stored tables like
+    the original one. Columns missing from df or holding lists are left
+    as they are.
+
+    Parameters:
+    -----------
+    df : dataframe
+        The tweets, as returned by get_store, clean_tweets or analytics.
+
+    Returns:
+    --------
+    df : dataframe
+        A new dataframe with the compact dtypes.
+
+    Examples
+    --------
+    >>> tweets = compact_frame(get_store(bearer_token, "vancouver", start_date, end_date))
+    >>> memory_report(tweets)
+    """
+    df = df.copy(deep=False)
+    string_dtype = _string_dtype()
+    for column in df.columns:
+        values = df[column]
+        if column in CATEGORY_COLUMNS:
+            df[column] = values.astype("category")
+        elif column in STRING_COLUMNS and string_dtype is not None:
+            if pd.api.types.infer_dtype(values, skipna=True) == "string":
+                df[column] = values.astype(string_dtype)
+        elif column in ID_COLUMNS:
+            df[column] = _compact_ids(values)
+        elif column in COUNT_COLUMNS:
+            if pd.api.types.is_integer_dtype(values) and not isinstance(
+                values.dtype, pd.api.extensions.ExtensionDtype
+            ):
+                df[column] = values.astype(np.int32)
+    return df
+
+
+def _compact_ids(values):
+    """Returns ids as int64, or as nullable Int64 with missing ids."""
+    missing = values.isna().to_numpy()
+    if values.dtype != object or not missing.any():
+        return values.astype("Int64" if missing.any() else np.int64)
+    # parse the present ids as ints, going through floats would lose digits
+    ids = np.zeros(len(values), dtype=np.int64)
+    ids[~missing] = values[~missing].map(int).to_numpy(dtype=np.int64)
+    return pd.Series(pd.arrays.IntegerArray(ids, missing), index=values.index)
+
+
+def memory_report(df):
+    """
+    Reports the memory used by each column of a dataframe, counting the
+    strings and lists held by object columns.
+
+    Parameters:
+    -----------
+    df : dataframe
+        The dataframe to measure.
+
+    Returns:
+    --------
+    report : dataframe
+        The dtype, the bytes, the bytes per row and the share of the
+        total of the index and of each column, indexed by column, followed
+        by a total row.
+
+    Examples
+    --------
+    >>> memory_report(clean_tweets("output/tweets_response.csv", compact=True))
+    """
+    usage = df.memory_usage(deep=True)
+    usage["total"] = usage.sum()
+    dtypes = df.dtypes.astype(str)
+    dtypes["Index"] = type(df.index).__name__
+    dtypes["total"] = ""
+    rows = max(len(df), 1)
+    return pd.DataFrame(
+        {
+            "dtype": dtypes.reindex(usage.index),
+            "bytes": usage,
+            "bytes_per_row": usage / rows,
+            "share": usage / max(usage["total"], 1),
+        }
+    )
@@ -0,0 +1,288 @@
+"""Integer-encoded token corpus of the cleaned tweets, stored as NumPy
+files that can be memory-mapped."""
+
+# imports
+import itertools
+import os
+
+import numpy as np
+import pandas as pd
+
+_VOCABULARY_FILE = "vocabulary.txt"
+_TOKEN_IDS_FILE = "token_ids.npy"
+_OFFSETS_FILE = "offsets.npy"
+
+
+class TokenCorpus:
+    """
+    Tokens of a sequence of tweets in compressed sparse row layout: the
+    ids of the tokens of every tweet, one after the other, in a flat int32
+    array, and the offset of the first token of each tweet.
+
+    Parameters:
+    -----------
+    vocabulary : array of string
+        The token of each id.
+    token_ids : array of int32
+        The ids of the tokens of every tweet.
+    offsets : array of int64
+        The offset of the tokens of each tweet in token_ids, followed by
+        the number of tokens.
+
+    Examples
+    --------
+    >>> corpus = TokenCorpus.load("output/clean_tweets_corpus")
+    >>> corpus.token_counts().nlargest(10)
+    """
+
+    def __init__(self, vocabulary, token_ids, offsets):
+        self.vocabulary = np.asarray(vocabulary, dtype=object)
+        self.token_ids = token_ids
+        self.offsets = offsets
+
+    @classmethod
+    def from_tokens(cls, tokens):
+        """
+        Encodes the token lists of tweets.
+
+        Parameters:
+        -----------
+        tokens : Series or list of list of string
+            The tokens of each tweet.
+        """
+        writer = CorpusWriter()
+        writer.append(tokens)
+        return writer.corpus()
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    @property
+    def lengths(self):
+        """The number of tokens of each tweet."""
+        return np.diff(self.offsets)
+
+    def tokens(self, row):
+        """Returns the tokens of the tweet at position ``row``."""
+        start, stop = self.offsets[row], self.offsets[row + 1]
+        return self.vocabulary[self.token_ids[start:stop]].tolist()
+
+    def slice(self, start, stop):
+        """Returns the corpus of the tweets from position ``start`` to
+        ``stop``, sharing the arrays of this corpus."""
+        offsets = self.offsets[start : stop + 1]
+        token_ids = self.token_ids[offsets[0] : offsets[-1]]
+        return TokenCorpus(self.vocabulary, token_ids, offsets - offsets[0])
+
+    def take(self, rows):
+        """Returns the corpus of the tweets at the positions ``rows``."""
+        rows = np.asarray(rows, dtype=np.int64)
+        starts = self.offsets[rows]
+        lengths = self.offsets[rows + 1] - starts
+        offsets = np.concatenate([np.zeros(1, dtype=np.int64), np.cumsum(lengths)])
+        positions = np.repeat(starts - offsets[:-1], lengths) + np.arange(offsets[-1])
+        return TokenCorpus(self.vocabulary, self.token_ids[positions], offsets)
+
+    def token_counts(self):
+        """Returns the number of occurrences of each token of the
+        vocabulary."""
+        counts = np.bincount(self.token_ids, minlength=len(self.vocabulary))
+        return pd.Series(counts, index=self.vocabulary)
+
+    def group_token_counts(self, groups):
+        """
+        Counts the tokens of the tweets of each group.
+
+        Parameters:
+        -----------
+        groups : Series, array or dataframe
+            The group of each tweet, such as its sentiment type, or the
+            columns of its group, such as its keyword and sentiment type.
+
+        Returns:
+        --------
+        counts : Series
+            The number of occurrences of each token in each group, indexed
+            by token and group, or token and group columns, for the tokens
+            occurring in a group.
+        """
+        if isinstance(groups, pd.DataFrame):
+            group_codes, group_names = pd.MultiIndex.from_frame(groups).factorize(
+                sort=True
+            )
+        else:
+            group_codes, group_names = pd.factorize(np.asarray(groups), sort=True)
+        vocabulary_size = len(self.vocabulary)
+        keys = (
+            np.repeat(group_codes, self.lengths).astype(np.int64) * vocabulary_size
+            + self.token_ids
+        )
+        counts = np.bincount(keys, minlength=len(group_names) * vocabulary_size)
+        (nonzero,) = np.nonzero(counts)
+        group_names = group_names[nonzero // vocabulary_size]
+        if isinstance(group_names, pd.MultiIndex):
+            group_names = [
+                group_names.get_level_values(level)
+                for level in range(group_names.nlevels)
+            ]
+        else:
+            group_names = [group_names]
+        index = pd.MultiIndex.from_arrays(
+            [self.vocabulary[nonzero % vocabulary_size], *group_names]
+        )
+        return pd.Series(counts[nonzero], index=index)
+
+    def save(self, folder_path):
+        """
+        Writes the corpus to a folder.
+
+        Parameters:
+        -----------
+        folder_path : string
+            The folder of the corpus files, created if missing.
+        """
+        os.makedirs(folder_path, exist_ok=True)
+        _write_vocabulary(folder_path, self.vocabulary)
+        np.save(os.path.join(folder_path, _TOKEN_IDS_FILE), self.token_ids)
+        np.save(os.path.join(folder_path, _OFFSETS_FILE), self.offsets)
+
+    @classmethod
+    def load(cls, folder_path, mmap_mode="r"):
+        """
+        Reads a corpus written by save or by clean_tweets.
+
+        Parameters:
+        -----------
+        folder_path : string
+            The folder of the corpus files.
+        mmap_mode : string or None
+            Memory-map the arrays in this mode so that they are read
+            lazily and shared by every process reading the corpus.
+            Default is 'r'
+
+        Returns:
+        --------
+        corpus : TokenCorpus
+            The stored corpus.
+        """
+        with open(os.path.join(folder_path, _VOCABULARY_FILE), encoding="utf-8") as file:
+            vocabulary = file.read().split("\n")[:-1]
+        return cls(
+            vocabulary,
+            np.load(os.path.join(folder_path, _TOKEN_IDS_FILE), mmap_mode=mmap_mode),
+            np.load(os.path.join(folder_path, _OFFSETS_FILE), mmap_mode=mmap_mode),
+        )
+
+
+class CorpusWriter:
+    """
+    Encodes the tokens of tweets chunk by chunk, growing one vocabulary.
+    With a folder, the token ids of each chunk are written to disk as they
+    are encoded and the corpus files are completed when closed, so that
+    only the vocabulary is held in memory.
+
+    Parameters:
+    -----------
+    folder_path : string or None
+        The folder of the corpus files. Default is None which keeps the
+        corpus in memory, see ``corpus``.
+
+    Examples
+    --------
+    >>> with CorpusWriter("output/clean_tweets_corpus") as writer:
+            for df in chunks:
+                writer.append(df["tokens"])
+    """
+
+    def __init__(self, folder_path=None):
+        self.folder_path = folder_path
+        self.vocabulary = {}
+        self._token_ids = []
+        self._lengths = []
+        self._files = None
+        if folder_path is not None:
+            os.makedirs(folder_path, exist_ok=True)
+            self._files = [
+                open(os.path.join(folder_path, name + ".partial"), "wb")
+                for name in [_TOKEN_IDS_FILE, _OFFSETS_FILE]
+            ]
+
+    def append(self, tokens):
+        """Encodes the token lists of the next tweets."""
+        tokens = list(tokens)
+        lengths = np.fromiter(map(len, tokens), dtype=np.int64, count=len(tokens))
+        codes, uniques = pd.factorize(
+            np.array(list(itertools.chain.from_iterable(tokens)), dtype=object)
+        )
+        # ids of the tokens of the chunk in the vocabulary of every chunk
+        vocabulary = self.vocabulary
+        ids = np.array(
+            [vocabulary.setdefault(token, len(vocabulary)) for token in uniques],
+            dtype=np.int32,
+        )
+        token_ids = ids[codes] if len(codes) else np.zeros(0, dtype=np.int32)
+        if self._files is None:
+            self._token_ids.append(token_ids)
+            self._lengths.append(lengths)
+        else:
+            self._files[0].write(token_ids.tobytes())
+            self._files[1].write(lengths.tobytes())
+
+    def corpus(self):
+        """Returns the tokens appended so far to a writer without a
+        folder as a TokenCorpus."""
+        lengths = np.concatenate([np.zeros(1, dtype=np.int64)] + self._lengths)
+        return TokenCorpus(
+            list(self.vocabulary),
+            np.concatenate([np.zeros(0, dtype=np.int32)] + self._token_ids),
+            np.cumsum(lengths),
+        )
+
+    def close(self):
+        """Completes the corpus files of folder_path."""
+        if self._files is None:
+            return
+        for file in self._files:
+            file.close()
+        self._files = None
+        _write_vocabulary(self.folder_path, list(self.vocabulary))
+
+        # copy the raw arrays into .npy files, the offsets being the
+        # cumulative sum of the lengths
+        for name, dtype in [(_TOKEN_IDS_FILE, np.int32), (_OFFSETS_FILE, np.int64)]:
+            raw_path = os.path.join(self.folder_path, name + ".partial")
+            path = os.path.join(self.folder_path, name)
+            size = os.path.getsize(raw_path) // np.dtype(dtype).itemsize
+            if name == _OFFSETS_FILE:
+                size += 1
+            if size == 0:
+                np.save(path, np.zeros(0, dtype=dtype))
+            else:
+                if os.path.getsize(raw_path):
+                    values = np.memmap(raw_path, dtype=dtype, mode="r")
+                else:
+                    values = np.zeros(0, dtype=dtype)
+                array = np.lib.format.open_memmap(
+                    path, mode="w+", dtype=dtype, shape=(size,)
+                )
+                if name == _OFFSETS_FILE:
+                    array[0] = 0
+                    np.cumsum(values, out=array[1:])
+                else:
+                    array[:] = values
+                array.flush()
+                del array, values
+            os.remove(raw_path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+def _write_vocabulary(folder_path, vocabulary):
+    """Writes the tokens of a vocabulary, one per line."""
+    with open(os.path.join(folder_path, _VOCABULARY_FILE), "w", encoding="utf-8") as file:
+        # tokens are split on whitespace, so they hold no line breaks
+        file.write("".join(token + "\n" for token in vocabulary))
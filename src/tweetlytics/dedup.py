@@ -0,0 +1,93 @@
+"""Grouping of the tweets sharing the same text, so the work done on each
+text runs once per group."""
+
+# imports
+import numpy as np
+import pandas as pd
+
+
+class DuplicateGroups:
+    """
+    Groups of the rows of a column holding the same value, such as the
+    retweets of one original tweet, which all carry its text, or copies of
+    a text posted by several accounts.
+
+    The work done on each text, such as cleaning or scoring its sentiment,
+    runs on the first row of each group only, and its results are
+    broadcast back to every row of the group. Counts over the rows are
+    weighted by the multiplicity of each group, so the totals still count
+    every duplicate.
+
+    Parameters:
+    -----------
+    codes : array of int
+        The group of each row.
+    first : array of int
+        The position of the first row of each group.
+
+    Examples
+    --------
+    >>> groups = DuplicateGroups.from_values(df["text"])
+    >>> polarity = lexicon_polarity(groups.representatives(df["text"]))
+    >>> df["sentiment_polarity"] = groups.broadcast(polarity, df.index)
+    """
+
+    def __init__(self, codes, first):
+        self.codes = codes
+        self.first = first
+
+    @classmethod
+    def from_values(cls, values):
+        """
+        Groups the rows holding the same value, missing values forming one
+        group.
+
+        Parameters:
+        -----------
+        values : Series
+            The value of each row, such as the text of each tweet.
+        """
+        codes, uniques = pd.factorize(values)
+        groups = len(uniques)
+        # missing values form the last group
+        missing = codes < 0
+        if missing.any():
+            codes = np.where(missing, groups, codes)
+            groups += 1
+        # every group has a row, so this is the first position of each group
+        first = np.unique(codes, return_index=True)[1].astype(np.int64)
+        return cls(codes, first)
+
+    def __len__(self):
+        return len(self.first)
+
+    @property
+    def multiplicity(self):
+        """The number of rows of each group."""
+        return np.bincount(self.codes, minlength=len(self.first))
+
+    def representatives(self, data):
+        """Returns the rows of a Series or dataframe that represent each
+        group."""
+        return data.iloc[self.first]
+
+    def broadcast(self, results, index=None):
+        """
+        Copies the result of each group to each of its rows.
+
+        Parameters:
+        -----------
+        results : Series or dataframe
+            A result for each group, in the order of representatives.
+        index : Index or None
+            The index of the rows. Default is None which numbers them.
+
+        Returns:
+        --------
+        results : Series or dataframe
+            The result of the group of each row.
+        """
+        results = results.iloc[self.codes]
+        if index is None:
+            return results.reset_index(drop=True)
+        return results.set_axis(index, axis=0)
@@ -0,0 +1,410 @@
+"""Helpers for retrieving tweets from the Twitter API v2 search endpoints."""
+
+# imports
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from tweetlytics.instrument import measure
+
+_API_TIME_FORMAT = "%Y-%m-%dT%H:%M:%S.000Z"
+
+
+class RateLimiter:
+    """
+    Schedules requests against the rate limit budget reported by the
+    ``x-rate-limit-remaining`` and ``x-rate-limit-reset`` response headers.
+
+    One limiter is shared by every thread sending requests with the same
+    bearer token. Once the remaining budget is used up, ``acquire`` blocks
+    until the reset time of the current rate limit window.
+
+    Parameters:
+    -----------
+    clock : callable
+        Returns the current time in epoch seconds. Default is time.time
+    sleep : callable
+        Waits for a number of seconds. Default is time.sleep
+
+    Examples
+    --------
+    >>> rate_limiter = RateLimiter()
+    >>> rate_limiter.acquire()
+    >>> response = session.get(search_url, params=query_params, headers=headers)
+    >>> rate_limiter.update(response.headers)
+    """
+
+    def __init__(self, clock=time.time, sleep=time.sleep):
+        self.remaining = None
+        self.reset = None
+        self.clock = clock
+        self.sleep = sleep
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Blocks until the rate limit budget allows one more request."""
+        while True:
+            with self._lock:
+                now = self.clock()
+                if self.reset is not None and now >= self.reset:
+                    # a new rate limit window has started
+                    self.remaining = None
+                    self.reset = None
+                if self.remaining is None or self.remaining > 0:
+                    if self.remaining is not None:
+                        self.remaining -= 1
+                    return
+                wait = self.reset - now
+            self.sleep(wait)
+
+    def update(self, headers):
+        """Updates the budget from the rate limit headers of a response."""
+        remaining = headers.get("x-rate-limit-remaining")
+        reset = headers.get("x-rate-limit-reset")
+        if remaining is None or reset is None:
+            return
+        remaining, reset = int(remaining), float(reset)
+        with self._lock:
+            if self.reset is None or reset > self.reset:
+                self.remaining, self.reset = remaining, reset
+            elif reset == self.reset:
+                # responses of concurrent requests may arrive out of order
+                self.remaining = min(self.remaining, remaining)
+
+    def exhaust(self, reset):
+        """Blocks every request until ``reset`` (epoch seconds)."""
+        with self._lock:
+            self.remaining = 0
+            self.reset = reset
+
+
+def request_with_backoff(
+    session,
+    url,
+    params,
+    headers,
+    rate_limiter=None,
+    max_retries=5,
+    backoff_factor=1.0,
+):
+    """
+    Sends a GET request, retrying with exponential backoff when the API
+    responds with 429 (too many requests) or a 5xx server error.
+
+    Parameters:
+    -----------
+    session : requests.Session
+        The session used to send the request.
+    url : string
+        The url to request.
+    params : dict
+        The request parameters.
+    headers : dict
+        The request headers.
+    rate_limiter : RateLimiter or None
+        The limiter scheduling the request. Default is None.
+    max_retries : int
+        The number of times a failed request is retried. Default is 5.
+    backoff_factor : float
+        The delay in seconds before the first retry. The delay doubles
+        with every retry. Default is 1.0.
+
+    Returns:
+    --------
+    response : requests.Response
+        The successful response.
+    """
+    for attempt in range(max_retries + 1):
+        if rate_limiter is not None:
+            rate_limiter.acquire()
+        with measure("get_store.request"):
+            response = session.get(url, params=params, headers=headers)
+        if rate_limiter is not None:
+            rate_limiter.update(response.headers)
+
+        if response.status_code != 429 and response.status_code < 500:
+            break
+        if attempt == max_retries:
+            break
+
+        delay = backoff_factor * 2 ** attempt
+        reset = response.headers.get("x-rate-limit-reset")
+        if response.status_code == 429 and reset is not None:
+            # wait for the rate limit window to reset rather than guessing
+            if float(reset) > time.time():
+                delay = float(reset) - time.time()
+        if response.status_code == 429 and rate_limiter is not None:
+            # hold back the other workers sharing the limiter as well
+            rate_limiter.exhaust(time.time() + delay)
+            continue
+        time.sleep(delay)
+
+    response.raise_for_status()
+    return response
+
+
+def paginate_search(
+    search_url,
+    query_params,
+    headers,
+    max_tweets=None,
+    session=None,
+    rate_limiter=None,
+    max_retries=5,
+    backoff_factor=1.0,
+):
+    """
+    Yields the pages of a Twitter search one at a time as they arrive,
+    following the ``next_token`` of each response until the search is
+    exhausted or the tweet budget is reached.
+
+    Parameters:
+    -----------
+    search_url : string
+        The Twitter API search endpoint to query.
+    query_params : dict
+        The request parameters of the first page. ``max_results`` is the
+        page size and is lowered for the last page when a budget is given.
+    headers : dict
+        The request headers, including the authorization header.
+    max_tweets : int or None
+        The total number of tweets to retrieve across all pages.
+        Default is None which follows every page of the search.
+    session : requests.Session or None
+        The session used to send the requests. A new session is
+        created (and closed) when None. Default is None.
+    rate_limiter : RateLimiter or None
+        The limiter scheduling the requests. A new limiter is created
+        when None. Default is None.
+    max_retries : int
+        The number of times a request failing with 429 or 5xx is retried.
+        Default is 5.
+    backoff_factor : float
+        The delay in seconds before the first retry. Default is 1.0.
+
+    Yields:
+    -------
+    page : dict
+        The json response of one search request. The ``data`` of the last
+        page is trimmed so no more than ``max_tweets`` tweets are yielded.
+
+    Examples
+    --------
+    >>> for page in paginate_search(search_url, query_params, headers, max_tweets=500):
+            print(page["meta"]["result_count"])
+    """
+    own_session = session is None
+    if own_session:
+        session = requests.Session()
+    if rate_limiter is None:
+        rate_limiter = RateLimiter()
+
+    params = {key: value for key, value in query_params.items() if key != "next_token"}
+    page_size = int(params.get("max_results", 100))
+    fetched = 0
+
+    try:
+        while max_tweets is None or fetched < max_tweets:
+            # avoid requesting more tweets than the remaining budget
+            if max_tweets is not None:
+                params["max_results"] = f"{max(10, min(page_size, max_tweets - fetched))}"
+
+            response = request_with_backoff(
+                session,
+                search_url,
+                params,
+                headers,
+                rate_limiter=rate_limiter,
+                max_retries=max_retries,
+                backoff_factor=backoff_factor,
+            )
+            page = response.json()
+
+            data = page.get("data", [])
+            if max_tweets is not None and len(data) > max_tweets - fetched:
+                page["data"] = data = data[: max_tweets - fetched]
+            fetched += len(data)
+
+            yield page
+
+            next_token = page.get("meta", {}).get("next_token")
+            if not next_token or not data:
+                break
+            params["next_token"] = next_token
+    finally:
+        if own_session:
+            session.close()
+
+
+def split_date_windows(start_time, end_time, n_windows):
+    """
+    Splits a time range into consecutive windows of equal length.
+
+    Parameters:
+    -----------
+    start_time : datetime
+        The start of the range.
+    end_time : datetime
+        The end of the range.
+    n_windows : int
+        The number of windows.
+
+    Returns:
+    --------
+    windows : list of tuple
+        The (start_time, end_time) of each window formatted for the
+        Twitter API, most recent window first.
+
+    Examples
+    --------
+    >>> split_date_windows(datetime(2022, 1, 1), datetime(2022, 1, 3), 2)
+    [('2022-01-02T00:00:00.000Z', '2022-01-03T00:00:00.000Z'),
+     ('2022-01-01T00:00:00.000Z', '2022-01-02T00:00:00.000Z')]
+    """
+    step = (end_time - start_time) / n_windows
+    bounds = [start_time + step * i for i in range(n_windows)] + [end_time]
+    bounds = [bound - timedelta(microseconds=bound.microsecond) for bound in bounds]
+    windows = [
+        (bounds[i].strftime(_API_TIME_FORMAT), bounds[i + 1].strftime(_API_TIME_FORMAT))
+        for i in range(n_windows)
+        if bounds[i] < bounds[i + 1]
+    ]
+    return windows[::-1]
+
+
+def fetch_windows(
+    search_url,
+    query_params,
+    headers,
+    windows,
+    workers=4,
+    max_tweets=None,
+    session=None,
+    rate_limiter=None,
+    max_retries=5,
+    backoff_factor=1.0,
+):
+    """
+    Paginates the search of several time windows at the same time and
+    yields the pages in the order they arrive.
+
+    The windows are searched by a pool of threads sharing one connection
+    pool and one rate limiter. At most ``2 * workers`` pages are held in
+    memory waiting to be consumed.
+
+    Parameters:
+    -----------
+    search_url : string
+        The Twitter API search endpoint to query.
+    query_params : dict
+        The request parameters. ``start_time`` and ``end_time`` are
+        replaced by the bounds of each window.
+    headers : dict
+        The request headers, including the authorization header.
+    windows : list of tuple
+        The (start_time, end_time) of each window, for example from
+        ``split_date_windows``.
+    workers : int
+        The number of windows searched at the same time. Default is 4.
+    max_tweets : int or None
+        The total number of tweets to retrieve across all windows. Pages
+        are no longer requested once it is reached. Default is None.
+    session : requests.Session or None
+        The session used to send the requests. A session with a
+        connection pool of ``workers`` connections is created when None.
+    rate_limiter : RateLimiter or None
+        The limiter shared by the workers. Default is None.
+    max_retries : int
+        The number of times a request failing with 429 or 5xx is retried.
+        Default is 5.
+    backoff_factor : float
+        The delay in seconds before the first retry. Default is 1.0.
+
+    Yields:
+    -------
+    page : dict
+        The json response of one search request.
+
+    Examples
+    --------
+    >>> windows = split_date_windows(start, end, 7)
+    >>> for page in fetch_windows(search_url, query_params, headers, windows, workers=4):
+            print(page["meta"]["result_count"])
+    """
+    own_session = session is None
+    if own_session:
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=workers, pool_maxsize=workers)
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+    if rate_limiter is None:
+        rate_limiter = RateLimiter()
+
+    pages = queue.Queue(maxsize=2 * workers)
+    stop = threading.Event()
+    done = object()
+
+    def put(item):
+        # give up waiting for space once the consumer has stopped
+        while not stop.is_set():
+            try:
+                pages.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                pass
+
+    def search_window(window):
+        try:
+            # windows still queued when the consumer stops send no request
+            if stop.is_set():
+                return
+            window_params = dict(query_params, start_time=window[0], end_time=window[1])
+            for page in paginate_search(
+                search_url,
+                window_params,
+                headers,
+                session=session,
+                rate_limiter=rate_limiter,
+                max_retries=max_retries,
+                backoff_factor=backoff_factor,
+            ):
+                if stop.is_set():
+                    break
+                put(page)
+        except Exception as error:
+            put(error)
+        finally:
+            put(done)
+
+    executor = ThreadPoolExecutor(max_workers=workers)
+    try:
+        for window in windows:
+            executor.submit(search_window, window)
+
+        fetched = 0
+        remaining_windows = len(windows)
+        while remaining_windows:
+            page = pages.get()
+            if page is done:
+                remaining_windows -= 1
+                continue
+            if isinstance(page, Exception):
+                raise page
+
+            data = page.get("data", [])
+            if max_tweets is not None and len(data) >= max_tweets - fetched:
+                page["data"] = data[: max_tweets - fetched]
+                yield page
+                break
+            fetched += len(data)
+            yield page
+    finally:
+        stop.set()
+        executor.shutdown(wait=True, cancel_futures=True)
+        if own_session:
+            session.close()
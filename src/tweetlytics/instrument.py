@@ -0,0 +1,257 @@
+"""Timers, throughput and peak memory counters of the steps of the pipeline
+stages, reported to a callback and exported as records."""
+
+# imports
+import functools
+import inspect
+import threading
+import time
+import tracemalloc
+
+import pandas as pd
+
+from tweetlytics.ndjson import write_ndjson
+
+# the instrumentation of the running stage, None when disabled
+_ACTIVE = None
+
+
+class Instrumentation:
+    """
+    Collects a record for each measured step of the pipeline stages: the
+    HTTP requests and the normalization of get_store, the cleaning steps
+    of clean_tweets, the sentiment scoring and groupbys of analytics, and
+    the rendering of each plot of plot_tweets.
+
+    Each record holds the stage name, the seconds, the number of rows and
+    the rows per second of the step, and with track_memory the peak of the
+    memory allocated by Python during the step. Steps run by worker
+    processes are only measured as a whole, by the calling process.
+
+    Without an instrumentation, the steps cost one function call and a
+    shared no-op context manager each.
+
+    Parameters:
+    -----------
+    callback : callable or None
+        Called with each record as its step ends, from the thread running
+        the step. Default is None
+    track_memory : Boolean
+        Measure the peak memory of each step with tracemalloc, which slows
+        the stages down. Default is False
+
+    Examples
+    --------
+    >>> instrumentation = Instrumentation(callback=print)
+    >>> analytics("output/clean_tweets.csv", instrumentation=instrumentation)
+    >>> instrumentation.summary()
+    >>> instrumentation.export("output/metrics.ndjson")
+    """
+
+    def __init__(self, callback=None, track_memory=False):
+        self.callback = callback
+        self.track_memory = track_memory
+        self.records = []
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def timer(self, stage, rows=None):
+        """
+        Returns a context manager measuring a step.
+
+        Parameters:
+        -----------
+        stage : string
+            The name of the step, such as 'analytics.sentiment'.
+        rows : int or None
+            The number of rows processed by the step, which can also be
+            set on the timer before the step ends. Default is None
+        """
+        return _Timer(self, stage, rows)
+
+    def add(self, stage, seconds, rows=None, peak_memory_mb=None):
+        """Records a step measured by the caller."""
+        record = {
+            "stage": stage,
+            "seconds": seconds,
+            "rows": rows,
+            "rows_per_sec": rows / seconds if rows is not None and seconds > 0 else None,
+            "peak_memory_mb": peak_memory_mb,
+        }
+        with self._lock:
+            self.records.append(record)
+        if self.callback is not None:
+            self.callback(record)
+
+    def activate(self):
+        """Returns a context manager making this instrumentation measure
+        the steps of the stages run inside it."""
+        return _Activation(self)
+
+    def summary(self):
+        """
+        Returns the total of the records of each step.
+
+        Returns:
+        --------
+        summary : dataframe
+            The calls, seconds, rows, rows_per_sec and largest
+            peak_memory_mb of each stage, the slowest first.
+        """
+        records = pd.DataFrame(
+            self.records,
+            columns=["stage", "seconds", "rows", "rows_per_sec", "peak_memory_mb"],
+        )
+        summary = records.groupby("stage", sort=False).agg(
+            calls=("seconds", "size"),
+            seconds=("seconds", "sum"),
+            # steps without rows have no throughput
+            rows=("rows", lambda rows: rows.sum(min_count=1)),
+            peak_memory_mb=("peak_memory_mb", "max"),
+        )
+        summary.insert(3, "rows_per_sec", summary["rows"] / summary["seconds"])
+        return summary.sort_values("seconds", ascending=False).reset_index()
+
+    def export(self, file_path):
+        """Writes the records to a NDJSON file, one record per line."""
+        with self._lock:
+            records = list(self.records)
+        write_ndjson(records, file_path)
+
+    def clear(self):
+        """Removes every record."""
+        with self._lock:
+            self.records = []
+
+
+class _Timer:
+    """Measures a step and records it when it ends."""
+
+    def __init__(self, instrumentation, stage, rows):
+        self.instrumentation = instrumentation
+        self.stage = stage
+        self.rows = rows
+
+    def __enter__(self):
+        if self.instrumentation.track_memory:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+            current, peak = tracemalloc.get_traced_memory()
+            # the peaks of the steps containing this one are kept before
+            # the peak is reset for this step
+            stack = self._stack()
+            if stack:
+                stack[-1].peak = max(stack[-1].peak, peak)
+            stack.append(self)
+            tracemalloc.reset_peak()
+            self.start_memory = self.peak = current
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *args):
+        seconds = time.perf_counter() - self.start
+        peak_memory_mb = None
+        if self.instrumentation.track_memory:
+            self.peak = max(self.peak, tracemalloc.get_traced_memory()[1])
+            stack = self._stack()
+            stack.pop()
+            if stack:
+                stack[-1].peak = max(stack[-1].peak, self.peak)
+            peak_memory_mb = (self.peak - self.start_memory) / (1 << 20)
+        self.instrumentation.add(self.stage, seconds, self.rows, peak_memory_mb)
+
+    def _stack(self):
+        local = self.instrumentation._local
+        if not hasattr(local, "stack"):
+            local.stack = []
+        return local.stack
+
+
+class _NullTimer:
+    """The timer of the steps when no instrumentation is active."""
+
+    rows = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        pass
+
+
+_NULL_TIMER = _NullTimer()
+
+
+class _Activation:
+    def __init__(self, instrumentation):
+        self.instrumentation = instrumentation
+
+    def __enter__(self):
+        global _ACTIVE
+        self.previous, _ACTIVE = _ACTIVE, self.instrumentation
+        return self.instrumentation
+
+    def __exit__(self, *args):
+        global _ACTIVE
+        _ACTIVE = self.previous
+
+
+def active():
+    """Returns the active instrumentation, or None when disabled."""
+    return _ACTIVE
+
+
+def measure(stage, rows=None):
+    """
+    Returns a context manager measuring a step with the active
+    instrumentation, or doing nothing when there is none.
+
+    Parameters:
+    -----------
+    stage : string
+        The name of the step.
+    rows : int or None
+        The number of rows processed by the step. Default is None
+
+    Examples
+    --------
+    >>> with measure("analytics.sentiment", rows=len(texts)):
+            polarity = scorer(texts)
+    """
+    if _ACTIVE is None:
+        return _NULL_TIMER
+    return _ACTIVE.timer(stage, rows)
+
+
+def instrumented(stage):
+    """
+    Decorates a stage taking an ``instrumentation`` parameter, which is
+    activated and measures the whole stage while it runs.
+
+    Parameters:
+    -----------
+    stage : string
+        The name of the stage.
+    """
+
+    def decorator(function):
+        position = list(inspect.signature(function).parameters).index("instrumentation")
+
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            if len(args) > position:
+                instrumentation = args[position]
+            else:
+                instrumentation = kwargs.get("instrumentation")
+            if instrumentation is None:
+                return function(*args, **kwargs)
+            if not isinstance(instrumentation, Instrumentation):
+                raise TypeError(
+                    "Invalid parameter input type: instrumentation must be entered as an Instrumentation"
+                )
+            with instrumentation.activate(), instrumentation.timer(stage):
+                return function(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
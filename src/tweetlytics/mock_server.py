@@ -0,0 +1,368 @@
+"""Local stand-in for the search endpoints of the Twitter API v2, replaying
+recorded responses or synthesizing tweets, to exercise get_store offline."""
+
+# imports
+import argparse
+import json
+import threading
+import time
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import numpy as np
+
+from tweetlytics.synthetic import TweetGenerator
+
+SEARCH_PATHS = ["/2/tweets/search/recent", "/2/tweets/search/all"]
+
+_API_TIME_FORMAT = "%Y-%m-%dT%H:%M:%S.000Z"
+
+
+class MockTwitterServer:
+    """
+    Serves the search endpoints of the Twitter API v2 on a local port, so
+    that get_store can be run with its base_url against it without a
+    bearer token, to load test the ingestion and its backoff.
+
+    The server replays the tweets of a recorded response, such as
+    output/tweets_response.json, for every search, or synthesizes
+    window_tweets tweets for each time window of the searches with
+    TweetGenerator. The tweets are filtered by the since_id, until_id and
+    start_time of the searches, so resumed searches only get the tweets
+    they miss, and pages of max_results tweets are followed with their
+    next_token like the API's.
+
+    Each response carries the x-rate-limit headers of a budget of
+    rate_limit requests per rate_limit_window seconds, and requests over
+    it get a 429. Requests can be delayed by latency seconds, and failed
+    with the statuses of errors, returned by the first requests, or at
+    random with error_rate.
+
+    Parameters:
+    -----------
+    responses : string, dict or None
+        The path of a recorded search response, or the response itself,
+        to replay. Default is None which synthesizes the tweets
+    window_tweets : int
+        The number of tweets synthesized for each time window.
+        Default is 1000
+    latency : float
+        The seconds each request waits before its response. Default is 0.0
+    rate_limit : int or None
+        The number of requests allowed in each rate limit window.
+        Default is None which never limits the requests
+    rate_limit_window : float
+        The seconds of each rate limit window. Default is 900
+    errors : list of int
+        The statuses returned by the first requests, in order.
+        Default is None
+    error_rate : float
+        The share of the other requests failing with a 503.
+        Default is 0.0
+    seed : int
+        Seed of the synthesized tweets and the random errors. Default is 0
+    host : string
+        The address the server listens on. Default is '127.0.0.1'
+    port : int
+        The port the server listens on. Default is 0 which picks a free
+        port, see base_url
+
+    Examples
+    --------
+    >>> with MockTwitterServer("output/tweets_response.json", latency=0.05) as server:
+            get_store("token", "vancouver", "2022-01-20", "2022-01-29",
+                      api_access_lvl="academic", base_url=server.base_url)
+    """
+
+    def __init__(
+        self,
+        responses=None,
+        window_tweets=1000,
+        latency=0.0,
+        rate_limit=None,
+        rate_limit_window=900,
+        errors=None,
+        error_rate=0.0,
+        seed=0,
+        host="127.0.0.1",
+        port=0,
+    ):
+        if isinstance(responses, str):
+            with open(responses) as file:
+                responses = json.load(file)
+        self.responses = responses
+        self.window_tweets = window_tweets
+        self.latency = latency
+        self.rate_limit = rate_limit
+        self.rate_limit_window = rate_limit_window
+        self.errors = list(errors or [])
+        self.error_rate = error_rate
+        self.seed = seed
+        self.requests = []
+        self.status_counts = {}
+        self._rng = np.random.default_rng(seed)
+        self._generators = {}
+        self._ranges = {}
+        self._reset = None
+        self._remaining = None
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), _SearchHandler)
+        self._server.daemon_threads = True
+        self._server.mock = self
+        self._thread = None
+
+    @property
+    def base_url(self):
+        """The url to pass as the base_url of get_store."""
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        """Starts serving requests in a background thread."""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+            self._thread.start()
+        return self
+
+    def serve_forever(self):
+        """Serves requests in the calling thread until interrupted."""
+        self._server.serve_forever()
+
+    def close(self):
+        """Stops the server."""
+        if self._thread is not None:
+            self._server.shutdown()
+            self._thread = None
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *args):
+        self.close()
+
+    def respond(self, path, params, headers):
+        """
+        Returns the status, headers and json body of the response to a
+        search request.
+
+        Parameters:
+        -----------
+        path : string
+            The path of the request.
+        params : dict
+            The query parameters of the request.
+        headers : dict
+            The headers of the request.
+
+        Returns:
+        --------
+        response : tuple
+            The status code, the response headers and the body.
+        """
+        with self._lock:
+            self.requests.append(params)
+            now = time.time()
+            if self._reset is None or now >= self._reset:
+                self._reset = now + self.rate_limit_window
+                self._remaining = self.rate_limit
+            rate_headers = {"x-rate-limit-reset": f"{self._reset:.3f}"}
+            limited = False
+            if self.rate_limit is not None:
+                # the request using the last of the budget is still served
+                limited = self._remaining == 0
+                if not limited:
+                    self._remaining -= 1
+                rate_headers["x-rate-limit-limit"] = str(self.rate_limit)
+                rate_headers["x-rate-limit-remaining"] = str(self._remaining)
+            if path not in SEARCH_PATHS:
+                status = 404
+            elif not headers.get("Authorization", "").startswith("Bearer "):
+                status = 401
+            elif self.errors:
+                status = self.errors.pop(0)
+            elif limited:
+                status = 429
+            elif self.error_rate and self._rng.random() < self.error_rate:
+                status = 503
+            else:
+                status = 200
+            self.status_counts[status] = self.status_counts.get(status, 0) + 1
+        if self.latency:
+            time.sleep(self.latency)
+
+        if status != 200:
+            body = {"title": _TITLES.get(status, "Error"), "status": status}
+            return status, rate_headers, body
+        return status, rate_headers, self._search(params)
+
+    def _search(self, params):
+        """Returns the page of tweets of a search request."""
+        page_size = int(params.get("max_results", 10))
+        offset = int(params.get("next_token", 0))
+        if self.responses is not None:
+            tweets = [
+                tweet for tweet in self.responses.get("data", []) if _matches(tweet, params)
+            ]
+            page = tweets[offset : offset + page_size]
+            authors = {tweet.get("author_id") for tweet in page}
+            users = [
+                user
+                for user in self.responses.get("includes", {}).get("users", [])
+                if user["id"] in authors
+            ]
+            response = {"data": page, "includes": {"users": users}}
+            total = len(tweets)
+        else:
+            generator = self._generator(params.get("query", ""), params.get("end_time"))
+            first, last = self._range(generator, params)
+            size = max(0, min(page_size, last - first - offset))
+            response = next(
+                generator.pages(size, page_size=max(size, 1), start=first + offset), None
+            )
+            response = response or {"data": []}
+            total = last - first
+        page = response["data"]
+        meta = {"result_count": len(page)}
+        if page:
+            meta["newest_id"], meta["oldest_id"] = page[0]["id"], page[-1]["id"]
+        if offset + len(page) < total and page:
+            meta["next_token"] = str(offset + len(page))
+        response["meta"] = meta
+        if not page:
+            del response["data"]
+        return response
+
+    def _generator(self, query, end_time):
+        """Returns the generator of the tweets of a time window."""
+        key = (query, end_time)
+        with self._lock:
+            if key not in self._generators:
+                start_time = datetime(2022, 1, 28, 23, 59, 59)
+                if end_time:
+                    start_time = datetime.strptime(end_time, _API_TIME_FORMAT)
+                keyword = query.split()[0] if query.split() else "vancouver"
+                self._generators[key] = TweetGenerator(
+                    keyword=keyword, start_time=start_time, seed=self.seed
+                )
+            return self._generators[key]
+
+    def _range(self, generator, params):
+        """Returns the positions of the first and past the last synthesized
+        tweet of a time window matching a search. The tweets go from the
+        newest to the oldest, so the matching ones follow each other."""
+        key = tuple(
+            params.get(name)
+            for name in ["query", "end_time", "start_time", "since_id", "until_id"]
+        )
+        with self._lock:
+            if key in self._ranges:
+                return self._ranges[key]
+
+        def tweet(position):
+            return next(generator.pages(1, page_size=1, start=position))["data"][0]
+
+        first, last = 0, self.window_tweets
+        if params.get("until_id"):
+            # skip the tweets newer than until_id
+            until_id = int(params["until_id"])
+            first = _bisect(lambda position: int(tweet(position)["id"]) < until_id, 0, last)
+        if params.get("since_id") or params.get("start_time"):
+            # stop at the tweets older than since_id or start_time
+            last = _bisect(
+                lambda position: not _matches(tweet(position), params), first, last
+            )
+        with self._lock:
+            self._ranges[key] = first, last
+        return first, last
+
+
+def _matches(tweet, params):
+    """Returns whether a tweet is within the since_id, until_id and
+    start_time of a search."""
+    tweet_id = int(tweet["id"])
+    if params.get("since_id") and tweet_id <= int(params["since_id"]):
+        return False
+    if params.get("until_id") and tweet_id >= int(params["until_id"]):
+        return False
+    start_time = params.get("start_time")
+    if start_time and tweet.get("created_at") and tweet["created_at"] < start_time:
+        return False
+    return True
+
+
+def _bisect(predicate, low, high):
+    """Returns the first position from low to high where predicate holds,
+    which then holds up to high, or high when it never holds."""
+    while low < high:
+        middle = (low + high) // 2
+        if predicate(middle):
+            high = middle
+        else:
+            low = middle + 1
+    return low
+
+
+_TITLES = {
+    401: "Unauthorized",
+    404: "Not Found",
+    429: "Too Many Requests",
+    500: "Internal Server Error",
+    503: "Service Unavailable",
+}
+
+
+class _SearchHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        url = urlparse(self.path)
+        params = {key: values[0] for key, values in parse_qs(url.query).items()}
+        status, headers, body = self.server.mock.respond(url.path, params, self.headers)
+        content = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(content)))
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(content)
+
+    def log_message(self, *args):
+        pass
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--replay", help="path of a recorded search response to replay")
+    parser.add_argument("--window-tweets", type=int, default=1000)
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--rate-limit", type=int)
+    parser.add_argument("--rate-limit-window", type=float, default=900)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    args = parser.parse_args(argv)
+
+    server = MockTwitterServer(
+        args.replay,
+        window_tweets=args.window_tweets,
+        latency=args.latency,
+        rate_limit=args.rate_limit,
+        rate_limit_window=args.rate_limit_window,
+        error_rate=args.error_rate,
+        seed=args.seed,
+        host=args.host,
+        port=args.port,
+    )
+    print(f"serving the search endpoints at {server.base_url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+"""Writing and lazily reading newline-delimited json (NDJSON) files, one
+record per line."""
+
+# imports
+import json
+
+import pandas as pd
+
+JSON_FORMATS = ["json", "ndjson"]
+
+
+def check_json_format(json_format):
+    """Raises an error when ``json_format`` is not a supported format."""
+    if json_format not in JSON_FORMATS:
+        raise ValueError(
+            "Invalid parameter input value: json_format must be of either string json or ndjson"
+        )
+
+
+class NDJSONWriter:
+    """
+    Writes records to a NDJSON file as they come, so the document is never
+    built in memory and each record is decoded once by the readers.
+
+    Parameters:
+    -----------
+    file_path : string
+        Path of the .ndjson file, replaced if it exists.
+
+    Examples
+    --------
+    >>> with NDJSONWriter("output/all_tweets.ndjson") as writer:
+            for df in chunks:
+                writer.write_frame(df)
+    """
+
+    def __init__(self, file_path):
+        self.file_path = file_path
+        self._file = open(file_path, "w")
+
+    def write(self, record):
+        """Writes one record, a json serializable dictionary."""
+        self._file.write(json.dumps(record, sort_keys=True) + "\n")
+
+    def write_frame(self, df):
+        """Writes each row of a dataframe as a record."""
+        if len(df):
+            self._file.write(df.to_json(orient="records", lines=True).rstrip("\n") + "\n")
+
+    def close(self):
+        """Closes the file."""
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+def write_ndjson(data, file_path):
+    """
+    Writes the rows of a dataframe, or a list of records, to a NDJSON file.
+
+    Parameters:
+    -----------
+    data : dataframe or list of dict
+        The records to write.
+    file_path : string
+        Path of the .ndjson file.
+    """
+    with NDJSONWriter(file_path) as writer:
+        if isinstance(data, pd.DataFrame):
+            writer.write_frame(data)
+        else:
+            for record in data:
+                writer.write(record)
+
+
+def iter_ndjson(file_path):
+    """
+    Reads the records of a NDJSON file one line at a time.
+
+    Parameters:
+    -----------
+    file_path : string
+        Path of the .ndjson file.
+
+    Returns:
+    --------
+    records : iterator of dict
+        The records, decoded as they are read.
+
+    Examples
+    --------
+    >>> for tweet in iter_ndjson("output/tweets_response.ndjson"):
+            print(tweet["text"])
+    """
+    with open(file_path) as file:
+        for line in file:
+            if line.strip():
+                yield json.loads(line)
+
+
+def read_ndjson(file_path, chunksize=None):
+    """
+    Reads a NDJSON file as a dataframe, one column per key.
+
+    Parameters:
+    -----------
+    file_path : string
+        Path of the .ndjson file.
+    chunksize : int or None
+        Read the file lazily in dataframes of chunksize records.
+        Default is None which reads the whole file.
+
+    Returns:
+    --------
+    df : dataframe or iterator of dataframes
+        The records of the file.
+
+    Examples
+    --------
+    >>> read_ndjson("output/top_tweets.ndjson")
+    """
+    return pd.read_json(
+        file_path, orient="records", lines=True, chunksize=chunksize, dtype=False
+    )
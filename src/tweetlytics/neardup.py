@@ -0,0 +1,234 @@
+"""Clustering of near-duplicate tweets, such as spam and copypasta, with
+MinHash signatures and locality-sensitive hashing."""
+
+# imports
+import itertools
+
+import numpy as np
+import pandas as pd
+
+from tweetlytics.dedup import DuplicateGroups
+from tweetlytics.storage import load_table
+
+# the hash functions are (a * x + b) mod the Mersenne prime 2**31 - 1,
+# whose products fit in 64 bits and values in 32 bits
+_PRIME = np.uint64((1 << 31) - 1)
+
+# largest number of token hashes gathered at a time
+_BLOCK_SIZE = 1 << 24
+
+
+def minhash_signatures(tokens, num_perm=128, seed=1):
+    """
+    Computes the MinHash signature of the token set of each tweet: the
+    minimum of each of num_perm random hash functions over its tokens.
+    The share of equal values in the signatures of two tweets estimates
+    the Jaccard similarity of their token sets.
+
+    Parameters:
+    -----------
+    tokens : Series or list of list of string
+        The tokens of each tweet.
+    num_perm : int
+        The number of hash functions. Default is 128
+    seed : int
+        Seed of the hash functions. Default is 1
+
+    Returns:
+    --------
+    signatures : array of uint32
+        One row of num_perm values per tweet. Tweets without tokens have
+        the largest value everywhere.
+    """
+    token_lists = [
+        value if isinstance(value, (list, tuple, np.ndarray)) else []
+        for value in tokens
+    ]
+    lengths = np.fromiter(map(len, token_lists), dtype=np.int64, count=len(token_lists))
+    flat = np.array(list(itertools.chain.from_iterable(token_lists)), dtype=object)
+    # hash the strings themselves, so signatures of separate calls agree,
+    # once per distinct token
+    codes, uniques = pd.factorize(flat)
+    hashes = pd.util.hash_array(np.asarray(uniques, dtype=object)) % _PRIME
+
+    rng = np.random.default_rng(seed)
+    a = rng.integers(1, _PRIME, size=num_perm, dtype=np.uint64)
+    b = rng.integers(0, _PRIME, size=num_perm, dtype=np.uint64)
+
+    signatures = np.full((len(token_lists), num_perm), _PRIME, dtype=np.uint32)
+    nonempty = lengths > 0
+    if not nonempty.any():
+        return signatures
+    starts = (np.cumsum(lengths) - lengths)[nonempty]
+    step = max(1, min(num_perm, _BLOCK_SIZE // len(codes)))
+    for start in range(0, num_perm, step):
+        block = slice(start, start + step)
+        token_hashes = ((hashes[:, None] * a[block] + b[block]) % _PRIME).astype(np.uint32)
+        signatures[nonempty, block] = np.minimum.reduceat(
+            token_hashes[codes], starts, axis=0
+        )
+    return signatures
+
+
+def lsh_parameters(threshold, num_perm):
+    """
+    Chooses the number of bands and of rows per band of the LSH index, so
+    that two tweets are likely to share a band from the threshold Jaccard
+    similarity on: the similarity (1 / bands) ** (1 / rows) at which the
+    probability rises fastest is the closest to the threshold.
+
+    Parameters:
+    -----------
+    threshold : float
+        The Jaccard similarity of near-duplicates.
+    num_perm : int
+        The number of values of the signatures.
+
+    Returns:
+    --------
+    parameters : tuple of int
+        The number of bands and of rows per band.
+    """
+    candidates = [
+        (bands, num_perm // bands) for bands in range(1, num_perm + 1)
+    ]
+    return min(
+        candidates,
+        key=lambda parameters: abs(
+            (1 / parameters[0]) ** (1 / parameters[1]) - threshold
+        ),
+    )
+
+
+def near_duplicate_clusters(tokens, threshold=0.8, num_perm=128, seed=1):
+    """
+    Clusters the tweets whose token sets are near-duplicates.
+
+    The MinHash signature of each tweet is cut into bands, and the tweets
+    with the same values in a band fall into the same bucket of the LSH
+    index, so only the tweets sharing a bucket are compared, in time
+    proportional to the number of tweets instead of its square. A tweet
+    is linked to the first tweet of its bucket when their signatures
+    estimate a Jaccard similarity of at least threshold, and the clusters
+    are the connected components of the links.
+
+    Parameters:
+    -----------
+    tokens : Series or list of list of string
+        The tokens of each tweet.
+    threshold : float
+        The Jaccard similarity from which two tweets are near-duplicates.
+        Default is 0.8
+    num_perm : int
+        The number of hash functions of the signatures, more are slower
+        but estimate the similarity better. Default is 128
+    seed : int
+        Seed of the hash functions. Default is 1
+
+    Returns:
+    --------
+    clusters : array of int
+        The cluster of each tweet, numbered from 0 in the order of the
+        first tweet of each cluster. Tweets without tokens are alone in
+        their cluster.
+
+    Examples
+    --------
+    >>> near_duplicate_clusters(df["tokens"], threshold=0.7)
+    """
+    signatures = minhash_signatures(tokens, num_perm, seed)
+    nonempty = signatures[:, 0] != _PRIME
+    bands, rows = lsh_parameters(threshold, num_perm)
+
+    sources, targets = [], []
+    for band in range(bands):
+        columns = signatures[:, band * rows : (band + 1) * rows]
+        keys = pd.util.hash_pandas_object(pd.DataFrame(columns), index=False)
+        groups = DuplicateGroups.from_values(keys)
+        first = groups.first[groups.codes]
+        linked = np.flatnonzero(nonempty & (first != np.arange(len(first))))
+        # drop the candidates whose whole signatures are not similar enough
+        similarity = (signatures[linked] == signatures[first[linked]]).mean(axis=1)
+        similar = similarity >= threshold
+        sources.append(linked[similar])
+        targets.append(first[linked][similar])
+
+    labels = _connected_components(
+        len(signatures), np.concatenate(sources), np.concatenate(targets)
+    )
+    return pd.factorize(labels)[0]
+
+
+def _connected_components(size, sources, targets):
+    """Labels each node with the smallest node of its connected component,
+    by hooking linked labels onto the smaller one and pointer jumping."""
+    labels = np.arange(size)
+    while True:
+        source_labels, target_labels = labels[sources], labels[targets]
+        if (source_labels == target_labels).all():
+            return labels
+        lowest = np.minimum(source_labels, target_labels)
+        np.minimum.at(labels, source_labels, lowest)
+        np.minimum.at(labels, target_labels, lowest)
+        # point every node to the root of its tree
+        while True:
+            roots = labels[labels]
+            if (roots == labels).all():
+                break
+            labels = roots
+
+
+def cluster_near_duplicates(tweets, threshold=0.8, num_perm=128, seed=1):
+    """
+    Annotates each cleaned tweet with the cluster of its near-duplicates,
+    such as the posts of a bot campaign, so that analytics can process one
+    representative per cluster with collapse_clusters.
+
+    Parameters:
+    -----------
+    tweets : str, dataframe or Arrow table
+        The cleaned tweets returned or stored by clean_tweets, with their
+        tokens.
+    threshold : float
+        The Jaccard similarity of the token sets from which two tweets
+        are near-duplicates. Default is 0.8
+    num_perm : int
+        The number of hash functions of the MinHash signatures.
+        Default is 128
+    seed : int
+        Seed of the hash functions. Default is 1
+
+    Returns:
+    --------
+    df : dataframe
+        The tweets with a cluster_id column, numbering the clusters from
+        0, and a cluster_size column with the number of tweets of the
+        cluster.
+
+    Examples
+    --------
+    >>> clusters = cluster_near_duplicates(clean_tweets(tweets))
+    >>> analytics(clusters, collapse_clusters=True, store_path="output")
+    """
+    if not isinstance(threshold, float):
+        raise TypeError(
+            "Invalid parameter input type: threshold must be entered as a float"
+        )
+    if not 0 < threshold <= 1:
+        raise ValueError(
+            "Invalid parameter input value: threshold must be between 0 and 1"
+        )
+    if not isinstance(num_perm, int):
+        raise TypeError(
+            "Invalid parameter input type: num_perm must be entered as an integer"
+        )
+    if num_perm < 1:
+        raise ValueError(
+            "Invalid parameter input value: num_perm must be a positive integer"
+        )
+
+    df = load_table(tweets, list_columns=["tokens", "hashtags"])
+    clusters = near_duplicate_clusters(df["tokens"], threshold, num_perm, seed)
+    df["cluster_id"] = clusters
+    df["cluster_size"] = np.bincount(clusters, minlength=1)[clusters]
+    return df
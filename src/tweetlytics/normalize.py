@@ -0,0 +1,130 @@
+"""Flattening of the Twitter API v2 search responses into dataframes."""
+
+# imports
+import numpy as np
+import pandas as pd
+
+# columns of the dataframe built from the search responses
+RESPONSE_COLUMNS = [
+    "reply_settings",
+    "referenced_tweets",
+    "id",
+    "created_at",
+    "text",
+    "public_metrics",
+    "author_id",
+    "source",
+    "conversation_id",
+    "lang",
+    "in_reply_to_user_id",
+    "retweetcount",
+    "reply_count",
+    "like_count",
+    "quote_count",
+    "reference_type",
+    "reference_id",
+    "keyword",
+    "author_username",
+    "author_name",
+    "author_verified",
+    "author_followers_count",
+]
+
+_TWEET_FIELDS = [
+    "reply_settings",
+    "id",
+    "created_at",
+    "text",
+    "public_metrics",
+    "author_id",
+    "source",
+    "conversation_id",
+    "lang",
+    "in_reply_to_user_id",
+]
+
+# public_metrics key of each metric column
+_METRIC_COLUMNS = {
+    "retweetcount": "retweet_count",
+    "reply_count": "reply_count",
+    "like_count": "like_count",
+    "quote_count": "quote_count",
+}
+
+_USER_COLUMNS = {
+    "username": "author_username",
+    "name": "author_name",
+    "verified": "author_verified",
+    "followers_count": "author_followers_count",
+}
+
+
+def normalize_tweets(data, keyword, users=None):
+    """
+    Flattens the tweets of a search response into a dataframe, one row per
+    referenced tweet, with the public metrics, the reference and the author
+    expanded into separate columns.
+
+    The tweets are processed column by column: each nested field is pulled
+    out in a single pass and expanded with whole-column operations instead
+    of building a Series per row.
+
+    Parameters:
+    -----------
+    data : list of dict
+        The ``data`` of one or more search responses.
+    keyword : string
+        The searched keyword, added as the keyword column.
+    users : list of dict or None
+        The ``includes.users`` expansion of the responses. Default is None
+        which leaves the author columns empty.
+
+    Returns:
+    --------
+    tweets_df : dataframe
+        A dataframe with RESPONSE_COLUMNS as columns.
+
+    Examples
+    --------
+    >>> response = tweet_response.json()
+    >>> normalize_tweets(response["data"], "vancouver", response["includes"]["users"])
+    """
+    columns = {field: [tweet.get(field) for tweet in data] for field in _TWEET_FIELDS}
+
+    # expand public_metrics into separate columns
+    metrics = pd.DataFrame.from_records(
+        [metric or {} for metric in columns["public_metrics"]],
+        columns=list(_METRIC_COLUMNS.values()),
+    )
+    for column, key in _METRIC_COLUMNS.items():
+        columns[column] = metrics[key].to_numpy()
+
+    # one row per referenced tweet, tweets without one reference themselves
+    references = [
+        tweet.get("referenced_tweets") or [{"type": "original", "id": tweet["id"]}]
+        for tweet in data
+    ]
+    repeats = np.fromiter(map(len, references), dtype=np.int64, count=len(references))
+    tweets_df = pd.DataFrame(columns).take(np.repeat(np.arange(len(data)), repeats))
+    tweets_df = tweets_df.reset_index(drop=True)
+
+    flat_references = [reference for tweet_references in references for reference in tweet_references]
+    tweets_df["referenced_tweets"] = flat_references
+    tweets_df["reference_type"] = [reference.get("type") for reference in flat_references]
+    tweets_df["reference_id"] = [reference.get("id") for reference in flat_references]
+
+    # add searched keyword titles to dataframe
+    tweets_df["keyword"] = keyword
+
+    # add the author of each tweet from the users expansion
+    if users:
+        users_df = pd.DataFrame.from_records(users, columns=["id", "username", "name", "verified"])
+        users_df["followers_count"] = [
+            (user.get("public_metrics") or {}).get("followers_count") for user in users
+        ]
+        users_df = users_df.drop_duplicates("id").set_index("id")
+        authors = users_df.reindex(tweets_df["author_id"])
+        for column, author_column in _USER_COLUMNS.items():
+            tweets_df[author_column] = authors[column].to_numpy()
+
+    return tweets_df.reindex(columns=RESPONSE_COLUMNS)
@@ -0,0 +1,99 @@
+"""Splitting the rows of a dataframe, or independent tasks, across a pool
+of worker processes."""
+
+# imports
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+# partitions handed to each worker, so that a slow partition does not
+# leave the other workers idle
+_PARTITIONS_PER_WORKER = 4
+
+
+class PartitionPool:
+    """
+    Applies a function to partitions of the rows of dataframes in a pool
+    of worker processes and merges the results in the order of the rows.
+    With a single worker, the function runs in the calling process.
+
+    Parameters:
+    -----------
+    workers : int
+        The number of worker processes. Default is 1
+
+    Examples
+    --------
+    >>> with PartitionPool(8) as pool:
+            polarity = pool.map(sentiment_polarity, df["text"])
+    """
+
+    def __init__(self, workers=1):
+        self.workers = workers
+        self._executor = None
+        if workers > 1:
+            self._executor = ProcessPoolExecutor(max_workers=workers)
+
+    def map(self, func, data):
+        """
+        Applies ``func`` to consecutive partitions of the rows of ``data``
+        and concatenates the results.
+
+        Parameters:
+        -----------
+        func : callable
+            Takes a partition of data and returns a dataframe or series. It
+            must be picklable, i.e. a function defined at the top level of
+            a module or a functools.partial of one.
+        data : dataframe or Series
+            The rows to process.
+
+        Returns:
+        --------
+        result : dataframe or Series
+            The results of every partition, with their index.
+        """
+        if self._executor is None or len(data) < 2:
+            return func(data)
+
+        n_partitions = min(len(data), self.workers * _PARTITIONS_PER_WORKER)
+        partitions = [
+            data.iloc[positions]
+            for positions in np.array_split(np.arange(len(data)), n_partitions)
+        ]
+        return pd.concat(list(self._executor.map(func, partitions)))
+
+    def run(self, tasks):
+        """
+        Runs independent calls, one per worker at a time, and returns
+        their results in order.
+
+        Parameters:
+        -----------
+        tasks : list of callable
+            The calls, taking no argument. They must be picklable, such as
+            functools.partial of functions defined at the top level of a
+            module.
+
+        Returns:
+        --------
+        results : list
+            The result of each task.
+        """
+        if self._executor is None:
+            return [task() for task in tasks]
+        futures = [self._executor.submit(task) for task in tasks]
+        return [future.result() for future in futures]
+
+    def close(self):
+        """Shuts the worker processes down."""
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
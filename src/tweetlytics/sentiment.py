@@ -0,0 +1,357 @@
+"""Sentiment scoring of the text of tweets."""
+
+# imports
+import collections
+import functools
+import hashlib
+import itertools
+import sqlite3
+
+import numpy as np
+import pandas as pd
+
+# number of keys looked up in the on-disk cache per query
+_SQLITE_BATCH = 500
+
+# words reversing the polarity of the following word, as in TextBlob
+_NEGATIONS = ["no", "not", "n't", "never"]
+
+
+def sentiment_polarity(texts):
+    """
+    Scores the sentiment of each text with TextBlob.
+
+    Parameters:
+    -----------
+    texts : Series
+        The texts to score.
+
+    Returns:
+    --------
+    polarity : Series
+        The polarity of each text, from -1 (negative) to 1 (positive),
+        with the index of texts.
+
+    Examples
+    --------
+    >>> sentiment_polarity(df["text"])
+    """
+    from textblob import TextBlob
+
+    return texts.map(lambda x: TextBlob(x).sentiment.polarity)
+
+
+def lexicon_polarity(texts):
+    """
+    Scores the sentiment of each text with the polarity lexicon of
+    TextBlob, for the whole batch of texts at once.
+
+    The texts are split on whitespace and every word is mapped to an
+    integer id of the lexicon. As in TextBlob, the polarity of a text is
+    the average polarity of its lexicon words, where a word following a
+    modifier (such as "very") is merged with it and scaled by its
+    intensity, and a word following a negation is multiplied by -0.5.
+    These rules are applied with array operations over all the words of
+    the batch instead of a loop over the words of each text, so unlike
+    TextBlob, modifiers and negations only apply to the word right after
+    them, and punctuation, exclamation marks and emoticons are ignored.
+    On cleaned tweets, the polarity matches TextBlob's in the vast
+    majority of cases, see ``sentiment_agreement``.
+
+    Parameters:
+    -----------
+    texts : Series
+        The texts to score.
+
+    Returns:
+    --------
+    polarity : Series
+        The polarity of each text, from -1 (negative) to 1 (positive),
+        with the index of texts.
+
+    Examples
+    --------
+    >>> lexicon_polarity(df["text"])
+    """
+    words, polarity, intensity, modifier = _load_lexicon()
+    split_texts = [text.lower().split() for text in texts]
+    lengths = np.fromiter(map(len, split_texts), dtype=np.int64, count=len(split_texts))
+    tokens = list(itertools.chain.from_iterable(split_texts))
+    text_ids = np.repeat(np.arange(len(split_texts)), lengths)
+
+    ids = words.get_indexer(tokens)
+    known = ids >= 0
+    ids = np.where(known, ids, 0)
+    word_polarity = np.where(known, polarity[ids], 0.0)
+    word_intensity = intensity[ids]
+    is_negation = pd.Index(_NEGATIONS).get_indexer(tokens) >= 0
+
+    # whether the previous token belongs to the same text
+    has_previous = np.zeros(len(tokens), dtype=bool)
+    has_previous[1:] = text_ids[1:] == text_ids[:-1]
+
+    def previous(values, fill):
+        shifted = np.full(len(values), fill, dtype=values.dtype)
+        shifted[1:] = values[:-1]
+        return np.where(has_previous, shifted, fill)
+
+    # a known word following a modifier joins its assessment, the others
+    # start a new one
+    merged = known & previous(known & modifier[ids], False)
+    start = known & ~merged
+    negated = start & previous(is_negation, False)
+
+    # a negation inverts the intensity the next word is scaled by
+    scale = previous(np.where(negated, 1.0 / word_intensity, word_intensity), 1.0)
+    word_polarity = np.where(merged, np.clip(word_polarity * scale, -1.0, 1.0), word_polarity)
+
+    # the last word of each assessment gives its polarity
+    end = known.copy()
+    end[:-1] &= ~merged[1:]
+    assessment = np.cumsum(start) - 1
+    word_polarity = np.where(
+        negated[np.flatnonzero(start)][assessment] if start.any() else False,
+        word_polarity * -0.5,
+        word_polarity,
+    )
+
+    totals = np.bincount(text_ids[end], weights=word_polarity[end], minlength=len(split_texts))
+    counts = np.bincount(text_ids[end], minlength=len(split_texts))
+    return pd.Series(totals / np.maximum(counts, 1), index=texts.index)
+
+
+@functools.lru_cache(maxsize=None)
+def _load_lexicon():
+    """Loads the single word entries of the TextBlob polarity lexicon as an
+    index of words with arrays of their polarity, intensity and whether
+    they modify the following word."""
+    from textblob.en import sentiment as lexicon
+
+    entries = {
+        word: lexicon[word] for word in lexicon.keys() if " " not in word
+    }
+    words = pd.Index(list(entries))
+    polarity = np.array([entry[None][0] for entry in entries.values()])
+    intensity = np.array([entry[None][2] for entry in entries.values()])
+    modifier = np.array(["RB" in entry for entry in entries.values()])
+    return words, polarity, intensity, modifier
+
+
+# scorers of the sentiment_backend options
+SENTIMENT_BACKENDS = {"textblob": sentiment_polarity, "lexicon": lexicon_polarity}
+
+
+def sentiment_type(polarity):
+    """Returns 'positive', 'negative' or 'neutral' for each polarity of a
+    Series."""
+    return pd.Series(
+        np.select([polarity > 0, polarity < 0], ["positive", "negative"], "neutral"),
+        index=polarity.index,
+    )
+
+
+def sentiment_agreement(texts, backend="lexicon"):
+    """
+    Compares the polarity of a sentiment backend with TextBlob's.
+
+    Parameters:
+    -----------
+    texts : Series
+        The texts to score, typically a sample of cleaned tweets.
+    backend : string
+        The backend compared with 'textblob'. Default is 'lexicon'
+
+    Returns:
+    --------
+    report : dict
+        The number of texts, the fraction with the same polarity (within
+        1e-9) and with the same sentiment type, the mean absolute
+        difference and the correlation of the polarities.
+
+    Examples
+    --------
+    >>> sentiment_agreement(df["text"].sample(10000))
+    """
+    expected = sentiment_polarity(texts)
+    actual = SENTIMENT_BACKENDS[backend](texts)
+    difference = (actual - expected).abs()
+    return {
+        "texts": len(texts),
+        "same_polarity": float((difference < 1e-9).mean()),
+        "same_sentiment_type": float(
+            (sentiment_type(actual) == sentiment_type(expected)).mean()
+        ),
+        "mean_absolute_difference": float(difference.mean()),
+        "correlation": float(actual.corr(expected)),
+    }
+
+
+def text_key(text):
+    """Returns the cache key of a text: a hash of the text with its
+    whitespace collapsed."""
+    return hashlib.blake2b(" ".join(text.split()).encode(), digest_size=16).digest()
+
+
+class SentimentCache:
+    """
+    Remembers the sentiment polarity of the texts it has scored, so that
+    repeated texts, such as the retweets of a tweet, are scored once.
+
+    Polarities are kept in an in-memory LRU and, when ``path`` is given,
+    in a sqlite file that persists across runs. Texts are identified by a
+    hash of their content with the whitespace collapsed.
+
+    Parameters:
+    -----------
+    max_size : int
+        The number of polarities kept in memory. Default is 100000
+    path : string or None
+        Path of the sqlite file of the on-disk cache. Default is None
+        which keeps the cache in memory only
+    max_disk_size : int
+        The number of polarities kept in the sqlite file, the least
+        recently used ones are evicted beyond it. Default is 10000000
+
+    Examples
+    --------
+    >>> with SentimentCache(path="output/sentiment_cache.sqlite") as cache:
+            analytics("output/clean_tweets.csv", sentiment_cache=cache)
+    """
+
+    def __init__(self, max_size=100000, path=None, max_disk_size=10000000):
+        self.max_size = max_size
+        self.max_disk_size = max_disk_size
+        self.hits = 0
+        self.misses = 0
+        self._memory = collections.OrderedDict()
+        self._connection = None
+        if path is not None:
+            self._connection = sqlite3.connect(path)
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS sentiment "
+                "(key BLOB PRIMARY KEY, polarity REAL, used INTEGER)"
+            )
+            self._connection.execute(
+                "CREATE INDEX IF NOT EXISTS sentiment_used ON sentiment (used)"
+            )
+            self._connection.commit()
+            # each lookup marks the rows it reads with the next value of a clock
+            self._clock = self._connection.execute(
+                "SELECT COALESCE(MAX(used), 0) FROM sentiment"
+            ).fetchone()[0]
+
+    def score(self, texts, scorer=sentiment_polarity):
+        """
+        Returns the polarity of each text, scoring only the texts missing
+        from the cache.
+
+        Parameters:
+        -----------
+        texts : Series
+            The texts to score.
+        scorer : callable
+            Scores a Series of texts, called once with every missing text.
+            Default is sentiment_polarity
+
+        Returns:
+        --------
+        polarity : Series
+            The polarity of each text, with the index of texts.
+        """
+        unique_texts = pd.unique(texts)
+        keys = [text_key(text) for text in unique_texts]
+        polarities = self._get(keys)
+
+        # position of the first text of each key, texts differing only in
+        # whitespace are scored once
+        first = {}
+        for i, key in enumerate(keys):
+            first.setdefault(key, i)
+        missing = [i for key, i in first.items() if key not in polarities]
+        self.hits += len(first) - len(missing)
+        self.misses += len(missing)
+        if missing:
+            scores = scorer(pd.Series(unique_texts[missing], dtype=object)).to_list()
+            new = {keys[i]: score for i, score in zip(missing, scores)}
+            self._put(new)
+            polarities.update(new)
+
+        text_polarities = dict(zip(unique_texts, [polarities[key] for key in keys]))
+        return texts.map(text_polarities).astype(float)
+
+    def _get(self, keys):
+        """Looks keys up in memory, then on disk."""
+        found = {}
+        on_disk = []
+        for key in keys:
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                found[key] = self._memory[key]
+            else:
+                on_disk.append(key)
+
+        if self._connection is not None and on_disk:
+            from_disk = {}
+            for start in range(0, len(on_disk), _SQLITE_BATCH):
+                batch = on_disk[start : start + _SQLITE_BATCH]
+                rows = self._connection.execute(
+                    "SELECT key, polarity FROM sentiment WHERE key IN (%s)"
+                    % ",".join("?" * len(batch)),
+                    batch,
+                )
+                from_disk.update(rows)
+            self._remember(from_disk)
+            found.update(from_disk)
+
+        if self._connection is not None and found:
+            # mark the rows as recently used for the eviction of later runs
+            self._clock += 1
+            self._connection.executemany(
+                "UPDATE sentiment SET used = ? WHERE key = ?",
+                [(self._clock, key) for key in found],
+            )
+            self._connection.commit()
+        return found
+
+    def _put(self, polarities):
+        """Stores new polarities in memory and on disk."""
+        self._remember(polarities)
+        if self._connection is None:
+            return
+        self._clock += 1
+        self._connection.executemany(
+            "INSERT OR REPLACE INTO sentiment VALUES (?, ?, ?)",
+            [(key, polarity, self._clock) for key, polarity in polarities.items()],
+        )
+        excess = (
+            self._connection.execute("SELECT COUNT(*) FROM sentiment").fetchone()[0]
+            - self.max_disk_size
+        )
+        if excess > 0:
+            self._connection.execute(
+                "DELETE FROM sentiment WHERE key IN "
+                "(SELECT key FROM sentiment ORDER BY used LIMIT ?)",
+                (excess,),
+            )
+        self._connection.commit()
+
+    def _remember(self, polarities):
+        """Adds polarities to the in-memory LRU, evicting the least
+        recently used ones beyond max_size."""
+        self._memory.update(polarities)
+        for key in polarities:
+            self._memory.move_to_end(key)
+        while len(self._memory) > self.max_size:
+            self._memory.popitem(last=False)
+
+    def close(self):
+        """Closes the sqlite file."""
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
@@ -0,0 +1,163 @@
+"""Sketches counting the most frequent items of a stream in fixed memory."""
+
+# imports
+import math
+
+import pandas as pd
+
+
+class SpaceSaving:
+    """
+    Space-Saving sketch of the most frequent items of a stream.
+
+    At most ``capacity`` items are counted. When a new item arrives while
+    the sketch is full, it takes the place of the least frequent item and
+    inherits its count. Counts are never underestimated and overestimated
+    by at most the number of items seen divided by the capacity, and
+    every item more frequent than that bound is in the sketch.
+
+    Items are added in batches: each batch is counted exactly and merged
+    into the sketch, so the memory used is bounded by the capacity plus
+    the distinct items of one batch. Two sketches are merged the same way.
+
+    Parameters:
+    -----------
+    capacity : int
+        The number of items counted.
+
+    Examples
+    --------
+    >>> sketch = SpaceSaving.from_error(0.001)
+    >>> for df in chunks:
+            sketch.update(df["tokens"].explode())
+    >>> sketch.top(20)
+    """
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.total = 0
+        self.counts = pd.Series(dtype="int64")
+        self.errors = pd.Series(dtype="int64")
+
+    @classmethod
+    def from_error(cls, error):
+        """
+        Returns a sketch whose counts are overestimated by at most
+        ``error`` times the number of items seen.
+
+        Parameters:
+        -----------
+        error : float
+            The bound of the error relative to the number of items, such
+            as 0.001.
+        """
+        return cls(math.ceil(1 / error))
+
+    def update(self, items):
+        """
+        Adds items to the sketch.
+
+        Parameters:
+        -----------
+        items : Series or list
+            The items, missing values are ignored.
+        """
+        return self.update_counts(pd.Series(items, dtype=object).value_counts())
+
+    def update_counts(self, counts):
+        """
+        Adds items counted beforehand to the sketch.
+
+        Parameters:
+        -----------
+        counts : Series
+            The number of occurrences of each item, indexed by item.
+        """
+        self.total += int(counts.sum())
+        self._merge(counts, pd.Series(0, index=counts.index), 0)
+        return self
+
+    def merge(self, other):
+        """
+        Adds the items of another sketch.
+
+        Parameters:
+        -----------
+        other : SpaceSaving
+            The sketch to add.
+        """
+        self.total += other.total
+        self._merge(other.counts, other.errors, other.min_count())
+        return self
+
+    def min_count(self):
+        """Returns the count any item missing from the sketch is at most."""
+        if len(self.counts) < self.capacity:
+            return 0
+        return int(self.counts.min())
+
+    def error_bound(self):
+        """Returns the maximum overestimation of the counts."""
+        return self.total / self.capacity
+
+    def top(self, n=None):
+        """
+        Returns the most frequent items.
+
+        Parameters:
+        -----------
+        n : int or None
+            The number of items. Default is None which returns every
+            item of the sketch.
+
+        Returns:
+        --------
+        top : dataframe
+            The item, its count and the maximum overestimation of the
+            count, from the most frequent item.
+        """
+        order = self.counts.sort_values(ascending=False, kind="stable").index
+        if n is not None:
+            order = order[:n]
+        return pd.DataFrame(
+            {
+                "item": order,
+                "count": self.counts[order].to_numpy(),
+                "error": self.errors[order].to_numpy(),
+            }
+        )
+
+    def to_dict(self):
+        """Returns the sketch as a dictionary that can be stored as json."""
+        return {
+            "capacity": self.capacity,
+            "total": self.total,
+            "items": self.counts.index.to_list(),
+            "counts": self.counts.to_list(),
+            "errors": self.errors.to_list(),
+        }
+
+    @classmethod
+    def from_dict(cls, sketch):
+        """Returns the sketch stored in a dictionary by to_dict."""
+        self = cls(sketch["capacity"])
+        self.total = sketch["total"]
+        index = pd.Index(sketch["items"], dtype=object)
+        self.counts = pd.Series(sketch["counts"], index=index, dtype="int64")
+        self.errors = pd.Series(sketch["errors"], index=index, dtype="int64")
+        return self
+
+    def _merge(self, counts, errors, other_min):
+        """Adds the counts of another sketch whose missing items have at
+        most other_min occurrences, keeping the capacity largest."""
+        own_min = self.min_count()
+        index = self.counts.index.union(counts.index)
+        merged_counts = self.counts.reindex(index, fill_value=own_min) + counts.reindex(
+            index, fill_value=other_min
+        )
+        merged_errors = self.errors.reindex(index, fill_value=own_min) + errors.reindex(
+            index, fill_value=other_min
+        )
+        keep = merged_counts.nlargest(self.capacity).index
+        self.counts = merged_counts[keep].astype("int64")
+        self.errors = merged_errors[keep].astype("int64")
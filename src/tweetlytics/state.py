@@ -0,0 +1,480 @@
+"""Aggregates of the analysis of tweets that can be updated with new
+tweets, merged and stored between runs."""
+
+# imports
+import json
+import os
+
+import pandas as pd
+
+from tweetlytics.sketches import SpaceSaving
+
+# sums of each sentiment type
+_SENTIMENT_SUMS = [
+    "retweetcount",
+    "reply_count",
+    "like_count",
+    "quote_count",
+    "word_count",
+    "sentiment_polarity",
+]
+
+# columns kept for the top tweets
+_TOP_TWEET_COLUMNS = [
+    "keyword",
+    "reference_id",
+    "sum_like_retweet",
+    "text",
+    "retweetcount",
+    "like_count",
+    "hashtags",
+    "sentiment_polarity",
+    "sentiment_type",
+]
+
+# columns of the top tweets reported by analytics
+_TOP_TWEET_REPORT = [
+    "text",
+    "retweetcount",
+    "like_count",
+    "hashtags",
+    "sentiment_polarity",
+    "sentiment_type",
+]
+
+# index columns of each stored table
+_TABLE_INDEX = {
+    "sums": ["keyword"],
+    "tweet_counts": ["keyword"],
+    "sentiment_sums": ["keyword", "sentiment_type"],
+    "token_counts": ["keyword", "tokens", "sentiment_type"],
+    "top_tweets": [],
+}
+
+# stored tables holding a single column of counts
+_COUNT_TABLES = ["tweet_counts", "token_counts"]
+
+
+class AnalyticsState:
+    """
+    Running aggregates of the analysis of tweets of one or more keywords:
+    the total number of tweets, and for each keyword its number of tweets
+    and sums, the sums and number of tweets of each sentiment type, the
+    number of tweets of each token and sentiment type, and the top tweets.
+    They are computed in one grouped pass over the tweets of every
+    keyword, and reported for each keyword or over all of them.
+
+    Updating the state takes time proportional to the new tweets only,
+    and two states of different tweets can be merged, so an analysis can
+    be refreshed with new tweets without reading the previous ones.
+
+    The top tweets are the ``top_k`` referenced tweets with the most likes
+    and retweets, each with its most liked and retweeted row. Only those
+    rows are kept for each keyword, which is exact since a referenced
+    tweet whose best row drops out of the top can never come back with a
+    lower one.
+
+    With ``sketch_capacity``, the tokens of each sentiment type are
+    counted by a SpaceSaving sketch instead of exactly, so the memory
+    used does not grow with the vocabulary. Only the most frequent tokens
+    are then reported, with counts overestimated by at most the number of
+    tokens of the sentiment type divided by the capacity.
+
+    Parameters:
+    -----------
+    top_k : int
+        The number of top tweets kept. Default is 10
+    sketch_capacity : int or None
+        The number of tokens counted for each sentiment type. Default is
+        None which counts every token exactly
+
+    Examples
+    --------
+    >>> state = AnalyticsState.load("output/analytics_state.json")
+    >>> analytics(new_clean_df, state=state, store_path="output")
+    >>> state.save("output/analytics_state.json")
+    """
+
+    def __init__(self, top_k=10, sketch_capacity=None):
+        self.top_k = top_k
+        self.sketch_capacity = sketch_capacity
+        self.total_tweets = 0
+        self.sums = None
+        self.tweet_counts = None
+        self.sentiment_sums = None
+        self.token_counts = None
+        self.token_sketches = {}
+        self.top_tweets = None
+
+    def update(self, df, corpus=None, groups=None):
+        """
+        Adds tweets to the aggregates.
+
+        Parameters:
+        -----------
+        df : dataframe
+            Cleaned tweets with their sentiment_polarity and sentiment_type.
+        corpus : TokenCorpus or None
+            The tokens of the tweets of df, in the same order, counted
+            instead of the tokens column. Default is None
+        groups : DuplicateGroups or None
+            Groups of the tweets of df with the same text, whose tokens
+            are counted once and weighted by the number of tweets of the
+            group. Ignored with a corpus. Default is None
+        """
+        batch = AnalyticsState(self.top_k, self.sketch_capacity)
+        batch.total_tweets = len(df)
+
+        # group by keyword and get sums
+        batch.sums = (
+            df.drop(columns=["sentiment_polarity", "sum_like_retweet"], errors="ignore")
+            .groupby("keyword", observed=True)
+            .sum(numeric_only=True)
+        )
+        batch.tweet_counts = df.groupby("keyword", observed=True).size().sort_index()
+
+        # adding sentiment group data of each keyword
+        sentiment_groups = df.groupby(["keyword", "sentiment_type"], observed=True)
+        batch.sentiment_sums = sentiment_groups.agg(
+            {column: "sum" for column in _SENTIMENT_SUMS}
+        )
+        batch.sentiment_sums["tweet_count"] = sentiment_groups.agg(
+            {"sentiment_polarity": "count"}
+        )["sentiment_polarity"]
+
+        # adding tokens and sentiment data of each keyword
+        keys = ["keyword", "tokens", "sentiment_type"]
+        if corpus is not None:
+            token_counts = corpus.group_token_counts(
+                df[["keyword", "sentiment_type"]]
+            ).reorder_levels([1, 0, 2])
+        elif groups is not None and df["keyword"].nunique() <= 1:
+            # tweets with the same text have the same tokens and sentiment,
+            # the groups do not tell the keywords of the duplicates apart
+            token_counts = (
+                groups.representatives(df[keys])
+                .assign(multiplicity=groups.multiplicity)
+                .explode("tokens")
+                .groupby(keys, observed=True)["multiplicity"]
+                .sum()
+            )
+        else:
+            token_counts = (
+                df[keys].explode("tokens").groupby(keys, observed=True).size()
+            )
+        # groups of categoricals come in order of appearance, sort them
+        # like the groups of strings
+        token_counts = token_counts.sort_index()
+        token_counts.index.names = keys
+        if self.sketch_capacity is None:
+            batch.token_counts = token_counts
+        else:
+            for (keyword, sentiment), counts in token_counts.groupby(
+                level=["keyword", "sentiment_type"], observed=True
+            ):
+                batch.token_sketches.setdefault(keyword, {})[sentiment] = SpaceSaving(
+                    self.sketch_capacity
+                ).update_counts(counts.droplevel(["keyword", "sentiment_type"]))
+
+        # get top tweet based on sum of likes + retweets
+        candidates = df.assign(
+            sum_like_retweet=df["like_count"] + df["retweetcount"]
+        )[_TOP_TWEET_COLUMNS]
+        batch.top_tweets = _top_keyword_rows(candidates, self.top_k)
+
+        # the counts of compact tweets are int32, their sums may not fit
+        batch.sums = _widen(batch.sums.sort_index())
+        batch.sentiment_sums = _widen(batch.sentiment_sums.sort_index())
+        return self.merge(batch)
+
+    def merge(self, other):
+        """
+        Adds the aggregates of another state, of different tweets.
+
+        Parameters:
+        -----------
+        other : AnalyticsState
+            The state to add.
+
+        Returns:
+        --------
+        self : AnalyticsState
+            The merged state.
+        """
+        if other.sketch_capacity != self.sketch_capacity:
+            raise ValueError(
+                "Invalid parameter input value: states must have the same sketch_capacity"
+            )
+        self.total_tweets += other.total_tweets
+        self.sums = _add(self.sums, other.sums)
+        self.tweet_counts = _add(self.tweet_counts, other.tweet_counts)
+        self.sentiment_sums = _add(self.sentiment_sums, other.sentiment_sums)
+        self.token_counts = _add(self.token_counts, other.token_counts)
+        for keyword, sketches in other.token_sketches.items():
+            keyword_sketches = self.token_sketches.setdefault(keyword, {})
+            for sentiment, sketch in sketches.items():
+                keyword_sketches.setdefault(
+                    sentiment, SpaceSaving(self.sketch_capacity)
+                ).merge(sketch)
+        if other.top_tweets is not None:
+            candidates = other.top_tweets
+            if self.top_tweets is not None:
+                # the rows seen first come first among equal sums
+                candidates = pd.concat([self.top_tweets, candidates], ignore_index=True)
+            self.top_tweets = _top_keyword_rows(candidates, self.top_k)
+        return self
+
+    def totals(self):
+        """Returns the keyword, or the list of keywords when there are
+        several, and the total number of tweets, likes, comments and
+        retweets over every keyword."""
+        self._check_not_empty()
+        keywords = self.sums.index.tolist()
+        return {
+            "keyword": keywords[0] if len(keywords) == 1 else keywords,
+            "total_number_of_tweets": self.total_tweets,
+            "total_number_of_likes": self.sums["like_count"].sum().item(),
+            "total_number_of_comments": self.sums["reply_count"].sum().item(),
+            "total_number_of_retweets": self.sums["retweetcount"].sum().item(),
+        }
+
+    def keyword_totals(self):
+        """Returns the totals of each keyword, as returned by totals."""
+        self._check_not_empty()
+        return [
+            {
+                "keyword": keyword,
+                "total_number_of_tweets": self.tweet_counts[keyword].item(),
+                "total_number_of_likes": sums["like_count"].item(),
+                "total_number_of_comments": sums["reply_count"].item(),
+                "total_number_of_retweets": sums["retweetcount"].item(),
+            }
+            for keyword, sums in self.sums.iterrows()
+        ]
+
+    def to_frames(self, by_keyword=False):
+        """
+        Returns the analysis tables of the aggregated tweets.
+
+        Parameters:
+        -----------
+        by_keyword : Boolean
+            Report the top tweets, sentiment groups and token counts of
+            each keyword, in a keyword column, instead of over every
+            keyword. Default is False
+
+        Returns:
+        --------
+        tables : tuple of dataframes
+            The sums of each keyword, the top tweets, the aggregates of
+            each sentiment type and the number of tweets of each token and
+            sentiment type, as returned by analytics.
+        """
+        self._check_not_empty()
+        groups = ["keyword"] if by_keyword else []
+        sentiment_sums = self.sentiment_sums.groupby(
+            level=groups + ["sentiment_type"], observed=True
+        ).sum()
+        df_sentiment_group = sentiment_sums.reset_index()
+        tweet_counts = df_sentiment_group["tweet_count"]
+        if by_keyword:
+            totals = tweet_counts.groupby(df_sentiment_group["keyword"]).transform("sum")
+        else:
+            totals = sum(tweet_counts)
+        df_sentiment_group["tweet_group_percentage"] = tweet_counts / totals * 100
+
+        if self.sketch_capacity is None:
+            token_counts = self.token_counts.groupby(
+                level=groups + ["tokens", "sentiment_type"], observed=True
+            ).sum()
+        else:
+            token_counts = pd.concat(
+                {
+                    key: sketch.counts
+                    for key, sketch in sorted(self._sketches(by_keyword).items())
+                },
+                names=groups + ["sentiment_type", "tokens"],
+            ).reorder_levels(groups + ["tokens", "sentiment_type"])
+        df_tokens_sentiments = token_counts.sort_values(ascending=False).reset_index(
+            name="count"
+        )
+
+        if by_keyword:
+            df_top_tweets = self.top_tweets[["keyword"] + _TOP_TWEET_REPORT]
+        else:
+            df_top_tweets = _top_rows(self.top_tweets, self.top_k)[_TOP_TWEET_REPORT]
+        return (self.sums.copy(), df_top_tweets, df_sentiment_group, df_tokens_sentiments)
+
+    def _sketches(self, by_keyword):
+        """Returns the token sketches of each keyword and sentiment type, or
+        of each sentiment type merged over the keywords."""
+        if by_keyword:
+            return {
+                (keyword, sentiment): sketch
+                for keyword, sketches in self.token_sketches.items()
+                for sentiment, sketch in sketches.items()
+            }
+        if len(self.token_sketches) == 1:
+            return next(iter(self.token_sketches.values()))
+        merged = {}
+        for sketches in self.token_sketches.values():
+            for sentiment, sketch in sketches.items():
+                merged.setdefault(sentiment, SpaceSaving(self.sketch_capacity)).merge(sketch)
+        return merged
+
+    def to_dict(self):
+        """Returns the state as a dictionary that can be stored as json."""
+        state = {
+            "top_k": self.top_k,
+            "sketch_capacity": self.sketch_capacity,
+            "total_tweets": self.total_tweets,
+            "token_sketches": {
+                keyword: {
+                    sentiment: sketch.to_dict() for sentiment, sketch in sketches.items()
+                }
+                for keyword, sketches in self.token_sketches.items()
+            },
+        }
+        for name, index in _TABLE_INDEX.items():
+            table = getattr(self, name)
+            if table is not None:
+                if isinstance(table, pd.Series):
+                    table = table.rename("count")
+                table = table.reset_index() if index else table
+                table = table.to_dict(orient="split")
+                del table["index"]
+            state[name] = table
+        return state
+
+    @classmethod
+    def from_dict(cls, state):
+        """Returns the state stored in a dictionary by to_dict."""
+        state = _upgrade(state)
+        self = cls(state["top_k"], state["sketch_capacity"])
+        self.total_tweets = state["total_tweets"]
+        self.token_sketches = {
+            keyword: {
+                sentiment: SpaceSaving.from_dict(sketch)
+                for sentiment, sketch in sketches.items()
+            }
+            for keyword, sketches in state["token_sketches"].items()
+        }
+        for name, index in _TABLE_INDEX.items():
+            table = state[name]
+            if table is not None:
+                table = pd.DataFrame(table["data"], columns=table["columns"])
+                if index:
+                    table = table.set_index(index)
+                if name in _COUNT_TABLES:
+                    table = table["count"]
+            setattr(self, name, table)
+        return self
+
+    def save(self, file_path):
+        """
+        Writes the state to a .json file, replacing it atomically.
+
+        Parameters:
+        -----------
+        file_path : string
+            Path of the state file.
+        """
+        temp_path = file_path + ".tmp"
+        with open(temp_path, "w") as file:
+            json.dump(self.to_dict(), file)
+        os.replace(temp_path, file_path)
+
+    @classmethod
+    def load(cls, file_path, top_k=10):
+        """
+        Reads a state written by save.
+
+        Parameters:
+        -----------
+        file_path : string
+            Path of the state file.
+        top_k : int
+            The number of top tweets of a new state, when the file does
+            not exist. Default is 10
+
+        Returns:
+        --------
+        state : AnalyticsState
+            The stored state, or an empty one when the file does not exist.
+        """
+        if not os.path.exists(file_path):
+            return cls(top_k)
+        with open(file_path) as file:
+            return cls.from_dict(json.load(file))
+
+    def _check_not_empty(self):
+        if self.sums is None:
+            raise ValueError("Invalid state: no tweets were added to the analytics state")
+
+
+def _upgrade(state):
+    """Adds the keyword of the tweets to a state stored before the
+    aggregates were kept for each keyword, when it had a single one."""
+    if state.get("tweet_counts", False) is not False or state["sums"] is None:
+        return state
+    state = dict(state)
+    keyword = state["sums"]["data"][0][state["sums"]["columns"].index("keyword")]
+    state["tweet_counts"] = {
+        "columns": ["keyword", "count"],
+        "data": [[keyword, state["total_tweets"]]],
+    }
+    for name in ["sentiment_sums", "token_counts", "top_tweets"]:
+        table = state[name]
+        state[name] = {
+            "columns": ["keyword"] + table["columns"],
+            "data": [[keyword] + row for row in table["data"]],
+        }
+    if state["token_sketches"]:
+        state["token_sketches"] = {keyword: state["token_sketches"]}
+    return state
+
+
+def _add(total, part):
+    """Adds two tables of sums, matching the rows by index."""
+    if total is None:
+        return part
+    if part is None:
+        return total
+    return (
+        pd.concat([total, part])
+        .groupby(level=list(range(part.index.nlevels)), observed=True)
+        .sum()
+    )
+
+
+def _widen(table):
+    """Converts the integer columns of a table of sums into int64."""
+    return table.astype(
+        {
+            column: "int64"
+            for column, dtype in table.dtypes.items()
+            if pd.api.types.is_integer_dtype(dtype)
+        }
+    )
+
+
+def _top_keyword_rows(candidates, top_k):
+    """Returns the top rows of each keyword, see _top_rows."""
+    return (
+        candidates.sort_values("sum_like_retweet", ascending=False, kind="stable")
+        .drop_duplicates(["keyword", "reference_id"])
+        .groupby("keyword", observed=True, sort=False)
+        .head(top_k)
+        .reset_index(drop=True)
+    )
+
+
+def _top_rows(candidates, top_k):
+    """Returns the top_k referenced tweets with the highest sum_like_retweet,
+    each with its highest row."""
+    return (
+        candidates.sort_values("sum_like_retweet", ascending=False, kind="stable")
+        .drop_duplicates(["reference_id"])
+        .head(top_k)
+        .reset_index(drop=True)
+    )
@@ -0,0 +1,284 @@
+"""Reading and writing the tables handed from one stage to the next in
+either csv or parquet format."""
+
+# imports
+import ast
+import os
+
+import pandas as pd
+
+STORAGE_FORMATS = {"csv": ".csv", "parquet": ".parquet"}
+
+
+def _require_pyarrow():
+    """Imports pyarrow, which is only needed for the parquet format."""
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError as error:
+        raise ImportError(
+            "storage_format='parquet' requires pyarrow, install it with: pip install pyarrow"
+        ) from error
+    return pyarrow
+
+
+def check_storage_format(storage_format):
+    """Raises an error when ``storage_format`` is not a supported format."""
+    if storage_format not in STORAGE_FORMATS:
+        raise ValueError(
+            "Invalid parameter input value: storage_format must be of either string csv or parquet"
+        )
+
+
+def infer_storage_format(file_path):
+    """
+    Returns the storage format of a table file from its extension.
+
+    Parameters:
+    -----------
+    file_path : string
+        Path of the table file.
+
+    Returns:
+    --------
+    storage_format : string
+        'parquet' for .parquet files and 'csv' otherwise.
+    """
+    if os.path.splitext(file_path)[1] == STORAGE_FORMATS["parquet"]:
+        return "parquet"
+    return "csv"
+
+
+def table_path(folder_path, name, storage_format):
+    """Returns the path of the table ``name`` in ``folder_path``."""
+    return os.path.join(folder_path, name + STORAGE_FORMATS[storage_format])
+
+
+def read_table(file_path, list_columns=(), **kwargs):
+    """
+    Reads a table stored by one of the stages into a dataframe.
+
+    Parameters:
+    -----------
+    file_path : string
+        Path of a .csv or .parquet file.
+    list_columns : list of string
+        Columns holding lists, such as tokens and hashtags. They are stored
+        as lists in parquet files and parsed back from their string form
+        when reading csv files. Default is none.
+    **kwargs
+        Passed to ``pd.read_csv`` or ``pd.read_parquet``.
+
+    Returns:
+    --------
+    df : dataframe
+        The stored table.
+
+    Examples
+    --------
+    >>> read_table("output/clean_tweets.parquet", list_columns=["tokens"])
+    """
+    if infer_storage_format(file_path) == "parquet":
+        _require_pyarrow()
+        return _parquet_lists(pd.read_parquet(file_path, **kwargs), list_columns)
+
+    converters = {column: ast.literal_eval for column in list_columns}
+    return pd.read_csv(file_path, converters=converters, **kwargs)
+
+
+def iter_table(file_path, chunksize, list_columns=(), **kwargs):
+    """
+    Reads a table stored by one of the stages in dataframes of at most
+    ``chunksize`` rows, so that only one chunk is held in memory at a time.
+
+    Parameters:
+    -----------
+    file_path : string
+        Path of a .csv or .parquet file.
+    chunksize : int
+        The maximum number of rows of each chunk.
+    list_columns : list of string
+        Columns holding lists, as in ``read_table``. Default is none.
+    **kwargs
+        Passed to ``pd.read_csv`` or ``ParquetFile.iter_batches``.
+
+    Yields:
+    -------
+    df : dataframe
+        The next chunk of the table.
+
+    Examples
+    --------
+    >>> for df in iter_table("output/clean_tweets.csv", 10000, list_columns=["tokens"]):
+            print(len(df))
+    """
+    if infer_storage_format(file_path) == "parquet":
+        pa = _require_pyarrow()
+        parquet_file = pa.parquet.ParquetFile(file_path)
+        for batch in parquet_file.iter_batches(batch_size=chunksize, **kwargs):
+            yield _parquet_lists(batch.to_pandas(), list_columns)
+        return
+
+    converters = {column: ast.literal_eval for column in list_columns}
+    with pd.read_csv(
+        file_path, converters=converters, chunksize=chunksize, **kwargs
+    ) as reader:
+        yield from reader
+
+
+def is_table(data):
+    """Returns whether ``data`` is a path, a dataframe or an Arrow table."""
+    return isinstance(data, (str, pd.DataFrame)) or hasattr(data, "to_pandas")
+
+
+def load_table(data, list_columns=()):
+    """
+    Returns a table handed to one of the stages as a dataframe, reading it
+    when it is the path of a stored table.
+
+    Parameters:
+    -----------
+    data : string, dataframe or Arrow table
+        Path of a .csv or .parquet file, or the table itself.
+    list_columns : list of string
+        Columns holding lists, as in ``read_table``. Lists given in their
+        string form are parsed. Default is none.
+
+    Returns:
+    --------
+    df : dataframe
+        The table. Dataframes are shallow copies, so adding columns does
+        not change the dataframe given.
+
+    Examples
+    --------
+    >>> load_table(clean_df, list_columns=["tokens"])
+    """
+    if isinstance(data, str):
+        return read_table(data, list_columns)
+    if isinstance(data, pd.DataFrame):
+        df = data.copy(deep=False)
+    else:
+        df = _parquet_lists(data.to_pandas(), list_columns)
+    for column in list_columns:
+        if column in df and isinstance(df[column].dropna().head(1).squeeze(), str):
+            df[column] = df[column].map(ast.literal_eval, na_action="ignore")
+    return df
+
+
+def iter_chunks(data, chunksize, list_columns=()):
+    """
+    Yields a table handed to one of the stages in dataframes of at most
+    ``chunksize`` rows, reading it chunk by chunk when it is the path of a
+    stored table.
+
+    Parameters:
+    -----------
+    data : string, dataframe or Arrow table
+        Path of a .csv or .parquet file, or the table itself.
+    chunksize : int
+        The maximum number of rows of each chunk.
+    list_columns : list of string
+        Columns holding lists, as in ``load_table``. Default is none.
+
+    Yields:
+    -------
+    df : dataframe
+        The next chunk of the table.
+    """
+    if isinstance(data, str):
+        yield from iter_table(data, chunksize, list_columns)
+        return
+    df = load_table(data, list_columns)
+    for start in range(0, len(df), chunksize):
+        yield df.iloc[start : start + chunksize].copy()
+
+
+def _parquet_lists(df, list_columns):
+    """Converts the list columns of a table read from parquet to lists."""
+    for column in list_columns:
+        if column in df:
+            # parquet lists are read back as numpy arrays
+            df[column] = df[column].map(lambda x: list(x) if x is not None else x)
+    return df
+
+
+def write_table(df, file_path):
+    """
+    Writes a dataframe in the format given by the extension of ``file_path``
+    without its index. Parquet files are compressed and keep list columns
+    as lists.
+
+    Parameters:
+    -----------
+    df : dataframe
+        The table to write.
+    file_path : string
+        Path of a .csv or .parquet file.
+    """
+    if infer_storage_format(file_path) == "parquet":
+        _require_pyarrow()
+        df.to_parquet(file_path, index=False, compression="snappy")
+    else:
+        df.to_csv(file_path, index=False)
+
+
+class TableAppender:
+    """
+    Writes a table in parts, appending each dataframe to the file as it is
+    produced. Parquet parts are written as row groups of one file.
+
+    Examples
+    --------
+    >>> with TableAppender("output/tweets_response.parquet") as appender:
+            for page_df in page_dfs:
+                appender.append(page_df)
+    """
+
+    def __init__(self, file_path, mode="w"):
+        self.file_path = file_path
+        self.storage_format = infer_storage_format(file_path)
+        self.header = mode == "w" or not os.path.exists(file_path)
+        self._writer = None
+        self._schema = None
+        if self.storage_format == "parquet" and mode == "a":
+            raise ValueError("parquet tables can not be appended to")
+
+    def append(self, df):
+        """Appends the rows of ``df`` to the table."""
+        if self.storage_format == "csv":
+            df.to_csv(
+                self.file_path,
+                mode="w" if self.header else "a",
+                header=self.header,
+                index=False,
+            )
+            self.header = False
+            return
+
+        pa = _require_pyarrow()
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        if self._writer is None:
+            # columns without any value on the first part are stored as strings
+            self._schema = pa.schema(
+                [
+                    field.with_type(pa.string()) if pa.types.is_null(field.type) else field
+                    for field in table.schema
+                ]
+            )
+            self._writer = pa.parquet.ParquetWriter(
+                self.file_path, self._schema, compression="snappy"
+            )
+        self._writer.write_table(table.cast(self._schema))
+
+    def close(self):
+        """Closes the file."""
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
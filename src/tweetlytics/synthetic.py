@@ -0,0 +1,366 @@
+"""Deterministic generator of synthetic tweets shaped like the responses of
+the Twitter API v2 search, to test and benchmark the pipeline at scale."""
+
+# imports
+import calendar
+from datetime import datetime, timedelta
+
+import numpy as np
+
+# the most frequent words, at the head of the vocabulary
+_COMMON_WORDS = (
+    "the to a and of in is for on it this you that with my at be are we so "
+    "all just have will your from what can now our about out time people "
+    "today new day city like get one more"
+).split()
+
+# words of the TextBlob lexicon, so that the tweets have a sentiment
+_SENTIMENT_WORDS = (
+    "good great love happy best amazing nice beautiful excited wonderful "
+    "bad sad terrible worst awful angry hate poor boring crazy not very "
+    "really never so"
+).split()
+
+_SYLLABLES = [consonant + vowel for consonant in "bdfgklmnprstvz" for vowel in "aeiou"]
+
+_SOURCES = ["Twitter for iPhone", "Twitter for Android", "Twitter Web App", "Twitter for iPad", "TweetDeck"]
+_SOURCE_SHARES = [0.42, 0.28, 0.2, 0.05, 0.05]
+
+_LANGS = ["en", "fr", "es", "und"]
+_LANG_SHARES = [0.9, 0.04, 0.03, 0.03]
+
+_REPLY_SETTINGS = ["everyone", "following", "mentionedUsers"]
+_REPLY_SETTING_SHARES = [0.97, 0.02, 0.01]
+
+# share of the words drawn from the sentiment words
+_SENTIMENT_SHARE = 0.08
+
+# tweet ids are snowflakes: the milliseconds since the twitter epoch,
+# shifted over 22 bits of worker and sequence numbers
+_TWITTER_EPOCH_MS = 1288834974657
+_ID_SHIFT = 22
+
+# tweets drawn at a time
+_BLOCK_TWEETS = 1000
+
+
+def _pseudo_word(index):
+    """Returns the word made of the syllables of the digits of index."""
+    syllables = []
+    while True:
+        index, digit = divmod(index, len(_SYLLABLES))
+        syllables.append(_SYLLABLES[digit])
+        if index == 0:
+            return "".join(syllables)
+        index -= 1
+
+
+def _zipf_shares(size, exponent=1.1):
+    """Returns the share of each rank of a Zipf distribution."""
+    weights = 1.0 / np.arange(1, size + 1) ** exponent
+    return weights / weights.sum()
+
+
+class TweetGenerator:
+    """
+    Generates synthetic tweets shaped like the ``data`` and
+    ``includes.users`` of the Twitter API v2 search responses, page by
+    page, so that any number of tweets can be generated in constant
+    memory.
+
+    The words and hashtags follow Zipf distributions over a vocabulary of
+    pseudo-words headed by common words, and some words carry a
+    sentiment. Retweets reference a pool of popular tweets with a skewed
+    popularity and repeat their text, as in real searches where they are
+    the majority. Replies and quotes have their own text. The same
+    parameters and seed always give the same tweets.
+
+    Parameters:
+    -----------
+    keyword : string
+        The searched keyword, added to the text of most tweets.
+        Default is 'vancouver'
+    retweet_ratio : float
+        The share of retweets. Default is 0.65
+    reply_ratio : float
+        The share of replies. Default is 0.13
+    quote_ratio : float
+        The share of quotes. Default is 0.02
+    vocabulary_size : int
+        The number of distinct words. Default is 50000
+    hashtags_size : int
+        The number of distinct hashtags. Default is 2000
+    users_size : int
+        The number of distinct authors. Default is 100000
+    popular_size : int
+        The number of popular tweets that are retweeted. Default is 5000
+    start_time : datetime
+        The time of the newest tweet. Default is 2022-01-28 23:59:59
+    seed : int
+        Seed of the random generator. Default is 0
+
+    Examples
+    --------
+    >>> generator = TweetGenerator(seed=1)
+    >>> for page in generator.pages(1000000, page_size=100):
+            df = normalize_tweets(page["data"], "vancouver", page["includes"]["users"])
+    """
+
+    def __init__(
+        self,
+        keyword="vancouver",
+        retweet_ratio=0.65,
+        reply_ratio=0.13,
+        quote_ratio=0.02,
+        vocabulary_size=50000,
+        hashtags_size=2000,
+        users_size=100000,
+        popular_size=5000,
+        start_time=datetime(2022, 1, 28, 23, 59, 59),
+        seed=0,
+    ):
+        self.keyword = keyword
+        self.kind_shares = [
+            1 - retweet_ratio - reply_ratio - quote_ratio,
+            retweet_ratio,
+            reply_ratio,
+            quote_ratio,
+        ]
+        self.start_time = start_time
+        self.seed = seed
+        self.vocabulary = np.array(
+            _COMMON_WORDS
+            + [_pseudo_word(index) for index in range(vocabulary_size - len(_COMMON_WORDS))],
+            dtype=object,
+        )
+        self.word_shares = _zipf_shares(vocabulary_size)
+        self.hashtags = np.array(
+            [keyword] + [_pseudo_word(index * 7 + 3) for index in range(hashtags_size - 1)],
+            dtype=object,
+        )
+        self.hashtag_shares = _zipf_shares(hashtags_size)
+        self.users_size = users_size
+        self.popular_shares = _zipf_shares(popular_size, exponent=1.3)
+
+        # the popular tweets, posted before the searched ones
+        rng = np.random.default_rng([seed, 1])
+        # posted over the month before the searched ones
+        self.popular_ids = self._snowflakes(
+            rng, rng.choice(30 * 86400 * 1000, size=popular_size, replace=False) + 86400 * 1000
+        )
+        self.popular_authors = rng.integers(users_size, size=popular_size)
+        self.popular_texts = self._texts(rng, popular_size)
+        self.popular_retweets = (
+            rng.lognormal(3, 2, size=popular_size).astype(np.int64) + 1
+        )
+
+    def pages(self, n_tweets, page_size=100, start=0):
+        """
+        Generates the search responses of n_tweets tweets, from the newest.
+
+        Parameters:
+        -----------
+        n_tweets : int
+            The number of tweets.
+        page_size : int
+            The number of tweets of each page. Default is 100
+        start : int
+            The number of newer tweets to skip, to resume a search.
+            Default is 0
+
+        Returns:
+        --------
+        pages : iterator of dict
+            Responses with the data, includes.users and meta of a page.
+        """
+        stop = start + n_tweets
+        data, authors = [], []
+        for block_start in range(start - start % _BLOCK_TWEETS, stop, _BLOCK_TWEETS):
+            block_data, block_authors = self._block(block_start // _BLOCK_TWEETS)
+            first = max(start - block_start, 0)
+            last = min(stop - block_start, _BLOCK_TWEETS)
+            data += block_data[first:last]
+            authors += block_authors[first:last]
+            end = block_start + last == stop
+            while len(data) >= page_size or (data and end):
+                more = len(data) > page_size or not end
+                yield self._page(data[:page_size], authors[:page_size], more)
+                data, authors = data[page_size:], authors[page_size:]
+
+    def response(self, n_tweets):
+        """
+        Returns a single search response with n_tweets tweets and their
+        authors.
+
+        Parameters:
+        -----------
+        n_tweets : int
+            The number of tweets.
+        """
+        pages = list(self.pages(n_tweets, page_size=max(n_tweets, 1)))
+        if not pages:
+            return {"data": [], "includes": {"users": []}, "meta": {"result_count": 0}}
+        return pages[0]
+
+    def user(self, index):
+        """Returns the user object of the author number index."""
+        rng = np.random.default_rng([self.seed, 2, index])
+        username = _pseudo_word(index + 60) + str(index % 1000)
+        followers = int(rng.lognormal(5, 2))
+        return {
+            "created_at": (
+                self.start_time - timedelta(days=int(rng.integers(30, 5000)))
+            ).strftime("%Y-%m-%dT%H:%M:%S.000Z"),
+            "description": " ".join(self.vocabulary[rng.integers(200, size=5)]),
+            "id": str(10 ** 8 + index * 7919),
+            "name": username.capitalize(),
+            "public_metrics": {
+                "followers_count": followers,
+                "following_count": int(rng.lognormal(5, 1)),
+                "listed_count": int(rng.integers(0, 5)),
+                "tweet_count": int(rng.lognormal(7, 2)),
+            },
+            "username": username,
+            "verified": bool(rng.random() < 0.01),
+        }
+
+    def _texts(self, rng, size):
+        """Returns the texts of size new tweets."""
+        lengths = rng.poisson(10, size=size) + 3
+        words = self.vocabulary[rng.choice(len(self.vocabulary), size=lengths.sum(), p=self.word_shares)]
+        sentiment = rng.random(lengths.sum()) < _SENTIMENT_SHARE
+        words[sentiment] = rng.choice(_SENTIMENT_WORDS, size=sentiment.sum())
+        n_hashtags = rng.choice(4, size=size, p=[0.55, 0.3, 0.1, 0.05])
+        hashtags = self.hashtags[
+            rng.choice(len(self.hashtags), size=n_hashtags.sum(), p=self.hashtag_shares)
+        ]
+        with_keyword = rng.random(size) < 0.7
+        with_link = rng.random(size) < 0.3
+        endings = rng.choice(["", "", ".", "!", "?", " :)"], size=size)
+
+        texts = []
+        word_offsets = np.cumsum(lengths) - lengths
+        hashtag_offsets = np.cumsum(n_hashtags) - n_hashtags
+        for row in range(size):
+            text = list(words[word_offsets[row] : word_offsets[row] + lengths[row]])
+            if with_keyword[row]:
+                text.insert(int(rng.integers(len(text))), self.keyword.capitalize())
+            text = " ".join(text) + endings[row]
+            tags = hashtags[hashtag_offsets[row] : hashtag_offsets[row] + n_hashtags[row]]
+            if len(tags):
+                text += " " + " ".join("#" + tag for tag in tags)
+            if with_link[row]:
+                text += " https://t.co/" + _pseudo_word(int(rng.integers(10 ** 9)))
+            texts.append(text)
+        return texts
+
+    def _snowflakes(self, rng, milliseconds):
+        """Returns the ids of tweets posted milliseconds before start_time."""
+        posted = calendar.timegm(self.start_time.timetuple()) * 1000 - milliseconds
+        return ((posted - _TWITTER_EPOCH_MS) << _ID_SHIFT) + rng.integers(
+            1 << _ID_SHIFT, size=len(milliseconds)
+        )
+
+    def _page(self, data, authors, more):
+        """Returns the response of a page of tweets and their authors."""
+        users = [self.user(index) for index in dict.fromkeys(authors)]
+        meta = {
+            "newest_id": data[0]["id"],
+            "oldest_id": data[-1]["id"],
+            "result_count": len(data),
+        }
+        if more:
+            meta["next_token"] = _pseudo_word(int(data[-1]["id"]) % 10 ** 9)
+        return {"data": data, "includes": {"users": users}, "meta": meta}
+
+    def _block(self, block):
+        """Returns the tweets of a block and the numbers of their authors.
+        The tweets are drawn block by block, so they do not depend on the
+        size of the pages."""
+        rng = np.random.default_rng([self.seed, 3, block])
+        start, size = block * _BLOCK_TWEETS, _BLOCK_TWEETS
+        # a tweet every two seconds or so, back from start_time
+        seconds = np.arange(start, start + size) * 2 + rng.integers(2, size=size)
+        ids = self._snowflakes(rng, seconds * 1000 + rng.integers(1000, size=size))
+        times = [
+            (self.start_time - timedelta(seconds=int(second))).strftime(
+                "%Y-%m-%dT%H:%M:%S.000Z"
+            )
+            for second in seconds
+        ]
+        kinds = rng.choice(4, size=size, p=self.kind_shares)
+        authors = rng.integers(self.users_size, size=size)
+        popular = rng.choice(len(self.popular_ids), size=size, p=self.popular_shares)
+        texts = self._texts(rng, size)
+        sources = rng.choice(_SOURCES, size=size, p=_SOURCE_SHARES)
+        langs = rng.choice(_LANGS, size=size, p=_LANG_SHARES)
+        reply_settings = rng.choice(_REPLY_SETTINGS, size=size, p=_REPLY_SETTING_SHARES)
+        metrics = rng.poisson([[0.5, 0.3, 2.0, 0.05]], size=(size, 4))
+
+        data = []
+        for row in range(size):
+            tweet_id = str(ids[row])
+            tweet = {
+                "author_id": str(10 ** 8 + authors[row] * 7919),
+                "conversation_id": tweet_id,
+                "created_at": times[row],
+                "id": tweet_id,
+                "lang": langs[row],
+                "public_metrics": {
+                    "like_count": int(metrics[row, 2]),
+                    "quote_count": int(metrics[row, 3]),
+                    "reply_count": int(metrics[row, 1]),
+                    "retweet_count": int(metrics[row, 0]),
+                },
+                "reply_settings": reply_settings[row],
+                "source": sources[row],
+                "text": texts[row],
+            }
+            kind = kinds[row]
+            if kind:
+                original = popular[row]
+                original_id = str(self.popular_ids[original])
+                original_author = int(self.popular_authors[original])
+                reference = ["retweeted", "replied_to", "quoted"][kind - 1]
+                tweet["referenced_tweets"] = [{"id": original_id, "type": reference}]
+                if reference == "retweeted":
+                    # retweets repeat the text and metrics of the original
+                    username = _pseudo_word(original_author + 60) + str(original_author % 1000)
+                    tweet["text"] = f"RT @{username}: {self.popular_texts[original]}"
+                    tweet["public_metrics"] = {
+                        "like_count": 0,
+                        "quote_count": 0,
+                        "reply_count": 0,
+                        "retweet_count": int(self.popular_retweets[original]),
+                    }
+                elif reference == "replied_to":
+                    tweet["conversation_id"] = original_id
+                    tweet["in_reply_to_user_id"] = str(10 ** 8 + original_author * 7919)
+            data.append(tweet)
+        return data, authors.tolist()
+
+
+def generate_response(n_tweets, seed=0, **kwargs):
+    """
+    Returns a synthetic search response with n_tweets tweets.
+
+    Parameters:
+    -----------
+    n_tweets : int
+        The number of tweets.
+    seed : int
+        Seed of the random generator. Default is 0
+    **kwargs
+        Other parameters of TweetGenerator.
+
+    Returns:
+    --------
+    response : dict
+        The data, includes.users and meta of the response.
+
+    Examples
+    --------
+    >>> response = generate_response(10000)
+    >>> normalize_tweets(response["data"], "vancouver", response["includes"]["users"])
+    """
+    return TweetGenerator(seed=seed, **kwargs).response(n_tweets)
@@ -2,23 +2,52 @@
 # Jan 2022
 
 # imports
-import requests
 import os
 import json
+import contextlib
+import functools
+import math
 import pandas as pd
 from datetime import datetime, timedelta
-from dotenv import load_dotenv
-import altair as alt
-import altair_saver
 import numpy as np
-from textblob import TextBlob
-import ast
-from wordcloud import WordCloud, STOPWORDS
-import matplotlib.pyplot as plt
-
-load_dotenv()  # load .env files in the project folder
-
 
+# the plotting (altair, wordcloud, matplotlib), NLP (textblob) and HTTP
+# (requests) libraries are imported by the stages using them, so that
+# importing the cleaning and analysis stages stays fast
+from tweetlytics.cache import OutputCache
+from tweetlytics.cleaning import TweetCleaner
+from tweetlytics.compact import compact_frame
+from tweetlytics.corpus import CorpusWriter, TokenCorpus
+from tweetlytics.dedup import DuplicateGroups
+from tweetlytics.instrument import instrumented, measure
+from tweetlytics.ndjson import NDJSONWriter, check_json_format, write_ndjson
+from tweetlytics.normalize import RESPONSE_COLUMNS, normalize_tweets
+from tweetlytics.parallel import PartitionPool
+from tweetlytics.sentiment import (
+    SENTIMENT_BACKENDS,
+    SentimentCache,
+    sentiment_type,
+)
+from tweetlytics.sketches import SpaceSaving
+from tweetlytics.state import AnalyticsState
+from tweetlytics.storage import (
+    TableAppender,
+    check_storage_format,
+    infer_storage_format,
+    is_table,
+    iter_chunks,
+    load_table,
+    table_path,
+    write_table,
+)
+
+_CLEANER = TweetCleaner()
+
+# rows of all tweets read at a time when counting hashtags approximately
+_PLOT_CHUNKSIZE = 100000
+
+
+@instrumented("get_store")
 def get_store(
     bearer_token,
     keyword,
@@ -29,6 +58,14 @@ def get_store(
     store_csv=False,
     include_public_metrics=True,
     api_access_lvl="essential",
+    max_tweets=None,
+    workers=1,
+    resume=False,
+    storage_format="csv",
+    compact=False,
+    json_format="json",
+    instrumentation=None,
+    base_url="https://api.twitter.com",
 ):
     """
     Retreives all tweets of a keyword provided by the user through the Twitter API.
@@ -42,8 +79,11 @@ def get_store(
         The user's personal twitter API dev bearer token.
         It is recommended to add the token from an
         enviroment variable.
-    keyword : string
-        The keyword to search Twitter and retrieve tweets.
+    keyword : string or list of string
+        The keyword to search Twitter and retrieve tweets. With a list,
+        each keyword is searched in turn and its rows are tagged with it
+        in the keyword column. A tweet found by several keywords has a
+        row for each, and is stored once in the .json file.
     start_date: string
         Starting date to collect tweets from. Dates should be
         entered in string format: YYYY-MM-DD
@@ -51,13 +91,14 @@ def get_store(
         Ending date (Included) to collect tweets from. Dates should be
         entered in string format: YYYY-MM-DD
     max_results: int
-        The maximum number of tweets to return. Default is 25.
-        Must be between 10 and 100.
+        The maximum number of tweets returned by each request
+        to the API. Default is 25. Must be between 10 and 100.
     store_path: string
         The string path to store the retrieved tweets in
         Json format. Default is working directory.
     store_csv: boolean
-        Create .csv file with response data or not.
+        Create a table file (tweets_response.csv or .parquet depending
+        on storage_format) with response data or not.
         Default is False.
     include_public_metrics : boolean
         Should public metrics regarding each tweet such as
@@ -68,11 +109,62 @@ def get_store(
         The twitter API access level of the user's bearer token.
         Options are 'essential' or 'academic'.
         Default is 'essential'
+    max_tweets : int
+        The total number of tweets to retrieve. Pages of max_results
+        tweets are requested, following the next_token of each response,
+        until this budget is reached or the search has no more results.
+        Each page is written to the .json (and .csv) file as it arrives.
+        With several keywords, the budget applies to each keyword.
+        Default is None which retrieves a single page of max_results tweets.
+    workers : int
+        The number of requests sent at the same time. When greater than 1
+        the date range is split into time windows (one per worker or per
+        day, whichever is more) which are searched concurrently over a
+        shared connection pool, and pages are stored in the order they
+        arrive. Requests are scheduled against the rate limit headers of
+        the API and retried with backoff on 429 and 5xx responses.
+        Default is 1.
+    resume : boolean
+        Resume from the checkpoint stored in store_path instead of starting
+        over. The checkpoint (tweets_checkpoint.json) records the newest and
+        oldest stored tweet id and the next_token of an unfinished search
+        for each keyword. Only the tweets missing from the store are
+        requested: the rest of an unfinished search, tweets newer than the
+        newest stored tweet and tweets older than the stored range when
+        start_date is earlier. They are appended to tweets_response.csv
+        without duplicates, and the .json file and the returned dataframe
+        hold the new tweets only. Requires store_csv, a single worker and
+        the csv storage_format. The checkpoint is only written by runs
+        storing the csv. Default is False.
+    storage_format : string
+        The format of the table file. Options are 'csv' or 'parquet'
+        (compressed, columnar, requires pyarrow). Default is 'csv'.
+    compact : boolean
+        Return the tweets with compact dtypes, see compact_frame:
+        categoricals for keyword, lang, source and the other
+        low-cardinality fields, Arrow-backed strings for the text,
+        integer ids and int32 counts. The stored files are unchanged.
+        Default is False.
+    json_format : string
+        The format of the stored response. Options are 'json', a single
+        document with the data, includes and meta of the search, or
+        'ndjson' which writes one tweet per line to tweets_response.ndjson
+        and one author per line to tweets_users.ndjson, read lazily with
+        iter_ndjson. Default is 'json'.
+    instrumentation : Instrumentation
+        Records the time of the stage, of each request and of the
+        normalization and storage of each page. Default is None.
+    base_url : string
+        The root url of the API the search endpoints are requested from,
+        such as the url of a local MockTwitterServer.
+        Default is 'https://api.twitter.com'.
     Returns:
     --------
     tweets_df : dataframe
         A pandas dataframe of retrieved tweets based on user's
-        selected parameters. (Data will be stored as a Json file)
+        selected parameters, including the username, name, verified
+        status and followers count of each author.
+        (Data will be stored as a Json file)
     Examples
     --------
     >>> bearer_token = os.getenv("BEARER_TOKEN")
@@ -83,25 +175,36 @@ def get_store(
             end_date="2022-01-17")
     >>> tweets
     """
+    from dotenv import load_dotenv
+
+    from tweetlytics.checkpoint import load_checkpoints, save_checkpoints, resume_search
+    from tweetlytics.fetch import split_date_windows, fetch_windows
+
+    load_dotenv()  # load .env files in the project folder
 
     # parameter tests
     if not isinstance(bearer_token, str):
         raise TypeError(
             "Invalid parameter input type: bearer_token must be entered as a string"
         )
-    if not isinstance(keyword, str):
+    keywords = [keyword] if isinstance(keyword, str) else keyword
+    if not (
+        isinstance(keywords, list)
+        and keywords
+        and all(isinstance(keyword, str) for keyword in keywords)
+    ):
         raise TypeError(
-            "Invalid parameter input type: keyword must be entered as a string"
+            "Invalid parameter input type: keyword must be entered as a string or a list of strings"
         )
     if not isinstance(start_date, str):
         raise TypeError(
             "Invalid parameter input type: start_date must be entered as a string"
         )
-    if not (
+    if (api_access_lvl == "essential") and not (
         datetime.strptime(end_date, "%Y-%m-%d")
         > datetime.strptime(start_date, "%Y-%m-%d")
         > (datetime.now() - timedelta(days=7))
-    ) & (api_access_lvl == "essential"):
+    ):
         raise ValueError(
             "Invalid parameter input value: api access level of essential can only search for tweets in the past 7 days"
         )
@@ -133,6 +236,42 @@ def get_store(
         raise ValueError(
             "Invalid parameter input value: api_access_lvl must be of either string essential or academic"
         )
+    if max_tweets is None:
+        max_tweets = max_results
+    if not isinstance(max_tweets, int):
+        raise TypeError(
+            "Invalid parameter input type: max_tweets must be entered as an integer"
+        )
+    if max_tweets <= 0:
+        raise ValueError(
+            "Invalid parameter input value: max_tweets must be a positive integer"
+        )
+    if not isinstance(workers, int):
+        raise TypeError(
+            "Invalid parameter input type: workers must be entered as an integer"
+        )
+    if workers < 1:
+        raise ValueError(
+            "Invalid parameter input value: workers must be a positive integer"
+        )
+    if not isinstance(resume, bool):
+        raise TypeError(
+            "Invalid parameter input type: resume must be entered as a boolean"
+        )
+    check_storage_format(storage_format)
+    if not isinstance(compact, bool):
+        raise TypeError(
+            "Invalid parameter input type: compact must be entered as a boolean"
+        )
+    check_json_format(json_format)
+    if not isinstance(base_url, str):
+        raise TypeError(
+            "Invalid parameter input type: base_url must be entered as a string"
+        )
+    if resume and not (store_csv and workers == 1 and storage_format == "csv"):
+        raise ValueError(
+            "Invalid parameter input value: resume requires store_csv=True, workers=1 and the csv storage_format"
+        )
 
     headers = {
         "Authorization": "Bearer {}".format(bearer_token)
@@ -140,13 +279,12 @@ def get_store(
 
     # check access level and switch url accordingly. recent will can only search the past 7 days.
     if api_access_lvl == "essential":
-        search_url = "https://api.twitter.com/2/tweets/search/recent"
+        search_url = base_url.rstrip("/") + "/2/tweets/search/recent"
     elif api_access_lvl == "academic":
-        search_url = "https://api.twitter.com/2/tweets/search/all"
+        search_url = base_url.rstrip("/") + "/2/tweets/search/all"
 
     # set request parameters
     query_params = {
-        "query": f"{keyword}",
         "start_time": f"{start_date}T00:00:00.000Z",
         "end_time": f"{end_date}T00:00:00.000Z",
         "max_results": f"{max_results}",
@@ -154,53 +292,146 @@ def get_store(
         "tweet.fields": "id,text,author_id,in_reply_to_user_id,conversation_id,created_at,lang,public_metrics,referenced_tweets,reply_settings,source",
         "user.fields": "id,name,username,created_at,description,public_metrics,verified,entities",
         "place.fields": "full_name,id,country,country_code,name,place_type",
-        "next_token": {},
     }
 
-    # send request and store response
-    tweet_response = requests.request(
-        "GET", search_url, params=query_params, headers=headers
-    )
-    tweet_response_json = tweet_response.json()
-
-    # check if path in store path exists. create folders if not and create .Json file
+    # check if path in store path exists. create folders if not
     if not os.path.exists(store_path):
         os.makedirs(store_path)
-    with open(os.path.join(store_path, "tweets_response.json"), "w") as file:
-        json.dump(tweet_response_json, file, indent=4, sort_keys=True)
-
-    tweets_df = pd.DataFrame.from_dict(tweet_response_json["data"])
-
-    # expand public_metrics and referenced_tweets column and store in separate columns.
-    tweets_df[["retweetcount", "reply_count", "like_count", "quote_count"]] = tweets_df[
-        "public_metrics"
-    ].apply(pd.Series)
-
-    tweets_df = tweets_df.explode("referenced_tweets").reset_index(drop=True)
+    table_file = table_path(store_path, "tweets_response", storage_format)
+    checkpoint_path = os.path.join(store_path, "tweets_checkpoint.json")
+
+    # when resuming, new tweets are appended to the stored ones without
+    # duplicates, a tweet is stored once per keyword finding it
+    seen_ids = set()
+    written_ids = set()
+    table_columns = RESPONSE_COLUMNS
+    table_exists = resume and os.path.exists(table_file)
+    if table_exists:
+        table_columns = list(pd.read_csv(table_file, nrows=0).columns)
+        stored = pd.read_csv(table_file, usecols=["keyword", "id"], dtype=str)
+        seen_ids = set(zip(stored["keyword"], stored["id"]))
+    # the checkpoint describes the stored table: it is ignored without the
+    # table, dropped when the table is overwritten and only kept by the
+    # searches storing their tweets
+    checkpoints = load_checkpoints(checkpoint_path) if table_exists else {}
+    if store_csv and not resume and os.path.exists(checkpoint_path):
+        os.remove(checkpoint_path)
+
+    def save():
+        save_checkpoints(checkpoint_path, checkpoints)
+
+    def search(keyword):
+        """Returns the pages of the search of a keyword, as they arrive."""
+        params = dict(query_params, query=keyword)
+        if workers == 1:
+            checkpoint = checkpoints.setdefault(keyword, {})
+            return resume_search(
+                search_url,
+                params,
+                headers,
+                checkpoint,
+                max_tweets=max_tweets,
+                save=save if store_csv else None,
+            )
+        # search one time window per worker (or per day) at the same time
+        start_time = datetime.strptime(start_date, "%Y-%m-%d")
+        end_time = datetime.strptime(end_date, "%Y-%m-%d")
+        windows = split_date_windows(
+            start_time, end_time, max(workers, (end_time - start_time).days)
+        )
+        return fetch_windows(
+            search_url,
+            params,
+            headers,
+            windows,
+            workers=workers,
+            max_tweets=max_tweets,
+        )
 
-    # fill missing referenced tweets
-    tweets_df["referenced_tweets"] = tweets_df.apply(
-        lambda x: x["referenced_tweets"]
-        if isinstance(x["referenced_tweets"], dict)
-        else {"type": "original", "id": x["id"]},
-        axis=1,
+    # request pages and write each page to disk as it arrives
+    pages = (
+        (keyword, page) for keyword in keywords for page in search(keyword)
     )
+    page_dfs = []
+    users = {}
+    meta = {"result_count": 0}
+    newest_id, oldest_id = 0, float("inf")
+    table = TableAppender(table_file, mode="a" if table_exists else "w")
+    response_path = os.path.join(store_path, "tweets_response." + json_format)
+    with open(response_path, "w") as file, table:
+        if json_format == "json":
+            file.write('{"data": [')
+        for keyword, page in pages:
+            data = [
+                record
+                for record in page.get("data", [])
+                if (keyword, record["id"]) not in seen_ids
+            ]
+            seen_ids.update((keyword, record["id"]) for record in data)
+            for record in data:
+                if record["id"] in written_ids:
+                    continue
+                written_ids.add(record["id"])
+                if json_format == "json":
+                    file.write("\n" if meta["result_count"] == 0 else ",\n")
+                    file.write(json.dumps(record, sort_keys=True))
+                else:
+                    file.write(json.dumps(record, sort_keys=True) + "\n")
+                meta["result_count"] += 1
+                tweet_id = int(record["id"])
+                newest_id = max(newest_id, tweet_id)
+                oldest_id = min(oldest_id, tweet_id)
+            page_users = page.get("includes", {}).get("users", [])
+            for user in page_users:
+                users[user["id"]] = user
+
+            if not data:
+                continue
+            with measure("get_store.normalize", rows=len(data)):
+                page_df = normalize_tweets(data, keyword, page_users)
+            if store_csv:
+                with measure("get_store.store", rows=len(page_df)):
+                    table.append(page_df.reindex(columns=table_columns))
+            page_dfs.append(page_df)
+
+        if meta["result_count"]:
+            meta["newest_id"], meta["oldest_id"] = str(newest_id), str(oldest_id)
+        if json_format == "json":
+            file.write("\n], ")
+            file.write('"includes": ' + json.dumps({"users": list(users.values())}, sort_keys=True))
+            file.write(', "meta": ' + json.dumps(meta, sort_keys=True) + "}")
+        else:
+            write_ndjson(users.values(), os.path.join(store_path, "tweets_users.ndjson"))
 
-    tweets_df[["reference_type", "reference_id"]] = tweets_df[
-        "referenced_tweets"
-    ].apply(pd.Series)
-
-    # add searched keyword titles to dataframe
-    tweets_df["keyword"] = keyword
+    if not page_dfs:
+        tweets_df = pd.DataFrame(columns=RESPONSE_COLUMNS)
+        if store_csv and not table_exists:
+            write_table(tweets_df, table_file)
+    else:
+        tweets_df = pd.concat(page_dfs, ignore_index=True)
 
-    if store_csv:
-        tweets_df.to_csv(os.path.join(store_path, "tweets_response.csv"), index=False)
+    if compact:
+        tweets_df = compact_frame(tweets_df)
 
     return tweets_df
 
 
+@instrumented("clean_tweets")
 def clean_tweets(
-    file_path, tokenization=True, word_count=True, store_csv=True, store_inplace=False
+    file_path,
+    tokenization=True,
+    word_count=True,
+    store_csv=True,
+    store_inplace=False,
+    storage_format=None,
+    cleaner=None,
+    chunksize=None,
+    workers=1,
+    store_path=None,
+    store_corpus=False,
+    compact=False,
+    dedup=False,
+    instrumentation=None,
 ):
     """
     Cleans the text in the tweets and returns as new columns in the dataframe.
@@ -208,77 +439,185 @@ def clean_tweets(
     The cleaning process includes converting into lower case, removal of punctuation, hastags and hastag counts
     Parameters:
     -----------
-    file_path : string
-        File path to csv file containing tweets data
+    file_path : string, dataframe or Arrow table
+        File path to csv or parquet file containing tweets data,
+        or the tweets returned by get_store
     tokenization : Boolean
         Creates new column containing cleaned tweet word tokens when True
         Default is True
     word_count : Boolean
         Creates new column containing word count of cleaned tweets
         Default is True
-
-    df_tweets : dataframe
-        A pandas dataframe comprising cleaned data in additional columns
+    storage_format : string
+        Format of the stored clean_tweets file, 'csv' or 'parquet'.
+        Default is None which uses the format of file_path
+    cleaner : TweetCleaner
+        Cleaning engine choosing which cleaning steps are run.
+        Default is None which runs every step
+    chunksize : int
+        Clean the file in chunks of chunksize rows, appending each
+        cleaned chunk to the stored file, so memory use does not grow
+        with the size of the file. Requires store_csv.
+        Default is None which cleans the whole file at once
+    workers : int
+        Number of processes cleaning partitions of the tweets in parallel.
+        Default is 1 which cleans them in the calling process
+    store_path : string
+        Folder of the stored clean_tweets file. Default is None which
+        stores it next to file_path, and does not store it when the
+        tweets are given as a table
+    store_corpus : Boolean
+        Also store the tokens as an integer-encoded TokenCorpus in the
+        clean_tweets_corpus folder of store_path, which analytics can
+        count without parsing the tokens column. Requires tokenization.
+        Default is False
+    compact : Boolean
+        Return the cleaned tweets with compact dtypes, see compact_frame.
+        The stored file is unchanged. Ignored with chunksize, which
+        returns the path of the stored file. Default is False
+    dedup : Boolean
+        Clean each distinct text once and copy the results to the rows
+        with the same text, such as the retweets of a tweet.
+        The cleaned tweets are unchanged. Default is False
+    instrumentation : Instrumentation
+        Records the time of the stage, of each cleaning step and of the
+        storage. The steps of partitions cleaned by workers are timed as a
+        whole. Default is None
+
+    df_tweets : dataframe or string
+        A pandas dataframe comprising cleaned data in additional columns,
+        or the path of the stored file when chunksize is given
 
     Examples
     --------
     >>> clean_tweets("tweets_df.json")
+    >>> clean_tweets(get_store(bearer_token, "vancouver", start_date, end_date))
     """
 
     # Checking for valid input parameters
 
-    if not isinstance(file_path, str):
-        raise Exception("'input_file' must be of str type")
+    if not is_table(file_path):
+        raise Exception("'input_file' must be of str, DataFrame or pyarrow Table type")
     if not isinstance(tokenization, bool):
         raise Exception("'tokenization' must be of bool type")
     if not isinstance(word_count, bool):
         raise Exception("'word_count' must be of bool type")
+    if store_path is None and isinstance(file_path, str):
+        store_path = os.path.dirname(file_path)
+    if storage_format is None:
+        storage_format = (
+            infer_storage_format(file_path) if isinstance(file_path, str) else "csv"
+        )
+    check_storage_format(storage_format)
+    if cleaner is None:
+        cleaner = _CLEANER
+    if not isinstance(cleaner, TweetCleaner):
+        raise Exception("'cleaner' must be of TweetCleaner type")
+    if chunksize is not None:
+        if not isinstance(chunksize, int) or chunksize <= 0:
+            raise Exception("'chunksize' must be a positive int")
+        if not store_csv or store_path is None:
+            raise Exception("'chunksize' requires 'store_csv' to be True and a 'store_path'")
+    if not isinstance(workers, int) or workers < 1:
+        raise Exception("'workers' must be a positive int")
+    if store_inplace and not isinstance(file_path, str):
+        raise Exception("'store_inplace' requires 'file_path' to be of str type")
+    if store_corpus and not (tokenization and store_path is not None):
+        raise Exception("'store_corpus' requires 'tokenization' and a 'store_path'")
+    if not isinstance(compact, bool):
+        raise Exception("'compact' must be of bool type")
+    if not isinstance(dedup, bool):
+        raise Exception("'dedup' must be of bool type")
+    if store_corpus:
+        corpus_path = os.path.join(store_path, "clean_tweets_corpus")
+
+    if store_inplace:
+        output_path = file_path
+    elif store_path is not None:
+        output_path = table_path(store_path, "clean_tweets", storage_format)
+    else:
+        output_path = None
+
+    clean = functools.partial(
+        _clean_table,
+        cleaner=cleaner,
+        tokenization=tokenization,
+        word_count=word_count,
+        dedup=dedup,
+    )
 
+    if chunksize is None:
+        with PartitionPool(workers) as pool:
+            df = load_table(file_path)
+            with measure("clean_tweets.clean", rows=len(df)):
+                df = pool.map(clean, df)
+        if store_csv and output_path is not None:
+            with measure("clean_tweets.store", rows=len(df)):
+                write_table(df, output_path)
+        if store_corpus:
+            TokenCorpus.from_tokens(df["tokens"]).save(corpus_path)
+        if compact:
+            df = compact_frame(df)
+        return df
+
+    # write next to the output and replace it at the end, the input may be
+    # the output when cleaning in place
+    root, extension = os.path.splitext(output_path)
+    partial_path = root + ".partial" + extension
+    with contextlib.ExitStack() as stack:
+        pool = stack.enter_context(PartitionPool(workers))
+        appender = stack.enter_context(TableAppender(partial_path))
+        if store_corpus:
+            corpus_writer = stack.enter_context(CorpusWriter(corpus_path))
+        for df in iter_chunks(file_path, chunksize):
+            with measure("clean_tweets.clean", rows=len(df)):
+                df = pool.map(clean, df)
+            with measure("clean_tweets.store", rows=len(df)):
+                appender.append(df)
+            if store_corpus:
+                corpus_writer.append(df["tokens"])
+    os.replace(partial_path, output_path)
+    return output_path
+
+
+def _clean_table(df, cleaner, tokenization, word_count, dedup=False):
+    """Cleans a dataframe of tweets read from the tweets_response table."""
     # Dropping irrelavant columns
-    columns = ["public_metrics"]
-    df = pd.read_csv(file_path).drop(columns=columns)
-
-    # Checking for 'df' to be a dataframe
-    if not isinstance(df, pd.DataFrame):
-        raise Exception("'df' must be of DataFrame type.")
-
-    df["text"] = df["text"].str.replace(r"RT\s@.*:\s", "", regex=True)
-    df["text"] = df["text"].str.lower()
-    df["hashtags"] = df["text"].str.findall(r"#.*?(?=\s|$)")
-
-    # Cleaning hashtags and mentions in tweet text
-    df["text"] = df["text"].str.replace(r"@[A-Za-z0-9_]+", "", regex=True)
-    df["text"] = df["text"].str.replace(r"#[A-Za-z0-9_]+", "", regex=True)
-
-    # Cleaning links in text
-    df["text"] = df["text"].str.replace(r"http\S+", "", regex=True)
-    df["text"] = df["text"].str.replace(r"#[A-Za-z0-9_]+", "", regex=True)
+    df = df.drop(columns=["public_metrics"])
 
-    # Cleaning all punctuations
-    df["text"] = df["text"].str.replace("[^\w\s]", "", regex=True)
-
-    # Adding clean_tokens column and remove duplicates
-    if tokenization:
-        df["tokens"] = df["text"].str.split()
-        # Adding word_count column
-        if word_count:
-            df["word_count"] = df["tokens"].str.len()
-        df["tokens"] = df["tokens"].map(lambda x: list(set(x)))
+    # Cleaning retweet prefixes, mentions, hashtags, links and punctuations,
+    # adding hashtags, clean_tokens (without duplicates) and word_count columns
+    df = cleaner.clean_frame(
+        df, tokenization=tokenization, word_count=word_count, dedup=dedup
+    )
 
     # drop if text is empty
-    df = df.query("text.str.len() > 0")
-
-    if store_csv:
-        if store_inplace:
-            df.to_csv(file_path, index=False)
-        else:
-            folder_path = file_path.split("/")[0]
-            df.to_csv(os.path.join(folder_path, "clean_tweets.csv"), index=False)
-
-    return df
-
-
-def analytics(input_file, store_json=True, store_csvs=False):
+    return df.query("text.str.len() > 0")
+
+
+@instrumented("analytics")
+def analytics(
+    input_file,
+    store_json=True,
+    store_csvs=False,
+    storage_format=None,
+    chunksize=None,
+    workers=1,
+    sentiment_cache=None,
+    sentiment_backend="textblob",
+    store_path=None,
+    state=None,
+    approximate=False,
+    sketch_error=0.0001,
+    corpus=None,
+    compact=False,
+    dedup=False,
+    collapse_clusters=False,
+    cache=None,
+    json_format="json",
+    by_keyword=False,
+    instrumentation=None,
+):
     """Analysis the tweets of specific keyword in term of
     average number of retweets, the total number of
     comments, most used hashtags and the average number
@@ -286,18 +625,108 @@ def analytics(input_file, store_json=True, store_csvs=False):
 
     Parameters
     ----------
-    input_file : dataframe
-        pandas dataframe
-    keyword: str
-        The keyword that the original dataframe extracted
-        based on.
+    input_file : str, dataframe or Arrow table
+        Path of the csv or parquet file of cleaned tweets, or the
+        cleaned tweets returned by clean_tweets.
+    store_json : bool
+        Store the analysis as json files. Default is True.
+    store_csvs : bool
+        Store the analysis tables as files in storage_format.
+        Default is False.
+    storage_format : str
+        Format of the stored tables, 'csv' or 'parquet'.
+        Default is None which uses the format of input_file.
+    chunksize : int
+        Read input_file in chunks of chunksize rows and merge the
+        analysis of each chunk, so memory use does not grow with the
+        number of tweets. The tweets with their sentiment are then
+        streamed to the stored files instead of being returned.
+        Default is None which reads the whole file at once.
+    workers : int
+        Number of processes scoring the sentiment of partitions of the
+        tweets in parallel. Default is 1 which scores them in the
+        calling process.
+    sentiment_cache : SentimentCache
+        Cache of the polarity of the texts already scored, which may
+        persist across runs. Default is None which uses a new in-memory
+        cache, so repeated texts are scored once per run.
+    sentiment_backend : str
+        Scoring of the sentiment, 'textblob' to analyze each tweet with
+        TextBlob or 'lexicon' to score every tweet of a chunk at once
+        with the TextBlob lexicon, which is much faster but handles
+        negations and modifiers more simply. The cache is only used by
+        'textblob'. Default is 'textblob'.
+    store_path : str
+        Folder of the stored analysis. Default is None which stores it
+        next to input_file, and does not store it when the tweets are
+        given as a table.
+    state : AnalyticsState
+        Aggregates of previously analysed tweets, updated in place with
+        the tweets of input_file. The analysis then covers both, except
+        for the tweets with their sentiment which only hold input_file.
+        Default is None which analyses the tweets of input_file only.
+    approximate : bool
+        Count the tokens of each sentiment type with a SpaceSaving sketch
+        in fixed memory, reporting only the most frequent ones. Ignored
+        when a state is given, which counts as it was created.
+        Default is False.
+    sketch_error : float
+        The maximum overestimation of the approximate token counts,
+        relative to the number of tokens of a sentiment type.
+        Default is 0.0001.
+    corpus : str or TokenCorpus
+        The tokens of the tweets of input_file stored by clean_tweets
+        with store_corpus, or the path of its folder. The tokens are then
+        counted from the corpus and the tokens column is not parsed.
+        Default is None which counts the tokens column.
+    compact : bool
+        Convert each chunk of tweets into compact dtypes before the
+        analysis, see compact_frame, and add the sentiment_type as a
+        categorical, so the tweets with their sentiment take less memory.
+        Default is False.
+    dedup : bool
+        Score the sentiment and count the tokens of each distinct text
+        once, such as the text shared by the retweets of a tweet, and
+        weight the token counts by the number of tweets with the text.
+        The analysis is unchanged. Default is False.
+    collapse_clusters : bool
+        Analyse only the first tweet of each cluster of near-duplicates
+        given by the cluster_id column of cluster_near_duplicates, so
+        that spam and copypasta count once. Default is False.
+    cache : OutputCache
+        Cache of the outputs of previous runs. A run on the same tweets
+        with the same parameters restores the stored files and returns
+        the cached tables without analysing the tweets again. Runs
+        updating a state are not cached. Default is None.
+    json_format : str
+        Format of the stored json files, 'json' to store each table as
+        a json string, or 'ndjson' to write one record per line to
+        all_tweets.ndjson, top_tweets.ndjson,
+        sentiment_group_detail.ndjson, tokens_sentiments.ndjson and
+        tweets_sums.ndjson, which are streamed and decoded once, see
+        iter_ndjson and read_ndjson. Default is 'json'.
+    by_keyword : bool
+        Report every aggregate for each keyword of the tweets, such as
+        the tweets of a list of keywords of get_store: the top tweets,
+        sentiment groups and token counts get a keyword column, and the
+        totals are a list with the totals of each keyword. The keywords
+        are grouped in the same pass over the tweets. Default is False
+        which reports them over every keyword, the totals then holding
+        the list of keywords when there are several.
+    instrumentation : Instrumentation
+        Records the time of the stage, of the sentiment scoring, the
+        groupbys and the storage of each chunk, and of the final tables.
+        Default is None.
 
     Returns
     -------
     analytics_df: dataframe
         Dataframe object where includes average number
         of retweets, the total number of comments, most
-        used hashtags and the average number of likes
+        used hashtags and the average number of likes.
+        With chunksize, the first dataframe is replaced by the
+        path of the analysis_all_tweets table, or None when
+        store_csvs is False.
 
     Examples
     --------
@@ -305,10 +734,10 @@ def analytics(input_file, store_json=True, store_csvs=False):
     >>> report = analytics(df,keyword)
     """
 
-    # checking the input_file argument to be url path
-    if not isinstance(input_file, str):
+    # checking the input_file argument to be url path or a table
+    if not is_table(input_file):
         raise TypeError(
-            "Invalid parameter input type: input_file must be entered as a string of url"
+            "Invalid parameter input type: input_file must be entered as a string of url or a table"
         )
     if not isinstance(store_json, bool):
         raise TypeError(
@@ -318,121 +747,289 @@ def analytics(input_file, store_json=True, store_csvs=False):
         raise TypeError(
             "Invalid parameter input type: store_csvs must be entered as a boolean"
         )
+    if store_path is None and isinstance(input_file, str):
+        store_path = os.path.dirname(input_file)
+    if store_path is None:
+        # tables given without a store_path are analysed in memory only
+        store_json = store_csvs = False
+    if storage_format is None:
+        storage_format = (
+            infer_storage_format(input_file) if isinstance(input_file, str) else "csv"
+        )
+    check_storage_format(storage_format)
+    if chunksize is not None:
+        if not isinstance(chunksize, int):
+            raise TypeError(
+                "Invalid parameter input type: chunksize must be entered as an integer"
+            )
+        if chunksize <= 0:
+            raise ValueError(
+                "Invalid parameter input value: chunksize must be a positive integer"
+            )
+    if not isinstance(workers, int):
+        raise TypeError(
+            "Invalid parameter input type: workers must be entered as an integer"
+        )
+    if workers < 1:
+        raise ValueError(
+            "Invalid parameter input value: workers must be a positive integer"
+        )
+    if sentiment_cache is None:
+        sentiment_cache = SentimentCache()
+    if not isinstance(sentiment_cache, SentimentCache):
+        raise TypeError(
+            "Invalid parameter input type: sentiment_cache must be entered as a SentimentCache"
+        )
+    if sentiment_backend not in SENTIMENT_BACKENDS:
+        raise ValueError(
+            "Invalid parameter input value: sentiment_backend must be of either string textblob or lexicon"
+        )
+    if not isinstance(approximate, bool):
+        raise TypeError(
+            "Invalid parameter input type: approximate must be entered as a boolean"
+        )
+    if not isinstance(sketch_error, float):
+        raise TypeError(
+            "Invalid parameter input type: sketch_error must be entered as a float"
+        )
+    if not 0 < sketch_error < 1:
+        raise ValueError(
+            "Invalid parameter input value: sketch_error must be between 0 and 1"
+        )
+    if isinstance(corpus, str):
+        corpus = TokenCorpus.load(corpus)
+    if corpus is not None and not isinstance(corpus, TokenCorpus):
+        raise TypeError(
+            "Invalid parameter input type: corpus must be entered as a string of url or a TokenCorpus"
+        )
+    if not isinstance(compact, bool):
+        raise TypeError(
+            "Invalid parameter input type: compact must be entered as a boolean"
+        )
+    if not isinstance(dedup, bool):
+        raise TypeError(
+            "Invalid parameter input type: dedup must be entered as a boolean"
+        )
+    if not isinstance(collapse_clusters, bool):
+        raise TypeError(
+            "Invalid parameter input type: collapse_clusters must be entered as a boolean"
+        )
+    if cache is not None and not isinstance(cache, OutputCache):
+        raise TypeError(
+            "Invalid parameter input type: cache must be entered as an OutputCache"
+        )
+    check_json_format(json_format)
+    if not isinstance(by_keyword, bool):
+        raise TypeError(
+            "Invalid parameter input type: by_keyword must be entered as a boolean"
+        )
+    cache_key = None
+    if cache is not None and state is None:
+        # the tables only depend on the tweets, the corpus and these parameters
+        cache_key = cache.key(
+            "analytics",
+            [input_file, corpus],
+            {
+                "store_json": store_json,
+                "store_csvs": store_csvs,
+                "storage_format": storage_format,
+                "chunksize": chunksize,
+                "sentiment_backend": sentiment_backend,
+                "store_path": store_path and os.path.abspath(store_path),
+                "approximate": approximate,
+                "sketch_error": sketch_error,
+                "compact": compact,
+                "dedup": dedup,
+                "collapse_clusters": collapse_clusters,
+                "json_format": json_format,
+                "by_keyword": by_keyword,
+            },
+        )
+        if cache_key is not None:
+            cached = cache.load(cache_key)
+            if cached is not None:
+                return cached
+    if state is None:
+        state = AnalyticsState(
+            sketch_capacity=math.ceil(1 / sketch_error) if approximate else None
+        )
+    if not isinstance(state, AnalyticsState):
+        raise TypeError(
+            "Invalid parameter input type: state must be entered as an AnalyticsState"
+        )
 
-    df = pd.read_csv(input_file, converters={"tokens": ast.literal_eval})
-
-    result = {}  # for storing the result from each part
-
-    # group by keyword and get sums
-    df_sum = df.groupby("keyword").sum()
-
-    # add keyword to result
-    result["keyword"] = df_sum.index.values[0]
-
-    # add sum of like, comment and retweets
-    result["total_number_of_tweets"] = len(df)
-    result["total_number_of_likes"] = df_sum["like_count"].values[0]
-    result["total_number_of_comments"] = df_sum["reply_count"].values[0]
-    result["total_number_of_retweets"] = df_sum["retweetcount"].values[0]
-
-    # determining the sentiment of the tweet
-    df["sentiment_polarity"] = df["text"].map(lambda x: TextBlob(x).sentiment.polarity)
-    df["sentiment_type"] = df["sentiment_polarity"].map(
-        lambda x: "positive" if x > 0 else ("negative" if x < 0 else "neutral")
-    )
-
-    # adding all df to result
-    all_tweets = df.to_json(orient="records")
-
-    # adding sentiment group data
-    df_sentiment_group = df.groupby("sentiment_type").agg(
-        {
-            "retweetcount": "sum",
-            "reply_count": "sum",
-            "like_count": "sum",
-            "quote_count": "sum",
-            "word_count": "sum",
-            "sentiment_polarity": "sum",
-        }
-    )
-    df_sentiment_group["tweet_count"] = df.groupby("sentiment_type").agg(
-        {"sentiment_polarity": "count"}
-    )["sentiment_polarity"]
-
-    df_sentiment_group.reset_index(inplace=True)
+    list_columns = ["hashtags"] if corpus is not None else ["tokens", "hashtags"]
+    if chunksize is None:
+        chunks = [load_table(input_file, list_columns=list_columns)]
+    else:
+        chunks = iter_chunks(input_file, chunksize, list_columns=list_columns)
 
-    df_sentiment_group["tweet_group_percentage"] = (
-        df_sentiment_group["tweet_count"] / sum(df_sentiment_group["tweet_count"]) * 100
-    )
+    if store_csvs:
+        all_tweets_path = table_path(store_path, "analysis_all_tweets", storage_format)
+
+    df = None
+    row = 0  # position of the first tweet of the chunk in the corpus
+    seen_clusters = set()
+    with contextlib.ExitStack() as stack:
+        pool = stack.enter_context(PartitionPool(workers))
+        scorer = functools.partial(pool.map, SENTIMENT_BACKENDS[sentiment_backend])
+        if store_json and json_format == "json":
+            # all tweets are dumped as one json string, written piece by piece
+            all_tweets_file = stack.enter_context(
+                open(os.path.join(store_path, "all_tweets.json"), "w")
+            )
+            all_tweets_file.write('"[')
+            all_tweets_separator = ""
+        elif store_json:
+            all_tweets_writer = stack.enter_context(
+                NDJSONWriter(os.path.join(store_path, "all_tweets.ndjson"))
+            )
+        if store_csvs and chunksize is not None:
+            all_tweets_table = stack.enter_context(TableAppender(all_tweets_path))
+
+        for df in chunks:
+            chunk_corpus = None
+            if corpus is not None:
+                if row + len(df) > len(corpus):
+                    raise ValueError(
+                        "Invalid parameter input value: corpus must hold the tokens of every tweet of input_file"
+                    )
+                chunk_corpus = corpus.slice(row, row + len(df))
+                row += len(df)
+
+            if collapse_clusters:
+                if "cluster_id" not in df.columns:
+                    raise ValueError(
+                        "Invalid parameter input value: collapse_clusters requires the cluster_id column of cluster_near_duplicates"
+                    )
+                # keep the first tweet of each cluster, over every chunk
+                clusters = df["cluster_id"]
+                keep = ~(clusters.duplicated() | clusters.isin(seen_clusters)).to_numpy()
+                seen_clusters.update(clusters[keep])
+                df = df[keep].copy()
+                if chunk_corpus is not None:
+                    chunk_corpus = chunk_corpus.take(np.flatnonzero(keep))
+
+            if compact:
+                df = compact_frame(df)
+
+            # determining the sentiment of the tweet, once per distinct text
+            # with dedup
+            groups = DuplicateGroups.from_values(df["text"]) if dedup else None
+            texts = groups.representatives(df["text"]) if dedup else df["text"]
+            with measure("analytics.sentiment", rows=len(texts)):
+                if sentiment_backend == "textblob":
+                    polarity = sentiment_cache.score(texts, scorer)
+                else:
+                    polarity = scorer(texts)
+            if dedup:
+                polarity = groups.broadcast(polarity, df.index)
+            df["sentiment_polarity"] = polarity
+            df["sentiment_type"] = sentiment_type(df["sentiment_polarity"])
+            if compact:
+                df["sentiment_type"] = df["sentiment_type"].astype("category")
+            df["sum_like_retweet"] = df["like_count"] + df["retweetcount"]
+
+            # adding the sums, sentiment groups, tokens and top tweets
+            with measure("analytics.groupby", rows=len(df)):
+                state.update(df, chunk_corpus, groups)
+
+            # adding all df to result
+            with measure("analytics.store", rows=len(df)):
+                if store_json and json_format == "json":
+                    records = json.dumps(df.to_json(orient="records"))[2:-2]
+                    if records:
+                        all_tweets_file.write(all_tweets_separator + records)
+                        all_tweets_separator = ","
+                elif store_json:
+                    all_tweets_writer.write_frame(df)
+                if store_csvs and chunksize is not None:
+                    all_tweets_table.append(df)
+
+        if store_json and json_format == "json":
+            all_tweets_file.write(']"')
+
+    if corpus is not None and row != len(corpus):
+        raise ValueError(
+            "Invalid parameter input value: corpus must hold the tokens of every tweet of input_file"
+        )
 
-    sentiment_group_detail_json = df_sentiment_group.to_json(orient="records")
+    with measure("analytics.totals"):
+        result = state.keyword_totals() if by_keyword else state.totals()
+        df_sum, df_top_tweets, df_sentiment_group, df_tokens_sentiments = state.to_frames(
+            by_keyword
+        )
 
-    # adding tokens and sentiment data
-    df_tokens_sentiments = df[["tokens", "sentiment_type"]].explode("tokens")
-    df_tokens_sentiments = (
-        df_tokens_sentiments.groupby(["tokens", "sentiment_type"])
-        .size()
-        .sort_values(ascending=False)
-        .reset_index(name="count")
-    )
+    if chunksize is not None:
+        # the tweets were streamed to disk
+        df = all_tweets_path if store_csvs else None
 
-    tokens_sentiments = df_tokens_sentiments.to_json(orient="records")
-
-    # get top tweet based on sum of likes + retweets
-    df["sum_like_retweet"] = df["like_count"] + df["retweetcount"]
-    df_top_tweets = (
-        df.sort_values("sum_like_retweet")
-        .drop_duplicates(["reference_id"])
-        .nlargest(10, "sum_like_retweet")[
-            [
-                "text",
-                "retweetcount",
-                "like_count",
-                "hashtags",
-                "sentiment_polarity",
-                "sentiment_type",
+    # Saving analysis as json and csvs
+    stored_files = []
+    if store_json and json_format == "json":
+        stored_files = [
+            os.path.join(store_path, name)
+            for name in [
+                "all_tweets.json",
+                "top_tweets.json",
+                "sentiment_group_detail_json.json",
+                "tokens_sentiments.json",
+                "tweets_sums.json",
             ]
         ]
-    )
+        sentiment_group_detail_json = df_sentiment_group.to_json(orient="records")
+        tokens_sentiments = df_tokens_sentiments.to_json(orient="records")
+        top_tweets_json = df_top_tweets.to_json(orient="records")
 
-    top_tweets_json = df_top_tweets.to_json(orient="records")
-
-    # Saving analysis as json and csvs
-    folder_path = input_file.split("/")[0]
-    if store_json:
-        with open(os.path.join(folder_path, "all_tweets.json"), "w") as file:
-            json.dump(all_tweets, file, indent=4, sort_keys=True)
-
-        with open(os.path.join(folder_path, "top_tweets.json"), "w") as file:
+        with open(os.path.join(store_path, "top_tweets.json"), "w") as file:
             json.dump(top_tweets_json, file, indent=4, sort_keys=True)
 
         with open(
-            os.path.join(folder_path, "sentiment_group_detail_json.json"), "w"
+            os.path.join(store_path, "sentiment_group_detail_json.json"), "w"
         ) as file:
             json.dump(sentiment_group_detail_json, file, indent=4, sort_keys=True)
 
-        with open(os.path.join(folder_path, "tokens_sentiments.json"), "w") as file:
+        with open(os.path.join(store_path, "tokens_sentiments.json"), "w") as file:
             json.dump(tokens_sentiments, file, indent=4, sort_keys=True)
 
-        with open(os.path.join(folder_path, "tweets_sums.json"), "w") as file:
+        with open(os.path.join(store_path, "tweets_sums.json"), "w") as file:
             json.dump(result, file, indent=4, sort_keys=True)
+    elif store_json:
+        records = {
+            "top_tweets": df_top_tweets,
+            "sentiment_group_detail": df_sentiment_group,
+            "tokens_sentiments": df_tokens_sentiments,
+            "tweets_sums": result if by_keyword else [result],
+        }
+        for name, data in records.items():
+            write_ndjson(data, os.path.join(store_path, name + ".ndjson"))
+        stored_files = [
+            os.path.join(store_path, name + ".ndjson")
+            for name in ["all_tweets", *records]
+        ]
 
     if store_csvs:
-        df.to_csv(os.path.join(folder_path, "analysis_all_tweets.csv"), index=False)
-        df_sum.to_csv(os.path.join(folder_path, "analysis_sums.csv"), index=False)
-        df_top_tweets.to_csv(
-            os.path.join(folder_path, "analysis_top_tweets.csv"), index=False
-        )
-        df_sentiment_group.to_csv(
-            os.path.join(folder_path, "analysis_sentiment_group.csv"), index=False
-        )
-        df_tokens_sentiments.to_csv(
-            os.path.join(folder_path, "analysis_tokens_sentiments.csv"), index=False
-        )
+        tables = {
+            "analysis_sums": df_sum,
+            "analysis_top_tweets": df_top_tweets,
+            "analysis_sentiment_group": df_sentiment_group,
+            "analysis_tokens_sentiments": df_tokens_sentiments,
+        }
+        if chunksize is None:
+            tables["analysis_all_tweets"] = df
+        for name, table in tables.items():
+            write_table(table, table_path(store_path, name, storage_format))
+        stored_files += [table_path(store_path, name, storage_format) for name in tables]
+        if chunksize is not None:
+            stored_files.append(all_tweets_path)
 
-    return (df, df_sum, df_top_tweets, df_sentiment_group, df_tokens_sentiments)
+    results = (df, df_sum, df_top_tweets, df_sentiment_group, df_tokens_sentiments)
+    if cache_key is not None:
+        cache.save(cache_key, results, stored_files)
+    return results
 
 
+@instrumented("plot_tweets")
 def plot_tweets(
     all_tweets_file,
     analysis_sums_file=None,
@@ -440,91 +1037,103 @@ def plot_tweets(
     analysis_sentiment_group_file=None,
     analysis_tokens_sentiments_file=None,
     save_plots=True,
+    store_path=None,
+    approximate=False,
+    sketch_error=0.0001,
+    workers=1,
+    cache=None,
+    instrumentation=None,
 ):
 
-    if not isinstance(all_tweets_file, str):
+    if not is_table(all_tweets_file):
         raise TypeError(
-            "Invalid parameter input type: all_tweets_file path must be entered as a string"
+            "Invalid parameter input type: all_tweets_file path must be entered as a string or a table"
         )
-    if not isinstance(analysis_tokens_sentiments_file, str):
+    if not is_table(analysis_tokens_sentiments_file):
         raise TypeError(
-            "Invalid parameter input type: analysis_tokens_sentiments_file path must be entered as a string"
+            "Invalid parameter input type: analysis_tokens_sentiments_file path must be entered as a string or a table"
         )
     if not isinstance(save_plots, bool):
         raise TypeError(
             "Invalid parameter input type: save_plots must be entered as a boolean"
         )
+    if not isinstance(approximate, bool):
+        raise TypeError(
+            "Invalid parameter input type: approximate must be entered as a boolean"
+        )
+    if not isinstance(workers, int):
+        raise TypeError(
+            "Invalid parameter input type: workers must be entered as an integer"
+        )
+    if workers < 1:
+        raise ValueError(
+            "Invalid parameter input value: workers must be a positive integer"
+        )
 
-    all_tweets_df = pd.read_csv(
-        all_tweets_file, converters={"hashtags": ast.literal_eval}
-    )
-    tokens_sentiments_df = pd.read_csv(analysis_tokens_sentiments_file)
-    folder_path = all_tweets_file.split("/")[0]
+    if cache is not None and not isinstance(cache, OutputCache):
+        raise TypeError(
+            "Invalid parameter input type: cache must be entered as an OutputCache"
+        )
 
-    # word clouds
-    stopwords = set(STOPWORDS)
+    if store_path is None and isinstance(all_tweets_file, str):
+        store_path = os.path.dirname(all_tweets_file)
+    if store_path is None:
+        # plots of tables given without a store_path are not saved
+        save_plots = False
+    plot_files = []
+    if save_plots:
+        plot_files = [
+            os.path.join(store_path, name)
+            for name in [
+                "word_cloud_positive.png",
+                "word_cloud_negative.png",
+                "top_words_plot.png",
+                "top_hashtags_plot.png",
+            ]
+        ]
 
-    # positive words
-    words_string_positive = (
-        " ".join(tokens_sentiments_df.query('sentiment_type == "positive"')["tokens"])
-        + " "
-    )
+    cache_key = None
+    if cache is not None:
+        cache_key = cache.key(
+            "plot_tweets",
+            [all_tweets_file, analysis_tokens_sentiments_file],
+            {
+                "save_plots": save_plots,
+                "store_path": store_path and os.path.abspath(store_path),
+                "approximate": approximate,
+                "sketch_error": sketch_error,
+            },
+        )
+        if cache_key is not None:
+            cached = cache.load(cache_key)
+            if cached is not None:
+                # the cached word clouds are drawn again, their images are restored
+                for wordcloud in cached[:2]:
+                    _word_cloud_figure(wordcloud)
+                return cached
 
-    wordcloud_positive = WordCloud(
-        width=800,
-        height=800,
-        background_color="white",
-        colormap="YlGn",
-        stopwords=stopwords,
-        min_font_size=10,
-    ).generate(words_string_positive)
-
-    plt.figure(figsize=(8, 8), facecolor=None)
-    plt.imshow(wordcloud_positive)
-    plt.axis("off")
-    plt.tight_layout(pad=0)
-
-    # Saving positive word cloud
-    if save_plots:
-        plt.savefig(os.path.join(folder_path, "word_cloud_positive.png"))
+    import altair as alt
 
-    # negative words
-    words_string_negative = (
-        " ".join(tokens_sentiments_df.query('sentiment_type == "negative"')["tokens"])
-        + " "
-    )
+    tokens_sentiments_df = load_table(analysis_tokens_sentiments_file)
 
-    wordcloud_negative = WordCloud(
-        width=800,
-        height=800,
-        background_color="white",
-        colormap="Reds",
-        stopwords=stopwords,
-        min_font_size=10,
-    ).generate(words_string_negative)
-
-    plt.figure(figsize=(8, 8), facecolor=None)
-    plt.imshow(wordcloud_negative)
-    plt.axis("off")
-    plt.tight_layout(pad=0)
-
-    # Saving negative word cloud
-    if save_plots:
-        plt.savefig(os.path.join(folder_path, "word_cloud_negative.png"))
+    # word clouds of the token counts of each sentiment
+    frequencies_positive = _cloud_frequencies(tokens_sentiments_df, "positive")
+    frequencies_negative = _cloud_frequencies(tokens_sentiments_df, "negative")
 
     # plot top word distribution
-    top_words = (
-        tokens_sentiments_df.groupby("tokens")
-        .sum()
-        .reset_index()
-        .sort_values("count", ascending=False)
-    )
-    top_words = (
-        top_words.query("tokens.str.len() >= 4")
-        .nlargest(20, "count")["tokens"]
-        .to_list()
-    )
-    top_words_df = tokens_sentiments_df.query("tokens in @top_words")
+    with measure("plot_tweets.top_words", rows=len(tokens_sentiments_df)):
+        top_words = (
+            tokens_sentiments_df.groupby("tokens")
+            .sum(numeric_only=True)
+            .reset_index()
+            .sort_values("count", ascending=False)
+        )
+        top_words = (
+            top_words.query("tokens.str.len() >= 4")
+            .nlargest(20, "count")["tokens"]
+            .to_list()
+        )
+        top_words_df = tokens_sentiments_df.query("tokens in @top_words")
 
     top_words_plot = (
         alt.Chart(data=top_words_df)
@@ -536,20 +1145,31 @@ def plot_tweets(
         )
     )
 
-    top_words_plot.save(
-        os.path.join(folder_path, "top_words_plot.png"), scale_factor=2.0
-    )
-
     # plot hashtag counts
-    hash_tags_df = all_tweets_df["hashtags"].explode("hashtags").dropna().reset_index()
-    top_hash_tags_df = (
-        hash_tags_df.groupby("hashtags")
-        .count()
-        .sort_values("index", ascending=False)
-        .reset_index()
-        .nlargest(15, "index")
-    )
-    top_hash_tags_df.rename(columns={"index": "count"}, inplace=True)
+    with measure("plot_tweets.top_hashtags"):
+        if approximate:
+            # count the hashtags chunk by chunk in fixed memory
+            hashtags_sketch = SpaceSaving.from_error(sketch_error)
+            for df in iter_chunks(all_tweets_file, _PLOT_CHUNKSIZE, ["hashtags"]):
+                hashtags_sketch.update(df["hashtags"].explode())
+            top_hash_tags_df = (
+                hashtags_sketch.top(15)
+                .rename(columns={"item": "hashtags"})
+                .drop(columns="error")
+            )
+        else:
+            all_tweets_df = load_table(all_tweets_file, list_columns=["hashtags"])
+            hash_tags_df = (
+                all_tweets_df["hashtags"].explode("hashtags").dropna().reset_index()
+            )
+            top_hash_tags_df = (
+                hash_tags_df.groupby("hashtags")
+                .count()
+                .sort_values("index", ascending=False)
+                .reset_index()
+                .nlargest(15, "index")
+            )
+            top_hash_tags_df.rename(columns={"index": "count"}, inplace=True)
 
     top_hashtags_plot = (
         alt.Chart(data=top_hash_tags_df)
@@ -557,8 +1177,85 @@ def plot_tweets(
         .encode(alt.X("count"), alt.Y("hashtags", sort="-x"))
     )
 
-    top_hashtags_plot.save(
-        os.path.join(folder_path, "top_hashtags_plot.png"), scale_factor=2.0
+    # lay the word clouds out and save the charts in parallel
+    tasks = [
+        functools.partial(_word_cloud, frequencies_positive, "YlGn"),
+        functools.partial(_word_cloud, frequencies_negative, "Reds"),
+    ]
+    if save_plots:
+        tasks += [
+            functools.partial(_save_chart, top_words_plot, plot_files[2]),
+            functools.partial(_save_chart, top_hashtags_plot, plot_files[3]),
+        ]
+    with PartitionPool(workers) as pool:
+        with measure("plot_tweets.render"):
+            wordcloud_positive, wordcloud_negative = pool.run(tasks)[:2]
+
+    for position, wordcloud in enumerate([wordcloud_positive, wordcloud_negative]):
+        _word_cloud_figure(wordcloud, plot_files[position] if save_plots else None)
+
+    plots = (wordcloud_positive, wordcloud_negative, top_words_plot, top_hashtags_plot)
+    if cache_key is not None:
+        cache.save(cache_key, plots, plot_files)
+    return plots
+
+
+def _cloud_frequencies(tokens_sentiments_df, sentiment):
+    """Returns the count of each token of a sentiment type, without the
+    stopwords, numbers and single characters WordCloud.generate skips."""
+    from wordcloud import STOPWORDS
+
+    tokens_df = tokens_sentiments_df[
+        tokens_sentiments_df["sentiment_type"] == sentiment
+    ]
+    if "keyword" in tokens_df.columns:
+        # the counts of each keyword, of analytics with by_keyword
+        tokens_df = (
+            tokens_df.groupby("tokens", sort=False)["count"]
+            .sum()
+            .sort_values(ascending=False, kind="stable")
+            .reset_index()
+        )
+    words = tokens_df["tokens"].astype(str)
+    keep = (
+        ~words.str.lower().isin(STOPWORDS)
+        & ~words.str.isdigit()
+        & (words.str.len() >= 2)
     )
+    return dict(zip(words[keep], tokens_df["count"][keep].tolist()))
+
+
+def _word_cloud(frequencies, colormap):
+    """Lays out the word cloud of token frequencies."""
+    from wordcloud import WordCloud
+
+    with measure("plot_tweets.word_cloud", rows=len(frequencies)):
+        return WordCloud(
+            width=800,
+            height=800,
+            background_color="white",
+            colormap=colormap,
+            min_font_size=10,
+        ).generate_from_frequencies(frequencies)
+
+
+def _word_cloud_figure(wordcloud, file_path=None):
+    """Draws a word cloud in a matplotlib figure, saved to file_path unless
+    it is None."""
+    import matplotlib.pyplot as plt
+
+    with measure("plot_tweets.word_cloud_figure"):
+        plt.figure(figsize=(8, 8), facecolor=None)
+        plt.imshow(wordcloud)
+        plt.axis("off")
+        plt.tight_layout(pad=0)
+
+        # Saving word cloud
+        if file_path is not None:
+            plt.savefig(file_path)
+
 
-    return (wordcloud_positive, wordcloud_negative, top_words_plot, top_hashtags_plot)
+def _save_chart(chart, file_path):
+    """Saves an altair chart as an image, through altair_saver."""
+    with measure("plot_tweets.save_chart"):
+        chart.save(file_path, scale_factor=2.0)
@@ -0,0 +1,60 @@
+import json
+import os
+
+import pytest
+
+from tweetlytics import fetch
+
+_OUTPUT_PATH = os.path.join(os.path.dirname(__file__), "output")
+
+
+class FakeResponse:
+    status_code = 200
+    headers = {}
+
+    def __init__(self, payload):
+        self.payload = payload
+
+    def raise_for_status(self):
+        pass
+
+    def json(self):
+        return json.loads(json.dumps(self.payload))
+
+
+class FakeSession:
+    """Replays the recorded sample response in pages of 25 tweets."""
+
+    def __init__(self, page_size=25):
+        with open(os.path.join(_OUTPUT_PATH, "tweets_response.json")) as file:
+            response = json.load(file)
+        data = response["data"]
+        self.pages = [data[i : i + page_size] for i in range(0, len(data), page_size)]
+        self.users = response["includes"]["users"]
+        self.requests = []
+
+    def get(self, url, params=None, headers=None):
+        self.requests.append(dict(params))
+        index = int(params.get("next_token", 0))
+        data = self.pages[index][: int(params["max_results"])]
+        meta = {
+            "result_count": len(data),
+            "newest_id": data[0]["id"],
+            "oldest_id": data[-1]["id"],
+        }
+        if index + 1 < len(self.pages):
+            meta["next_token"] = str(index + 1)
+        return FakeResponse(
+            {"data": data, "includes": {"users": self.users}, "meta": meta}
+        )
+
+    def close(self):
+        pass
+
+
+@pytest.fixture
+def fake_session(monkeypatch):
+    """Sends the requests of get_store to a FakeSession, and returns the
+    FakeSession class."""
+    monkeypatch.setattr(fetch.requests, "Session", FakeSession)
+    return FakeSession
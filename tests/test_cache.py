@@ -0,0 +1,89 @@
+import multiprocessing
+import os
+import shutil
+
+import matplotlib.pyplot as plt
+import pandas as pd
+
+from tweetlytics.cache import OutputCache
+from tweetlytics.storage import read_table
+from tweetlytics.tweetlytics import analytics, plot_tweets
+
+
+def test_output_cache(tmp_path):
+    """
+    Test the cache of the outputs of analytics() and plot_tweets().
+    - Check that a second run on the same file returns the cached tables
+      and restores the stored files
+    - Check that changed tweets or parameters are analysed again
+    - Check that a cached plot_tweets() draws its word clouds again
+    - Check that the least recently used runs are evicted over max_size
+    """
+    shutil.copy("output/clean_tweets.csv", tmp_path)
+    file_path = os.path.join(tmp_path, "clean_tweets.csv")
+    cache = OutputCache(os.path.join(tmp_path, "cache"))
+
+    expected = analytics(file_path, store_csvs=True, cache=cache)
+    os.remove(os.path.join(tmp_path, "tweets_sums.json"))
+    results = analytics(file_path, store_csvs=True, cache=cache)
+    assert (cache.hits, cache.misses) == (1, 1)
+    for table, expected_table in zip(results, expected):
+        pd.testing.assert_frame_equal(table, expected_table)
+    assert os.path.exists(os.path.join(tmp_path, "tweets_sums.json"))
+
+    analytics(file_path, store_csvs=True, sentiment_backend="lexicon", cache=cache)
+    df = read_table(file_path).iloc[:50]
+    df.to_csv(file_path, index=False)
+    analytics(file_path, store_csvs=True, cache=cache)
+    assert (cache.hits, cache.misses) == (1, 3)
+    assert len(OutputCache(cache.folder_path).manifest) == 3
+
+    tokens_df = read_table("output/analysis_tokens_sentiments.csv")
+    plots = plot_tweets(results[0], analysis_tokens_sentiments_file=tokens_df, cache=cache)
+    figures = len(plt.get_fignums())
+    cached_plots = plot_tweets(
+        results[0], analysis_tokens_sentiments_file=tokens_df, cache=cache
+    )
+    assert cache.hits == 2
+    # the word clouds of the cached run are drawn too
+    assert len(plt.get_fignums()) == figures + 2
+    assert cached_plots[0].layout_ == plots[0].layout_
+
+    small_cache = OutputCache(cache.folder_path, max_size=cache.size() // 2)
+    analytics(file_path, store_csvs=True, sentiment_backend="lexicon", cache=small_cache)
+    assert small_cache.size() <= small_cache.max_size
+    assert len(small_cache.manifest) < 4
+
+
+def _save_runs(folder_path, worker):
+    cache = OutputCache(folder_path)
+    for run in range(10):
+        cache.save(f"{worker}-{run}", run, [])
+
+
+def test_shared_cache(tmp_path):
+    """
+    Test a cache shared by several processes.
+    - Check that concurrent saves keep every run in the manifest
+    - Check that a run removed by another process is a miss
+    """
+    folder_path = str(tmp_path / "cache")
+    context = multiprocessing.get_context("spawn")
+    processes = [
+        context.Process(target=_save_runs, args=(folder_path, worker)) for worker in range(3)
+    ]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+    cache = OutputCache(folder_path)
+    assert len(cache.manifest) == 30
+    assert sorted(os.listdir(folder_path)) == sorted(
+        [*cache.manifest, "manifest.json", "manifest.lock"]
+    )
+
+    assert cache.load("0-1") == 1
+    shutil.rmtree(os.path.join(folder_path, "0-2"))
+    assert cache.load("0-2") is None
+    assert (cache.hits, cache.misses) == (1, 1)
+    assert "0-2" not in OutputCache(folder_path).manifest
@@ -0,0 +1,140 @@
+import json
+import os
+
+import pandas as pd
+
+from tweetlytics import fetch
+from tweetlytics.checkpoint import load_checkpoints
+from tweetlytics.tweetlytics import get_store
+
+
+class SearchResponse:
+    status_code = 200
+    headers = {}
+
+    def __init__(self, payload):
+        self.payload = payload
+
+    def raise_for_status(self):
+        pass
+
+    def json(self):
+        return json.loads(json.dumps(self.payload))
+
+
+class SearchSession:
+    """Searches the recorded sample tweets, newest first, honouring
+    since_id, until_id, max_results and next_token."""
+
+    tweets = []
+    requests = []
+
+    def get(self, url, params=None, headers=None):
+        SearchSession.requests.append(dict(params))
+        tweets = [
+            tweet
+            for tweet in self.tweets
+            if int(tweet["id"]) > int(params.get("since_id", 0))
+            and int(tweet["id"]) < int(params.get("until_id", 2 ** 63))
+        ]
+        offset = int(params.get("next_token", 0))
+        page_size = int(params["max_results"])
+        data = tweets[offset : offset + page_size]
+        meta = {"result_count": len(data)}
+        if offset + page_size < len(tweets):
+            meta["next_token"] = str(offset + page_size)
+        payload = {"meta": meta}
+        if data:
+            payload["data"] = data
+        return SearchResponse(payload)
+
+    def close(self):
+        pass
+
+
+def test_get_store_resume(tmp_path, monkeypatch):
+    """
+    Test resumable ingestion with get_store().
+    - Check that a search stopped at the budget is continued on re-run
+    - Check that only tweets newer than the checkpoint are requested
+    - Check that the csv store holds each tweet once
+    """
+    with open("tests/output/tweets_response.json") as file:
+        sample = sorted(
+            json.load(file)["data"], key=lambda tweet: int(tweet["id"]), reverse=True
+        )
+    monkeypatch.setattr(fetch.requests, "Session", SearchSession)
+    SearchSession.tweets = sample[20:]
+    SearchSession.requests = []
+
+    def run(max_tweets):
+        return get_store(
+            "token",
+            keyword="vancouver",
+            start_date="2022-01-20",
+            end_date="2022-01-29",
+            store_path=str(tmp_path),
+            store_csv=True,
+            api_access_lvl="academic",
+            max_results=20,
+            max_tweets=max_tweets,
+            resume=True,
+        )
+
+    first = run(50)
+    checkpoint = load_checkpoints(os.path.join(tmp_path, "tweets_checkpoint.json"))
+    assert first["id"].nunique() == 50
+    assert checkpoint["vancouver"]["query"]["until_id"] == sample[69]["id"]
+
+    second = run(1000)
+    checkpoint = load_checkpoints(os.path.join(tmp_path, "tweets_checkpoint.json"))
+    assert second["id"].nunique() == 30
+    assert checkpoint["vancouver"]["newest_id"] == sample[20]["id"]
+    assert checkpoint["vancouver"]["oldest_id"] == sample[-1]["id"]
+
+    # new tweets were posted since the last run
+    SearchSession.tweets = sample
+    SearchSession.requests = []
+    third = run(1000)
+    assert third["id"].nunique() == 20
+    assert SearchSession.requests[0]["since_id"] == sample[20]["id"]
+    assert "start_time" not in SearchSession.requests[0]
+
+    tweets_csv = pd.read_csv(os.path.join(tmp_path, "tweets_response.csv"))
+    assert tweets_csv["id"].nunique() == 100
+    assert len(tweets_csv.drop_duplicates(["id", "reference_id"])) == len(tweets_csv)
+
+    # nothing is missing anymore
+    assert len(run(1000)) == 0
+
+
+def test_resume_after_unstored_run(tmp_path, monkeypatch):
+    """Test that a run without store_csv leaves no checkpoint, so a resumed
+    run stores every tweet."""
+    with open("tests/output/tweets_response.json") as file:
+        sample = sorted(
+            json.load(file)["data"], key=lambda tweet: int(tweet["id"]), reverse=True
+        )
+    monkeypatch.setattr(fetch.requests, "Session", SearchSession)
+    SearchSession.tweets = sample
+    SearchSession.requests = []
+
+    def run(store_csv, resume):
+        return get_store(
+            "token",
+            keyword="vancouver",
+            start_date="2022-01-20",
+            end_date="2022-01-29",
+            store_path=str(tmp_path),
+            store_csv=store_csv,
+            api_access_lvl="academic",
+            max_results=20,
+            max_tweets=1000,
+            resume=resume,
+        )
+
+    assert run(store_csv=False, resume=False)["id"].nunique() == 100
+    assert not os.path.exists(os.path.join(tmp_path, "tweets_checkpoint.json"))
+    assert run(store_csv=True, resume=True)["id"].nunique() == 100
+    tweets_csv = pd.read_csv(os.path.join(tmp_path, "tweets_response.csv"))
+    assert tweets_csv["id"].nunique() == 100
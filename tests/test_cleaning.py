@@ -0,0 +1,49 @@
+import pandas as pd
+
+from tweetlytics.cleaning import TweetCleaner
+from tweetlytics.tweetlytics import clean_tweets
+
+
+def clean_tweets_stepwise(df):
+    """The column by column cleaning TweetCleaner replaces."""
+    df["text"] = df["text"].str.replace(r"RT\s@.*:\s", "", regex=True)
+    df["text"] = df["text"].str.lower()
+    df["hashtags"] = df["text"].str.findall(r"#.*?(?=\s|$)")
+    df["text"] = df["text"].str.replace(r"@[A-Za-z0-9_]+", "", regex=True)
+    df["text"] = df["text"].str.replace(r"#[A-Za-z0-9_]+", "", regex=True)
+    df["text"] = df["text"].str.replace(r"http\S+", "", regex=True)
+    df["text"] = df["text"].str.replace(r"#[A-Za-z0-9_]+", "", regex=True)
+    df["text"] = df["text"].str.replace(r"[^\w\s]", "", regex=True)
+    df["tokens"] = df["text"].str.split()
+    df["word_count"] = df["tokens"].str.len()
+    df["tokens"] = df["tokens"].map(lambda x: list(set(x)))
+    return df.query("text.str.len() > 0")
+
+
+def test_clean_tweets_identical(tmp_path):
+    """Test that clean_tweets() gives the same output as the column by
+    column cleaning."""
+    file_path = str(tmp_path / "tweets_response.csv")
+    raw = pd.read_csv("tests/output/tweets_response.csv")
+    raw.loc[0, "text"] = "RT @a_b: Visit http#tag and #Vancouver @bob! http://t.co/x?y=1"
+    raw.to_csv(file_path, index=False)
+
+    df = clean_tweets(file_path, store_csv=False)
+    expected = clean_tweets_stepwise(raw.drop(columns=["public_metrics"]))
+
+    assert list(df.columns) == list(expected.columns)
+    for column in ["text", "hashtags", "word_count"]:
+        assert df[column].equals(expected[column])
+    assert df["tokens"].map(sorted).equals(expected["tokens"].map(sorted))
+
+
+def test_tweet_cleaner_steps():
+    """Test that cleaning steps can be switched off."""
+    text = "RT @user: Hello @Bob #World https://t.co/x!"
+    assert TweetCleaner().clean(text) == ("hello   ", ["#world"], ["hello"], 1)
+
+    cleaner = TweetCleaner(remove_hashtags=False, remove_punctuation=False)
+    clean_text, hashtags, tokens, count = cleaner.clean(text)
+    assert clean_text == "hello  #world "
+    assert sorted(tokens) == ["#world", "hello"]
+    assert count == 2
@@ -0,0 +1,53 @@
+import json
+import os
+
+import pandas as pd
+
+from tweetlytics.compact import compact_frame, memory_report
+from tweetlytics.storage import read_table
+from tweetlytics.tweetlytics import analytics, clean_tweets
+
+
+def test_compact_pipeline(tmp_path):
+    """
+    Test the compact dtypes of the tweets.
+    - Check that the values are unchanged, with string ids parsed exactly
+    - Check that the compact frame takes less memory in the report
+    - Check that compact cleaning and analytics give the same results
+    """
+    tweets = read_table("output/tweets_response.csv")
+    compact = compact_frame(tweets)
+    assert compact["keyword"].dtype == "category"
+    assert compact["like_count"].dtype == "int32"
+    assert compact["in_reply_to_user_id"].dtype == "Int64"
+    pd.testing.assert_frame_equal(
+        compact.astype(object), tweets.astype(object), check_dtype=False
+    )
+    ids = compact_frame(pd.DataFrame({"id": ["1487212424676867073", None]}))["id"]
+    assert ids[0] == 1487212424676867073 and pd.isna(ids[1])
+
+    report = memory_report(compact)
+    expected_report = memory_report(tweets)
+    assert report.loc["total", "bytes"] == report["bytes"].iloc[:-1].sum()
+    assert report.loc["total", "bytes"] < expected_report.loc["total", "bytes"] / 2
+
+    cleaned = clean_tweets(tweets, compact=True)
+    expected = clean_tweets(tweets)
+    assert cleaned["text"].to_list() == expected["text"].to_list()
+    assert cleaned["tokens"].to_list() == expected["tokens"].to_list()
+
+    for folder, table, compact in [("compact", cleaned, True), ("expected", expected, False)]:
+        os.makedirs(os.path.join(tmp_path, folder))
+        results = analytics(
+            table,
+            sentiment_backend="lexicon",
+            compact=compact,
+            store_path=os.path.join(tmp_path, folder),
+        )
+        if compact:
+            assert results[0]["sentiment_type"].dtype == "category"
+    for name in ["tweets_sums.json", "sentiment_group_detail_json.json", "top_tweets.json"]:
+        with open(os.path.join(tmp_path, "compact", name)) as file:
+            compact_json = json.load(file)
+        with open(os.path.join(tmp_path, "expected", name)) as file:
+            assert compact_json == json.load(file)
@@ -0,0 +1,58 @@
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+
+from tweetlytics.corpus import CorpusWriter, TokenCorpus
+from tweetlytics.tweetlytics import analytics, clean_tweets
+
+
+def test_token_corpus(tmp_path):
+    """
+    Test the integer-encoded token corpus.
+    - Check that the tokens of each tweet are decoded back
+    - Check that a corpus written in chunks is memory-mapped when loaded
+    - Check the token counts of each group
+    """
+    tokens = [["a", "b"], [], ["b", "c", "a"], ["d"]]
+    folder = os.path.join(tmp_path, "corpus")
+    with CorpusWriter(folder) as writer:
+        writer.append(tokens[:2])
+        writer.append(tokens[2:])
+    corpus = TokenCorpus.load(folder)
+    assert isinstance(corpus.token_ids, np.memmap)
+    assert corpus.token_ids.dtype == np.int32
+    assert [corpus.tokens(row) for row in range(len(corpus))] == tokens
+    assert corpus.slice(2, 4).tokens(0) == ["b", "c", "a"]
+    assert corpus.token_counts().to_dict() == {"a": 2, "b": 2, "c": 1, "d": 1}
+    assert corpus.group_token_counts(["x", "y", "x", "y"]).to_dict() == {
+        ("a", "x"): 2,
+        ("b", "x"): 2,
+        ("c", "x"): 1,
+        ("d", "y"): 1,
+    }
+
+
+def test_corpus_pipeline(tmp_path):
+    """Test that analytics() counts the same tokens from the corpus stored
+    by clean_tweets() as from the tokens column."""
+    shutil.copy("tests/output/tweets_response.csv", tmp_path)
+    file_path = os.path.join(tmp_path, "tweets_response.csv")
+    clean_tweets(file_path, chunksize=30, store_corpus=True)
+    clean_file = os.path.join(tmp_path, "clean_tweets.csv")
+    corpus_path = os.path.join(tmp_path, "clean_tweets_corpus")
+    assert len(TokenCorpus.load(corpus_path)) == len(pd.read_csv(clean_file))
+
+    expected = analytics(clean_file, store_json=False, sentiment_backend="lexicon")
+    results = analytics(
+        clean_file,
+        store_json=False,
+        sentiment_backend="lexicon",
+        corpus=corpus_path,
+        chunksize=40,
+    )
+    pd.testing.assert_frame_equal(
+        results[4].sort_values(["tokens", "sentiment_type"], ignore_index=True),
+        expected[4].sort_values(["tokens", "sentiment_type"], ignore_index=True),
+    )
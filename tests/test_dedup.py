@@ -0,0 +1,36 @@
+import pandas as pd
+
+from tweetlytics.dedup import DuplicateGroups
+from tweetlytics.storage import read_table
+from tweetlytics.tweetlytics import analytics, clean_tweets
+
+
+def test_duplicate_groups():
+    """
+    Test the groups of duplicate texts.
+    - Check the first row and the multiplicity of each group
+    - Check that the results of each group are copied to its rows
+    """
+    texts = pd.Series(["a", "b", "a", None, "b", "a", None], index=list("abcdefg"))
+    groups = DuplicateGroups.from_values(texts)
+    assert len(groups) == 3
+    assert groups.first.tolist() == [0, 1, 3]
+    assert groups.multiplicity.tolist() == [3, 2, 2]
+    results = groups.representatives(texts).str.upper()
+    assert groups.broadcast(results, texts.index).equals(texts.str.upper())
+
+
+def test_dedup_pipeline():
+    """Test that cleaning and analysing each distinct text once gives the
+    same cleaned tweets and analysis as processing every row."""
+    tweets = read_table("output/tweets_response.csv")
+    cleaned = clean_tweets(tweets, dedup=True)
+    expected = clean_tweets(tweets)
+    pd.testing.assert_frame_equal(cleaned, expected)
+    assert cleaned["text"].nunique() < len(cleaned)
+
+    for backend in ["textblob", "lexicon"]:
+        results = analytics(cleaned.copy(), sentiment_backend=backend, dedup=True)
+        expected_results = analytics(expected.copy(), sentiment_backend=backend)
+        for table, expected_table in zip(results, expected_results):
+            pd.testing.assert_frame_equal(table, expected_table)
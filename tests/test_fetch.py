@@ -0,0 +1,209 @@
+import json
+import os
+import threading
+import time
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import pandas as pd
+import pytest
+
+from tweetlytics import fetch
+from tweetlytics.tweetlytics import get_store
+
+
+def test_paginate_search(fake_session):
+    """
+    Test the paginate_search() generator.
+    - Check that every page is followed through the next_token
+    - Check that the tweet budget stops the pagination early
+    """
+    session = fake_session()
+    pages = list(
+        fetch.paginate_search(
+            "search", {"query": "vancouver", "max_results": "25"}, {}, session=session
+        )
+    )
+    assert len(pages) == 4
+    assert sum(len(page["data"]) for page in pages) == 100
+    assert "next_token" not in session.requests[0]
+    assert session.requests[-1]["next_token"] == "3"
+
+    session = fake_session()
+    pages = fetch.paginate_search(
+        "search", {"query": "vancouver", "max_results": "25"}, {}, 60, session
+    )
+    assert sum(len(page["data"]) for page in pages) == 60
+    assert len(session.requests) == 3
+    assert session.requests[-1]["max_results"] == "10"
+
+
+def test_get_store_pages(tmp_path, fake_session):
+    """
+    Test that get_store() follows pages up to max_tweets and writes
+    the .json and .csv files.
+    """
+    tweets_df = get_store(
+        "token",
+        keyword="vancouver",
+        start_date="2022-01-20",
+        end_date="2022-01-29",
+        store_path=str(tmp_path),
+        store_csv=True,
+        api_access_lvl="academic",
+        max_results=25,
+        max_tweets=80,
+    )
+
+    assert tweets_df["id"].nunique() == 80
+    with open(os.path.join(tmp_path, "tweets_response.json")) as file:
+        response = json.load(file)
+    assert len(response["data"]) == 80
+    assert response["meta"]["result_count"] == 80
+    assert len(response["includes"]["users"]) > 0
+
+    tweets_csv = pd.read_csv(os.path.join(tmp_path, "tweets_response.csv"))
+    assert len(tweets_csv) == len(tweets_df)
+    assert list(tweets_csv.columns) == list(tweets_df.columns)
+
+
+class StubSearchHandler(BaseHTTPRequestHandler):
+    """Serves 25 tweets per time window and fails the first two requests
+    with 429 and 503."""
+
+    def do_GET(self):
+        server = self.server
+        params = {k: v[0] for k, v in parse_qs(urlparse(self.path).query).items()}
+        with server.lock:
+            server.requests.append(params)
+            errors = server.errors
+            server.errors = errors[1:]
+        if errors:
+            self.send_response(errors[0])
+            self.send_header("x-rate-limit-remaining", "0")
+            self.send_header("x-rate-limit-reset", f"{time.time() + 0.2}")
+            self.end_headers()
+            return
+
+        window = int(datetime.strptime(params["start_time"][:10], "%Y-%m-%d").day)
+        offset = int(params.get("next_token", 0))
+        page_size = int(params["max_results"])
+        ids = list(range(window * 100 + offset, window * 100 + min(offset + page_size, 25)))
+        meta = {"result_count": len(ids)}
+        if offset + page_size < 25:
+            meta["next_token"] = str(offset + page_size)
+        body = json.dumps({"data": [{"id": str(i), "text": "t"} for i in ids], "meta": meta})
+
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("x-rate-limit-remaining", "100")
+        self.send_header("x-rate-limit-reset", f"{time.time() + 900}")
+        self.end_headers()
+        self.wfile.write(body.encode())
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def stub_server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubSearchHandler)
+    server.lock = threading.Lock()
+    server.requests = []
+    server.errors = [429, 503]
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def test_split_date_windows():
+    """Test that the windows cover the date range without overlap."""
+    windows = fetch.split_date_windows(datetime(2022, 1, 1), datetime(2022, 1, 5), 4)
+    assert windows[0] == ("2022-01-04T00:00:00.000Z", "2022-01-05T00:00:00.000Z")
+    assert windows[-1] == ("2022-01-01T00:00:00.000Z", "2022-01-02T00:00:00.000Z")
+    assert all(windows[i][0] == windows[i + 1][1] for i in range(len(windows) - 1))
+
+
+def test_fetch_windows(stub_server):
+    """
+    Test the concurrent fetch engine against a local stub server.
+    - Check that every page of every window is retrieved
+    - Check that 429 and 5xx responses are retried
+    - Check that the tweet budget stops the workers
+    """
+    search_url = f"http://127.0.0.1:{stub_server.server_port}/2/tweets/search/all"
+    windows = fetch.split_date_windows(datetime(2022, 1, 1), datetime(2022, 1, 9), 8)
+    pages = fetch.fetch_windows(
+        search_url,
+        {"query": "vancouver", "max_results": "10"},
+        {},
+        windows,
+        workers=4,
+        backoff_factor=0.01,
+    )
+    ids = [tweet["id"] for page in pages for tweet in page["data"]]
+
+    assert len(ids) == len(set(ids)) == 8 * 25
+    assert len(stub_server.requests) == 8 * 3 + 2
+
+    pages = fetch.fetch_windows(
+        search_url,
+        {"query": "vancouver", "max_results": "10"},
+        {},
+        windows,
+        workers=2,
+        max_tweets=35,
+    )
+    assert sum(len(page["data"]) for page in pages) == 35
+
+
+def test_fetch_windows_budget(stub_server):
+    """Test that the windows still queued once the tweet budget is reached
+    send no request."""
+    stub_server.errors = []
+    search_url = f"http://127.0.0.1:{stub_server.server_port}/2/tweets/search/all"
+    windows = fetch.split_date_windows(datetime(2022, 1, 1), datetime(2022, 1, 29), 28)
+    pages = fetch.fetch_windows(
+        search_url,
+        {"query": "vancouver", "max_results": "10"},
+        {},
+        windows,
+        workers=2,
+        max_tweets=10,
+    )
+    assert sum(len(page["data"]) for page in pages) == 10
+    # at most the pages the busy workers fetched while the queue had space
+    assert len(stub_server.requests) <= 2 * 3
+
+
+def test_rate_limiter():
+    """
+    Test that the rate limiter blocks once the budget is used up.
+    - Check that it sleeps until the reset of the rate limit window
+    - Check that a new window gives the requests through again
+    """
+    now = [1000.0]
+    sleeps = []
+
+    def sleep(seconds):
+        sleeps.append(seconds)
+        now[0] += seconds
+
+    rate_limiter = fetch.RateLimiter(clock=lambda: now[0], sleep=sleep)
+    rate_limiter.update({"x-rate-limit-remaining": "1", "x-rate-limit-reset": "1000.2"})
+    rate_limiter.acquire()
+    assert sleeps == []
+    rate_limiter.acquire()
+    assert sleeps == [pytest.approx(0.2)]
+    rate_limiter.acquire()
+    assert len(sleeps) == 1
+
+    # the real clock waits at least until the reset
+    rate_limiter = fetch.RateLimiter()
+    rate_limiter.exhaust(time.time() + 0.2)
+    start = time.time()
+    rate_limiter.acquire()
+    assert time.time() - start >= 0.15
@@ -0,0 +1,37 @@
+import subprocess
+import sys
+
+# seconds importing the pipeline may take on top of pandas
+_IMPORT_BUDGET = 0.5
+
+# libraries only imported by the stages using them
+_LAZY_MODULES = [
+    "altair",
+    "altair_saver",
+    "matplotlib",
+    "wordcloud",
+    "textblob",
+    "requests",
+    "dotenv",
+]
+
+
+def test_import_time():
+    """
+    Test the import of the pipeline in a new interpreter.
+    - Check that the plotting, NLP and HTTP libraries are not imported
+    - Check that the import beyond pandas stays within the time budget
+    """
+    code = f"""
+import sys, time
+import pandas
+start = time.perf_counter()
+from tweetlytics.tweetlytics import clean_tweets, analytics
+print(time.perf_counter() - start)
+print([module for module in {_LAZY_MODULES!r} if module in sys.modules])
+"""
+    output = subprocess.run(
+        [sys.executable, "-c", code], capture_output=True, text=True, check=True
+    ).stdout.splitlines()
+    assert output[1] == "[]"
+    assert float(output[0]) < _IMPORT_BUDGET
@@ -0,0 +1,107 @@
+import json
+
+import pandas as pd
+import pytest
+
+from tweetlytics import instrument
+from tweetlytics.instrument import Instrumentation, measure
+from tweetlytics.ndjson import read_ndjson
+from tweetlytics.tweetlytics import analytics, clean_tweets, get_store
+
+
+def test_instrumented_stages(tmp_path):
+    """
+    Test the records of the steps of clean_tweets and analytics.
+    - Check that each regex pass, the sentiment and the groupbys are timed
+    - Check that the callback receives every record as it ends
+    - Check that the results are those of the uninstrumented stages
+    - Check the summary and the exported records
+    """
+    received = []
+    instrumentation = Instrumentation(callback=received.append, track_memory=True)
+    clean_df = clean_tweets(
+        "tests/output/tweets_response.csv", store_csv=False, instrumentation=instrumentation
+    )
+    results = analytics(
+        clean_df, sentiment_backend="lexicon", chunksize=50, instrumentation=instrumentation
+    )
+    assert clean_df.equals(clean_tweets("tests/output/tweets_response.csv", store_csv=False))
+    expected = analytics(clean_df, sentiment_backend="lexicon", chunksize=50)
+    for table, expected_table in zip(results[1:], expected[1:]):
+        pd.testing.assert_frame_equal(table, expected_table)
+
+    assert received == instrumentation.records
+    stages = [record["stage"] for record in instrumentation.records]
+    for stage in [
+        "clean_tweets.strip_retweet",
+        "clean_tweets.remove_mentions",
+        "clean_tweets.remove_punctuation",
+        "clean_tweets.tokenize",
+        "clean_tweets.clean",
+        "analytics.sentiment",
+        "analytics.groupby",
+        "analytics.totals",
+    ]:
+        assert stage in stages
+    # the whole stage ends last
+    assert stages[-1] == "analytics"
+    assert stages.count("analytics.sentiment") == -(-len(clean_df) // 50)
+
+    sentiment = [record for record in received if record["stage"] == "analytics.sentiment"]
+    assert sum(record["rows"] for record in sentiment) == len(clean_df)
+    stage = received[-1]
+    assert stage["peak_memory_mb"] >= max(record["peak_memory_mb"] for record in sentiment)
+    assert stage["seconds"] >= sum(record["seconds"] for record in sentiment)
+
+    summary = instrumentation.summary().set_index("stage")
+    assert summary.loc["analytics.sentiment", "calls"] == len(sentiment)
+    assert summary.loc["analytics.sentiment", "rows_per_sec"] > 0
+    assert pd.isna(summary.loc["analytics", "rows"])
+
+    file_path = str(tmp_path / "metrics.ndjson")
+    instrumentation.export(file_path)
+    exported = read_ndjson(file_path)
+    assert exported["stage"].tolist() == stages
+    instrumentation.clear()
+    assert instrumentation.records == []
+
+
+def test_instrumented_requests(tmp_path, fake_session):
+    """Test that get_store times each request and the normalization and
+    storage of each page."""
+    instrumentation = Instrumentation()
+    tweets_df = get_store(
+        "token",
+        keyword="vancouver",
+        start_date="2022-01-20",
+        end_date="2022-01-29",
+        store_path=str(tmp_path),
+        store_csv=True,
+        api_access_lvl="academic",
+        max_results=25,
+        max_tweets=80,
+        instrumentation=instrumentation,
+    )
+    summary = instrumentation.summary().set_index("stage")
+    assert summary.loc["get_store.request", "calls"] == 4
+    assert summary.loc["get_store.normalize", "rows"] == 80
+    assert summary.loc["get_store.store", "rows"] == len(tweets_df)
+    assert summary.loc["get_store", "calls"] == 1
+    json.dumps(instrumentation.records)
+
+
+def test_disabled_instrumentation():
+    """
+    Test the instrumentation is off outside the instrumented stages.
+    - Check that steps share a no-op timer without an instrumentation
+    - Check that the instrumentation is deactivated after an error
+    - Check that an invalid instrumentation is refused
+    """
+    assert measure("analytics.sentiment") is measure("analytics.groupby")
+    instrumentation = Instrumentation()
+    with pytest.raises(Exception):
+        clean_tweets(123, instrumentation=instrumentation)
+    assert instrument.active() is None
+    assert [record["stage"] for record in instrumentation.records] == ["clean_tweets"]
+    with pytest.raises(TypeError):
+        analytics("output/clean_tweets.csv", instrumentation=print)
@@ -0,0 +1,137 @@
+import json
+
+import pandas as pd
+import requests
+
+from tweetlytics.mock_server import MockTwitterServer
+from tweetlytics.tweetlytics import get_store
+
+
+def test_replay_response(tmp_path):
+    """
+    Test get_store against a server replaying the recorded response.
+    - Check that every recorded tweet is retrieved page by page
+    - Check that requests without a bearer token or to other paths fail
+    """
+    with open("tests/output/tweets_response.json") as file:
+        recorded = json.load(file)
+    with MockTwitterServer("tests/output/tweets_response.json") as server:
+        tweets_df = get_store(
+            "token",
+            keyword="vancouver",
+            start_date="2022-01-20",
+            end_date="2022-01-29",
+            store_path=str(tmp_path),
+            api_access_lvl="academic",
+            max_results=10,
+            max_tweets=1000,
+            base_url=server.base_url + "/",
+        )
+        assert len(server.requests) == -(-len(recorded["data"]) // 10)
+        assert requests.get(server.base_url + "/2/tweets/search/all").status_code == 401
+        headers = {"Authorization": "Bearer token"}
+        assert requests.get(server.base_url + "/2/users", headers=headers).status_code == 404
+
+    assert tweets_df["id"].unique().tolist() == [tweet["id"] for tweet in recorded["data"]]
+    assert tweets_df["author_username"].notna().all()
+
+
+def test_synthesized_windows(tmp_path):
+    """
+    Test concurrent get_store workers against synthesized searches.
+    - Check that each time window gets its own tweets
+    - Check that the rate limit and the injected errors are retried
+    """
+    server = MockTwitterServer(
+        window_tweets=30, rate_limit=6, rate_limit_window=0.2, errors=[429, 429]
+    )
+    with server:
+        tweets_df = get_store(
+            "token",
+            keyword="vancouver",
+            start_date="2022-01-20",
+            end_date="2022-01-24",
+            store_path=str(tmp_path),
+            api_access_lvl="academic",
+            max_results=10,
+            max_tweets=1000,
+            workers=4,
+            base_url=server.base_url,
+        )
+    assert tweets_df["id"].nunique() == 4 * 30
+    assert tweets_df["created_at"].str[:10].nunique() == 4
+    assert server.status_counts[200] == 4 * 3
+    assert server.status_counts[429] >= 2
+
+
+def test_error_rate():
+    """Test that random errors are injected with the same seed alike."""
+    statuses = []
+    for _ in range(2):
+        with MockTwitterServer(window_tweets=10, error_rate=0.5, seed=3) as server:
+            for _ in range(20):
+                server.respond(
+                    "/2/tweets/search/recent", {"query": "a"}, {"Authorization": "Bearer t"}
+                )
+            statuses.append(dict(server.status_counts))
+    assert statuses[0] == statuses[1]
+    assert statuses[0][503] + statuses[0][200] == 20
+    assert 0 < statuses[0][503] < 20
+
+
+def test_keyword_list(tmp_path):
+    """Test that get_store searches each keyword of a list and tags its
+    rows, storing the tweets found by several keywords once."""
+    with MockTwitterServer(window_tweets=20) as server:
+        tweets_df = get_store(
+            "token",
+            keyword=["vancouver", "toronto"],
+            start_date="2022-01-20",
+            end_date="2022-01-21",
+            store_path=str(tmp_path),
+            store_csv=True,
+            api_access_lvl="academic",
+            max_results=10,
+            max_tweets=1000,
+            base_url=server.base_url,
+        )
+    queries = [params["query"] for params in server.requests]
+    assert queries == ["vancouver"] * 2 + ["toronto"] * 2
+    counts = tweets_df.groupby("keyword")["id"].nunique()
+    assert counts.to_dict() == {"toronto": 20, "vancouver": 20}
+    with open(tmp_path / "tweets_response.json") as file:
+        response = json.load(file)
+    assert len(response["data"]) == tweets_df["id"].nunique()
+
+
+def test_resumed_search(tmp_path):
+    """Test resumed get_store runs against synthesized searches, which only
+    return the tweets newer than since_id and older than until_id."""
+    with MockTwitterServer(window_tweets=50) as server:
+
+        def run(max_tweets):
+            return get_store(
+                "token",
+                keyword="vancouver",
+                start_date="2022-01-20",
+                end_date="2022-01-21",
+                store_path=str(tmp_path),
+                store_csv=True,
+                api_access_lvl="academic",
+                max_results=10,
+                max_tweets=max_tweets,
+                resume=True,
+                base_url=server.base_url,
+            )
+
+        assert run(30)["id"].nunique() == 30
+        requests_count = len(server.requests)
+        assert run(1000)["id"].nunique() == 20
+        resumed = server.requests[requests_count:]
+        # the two pages older than the stored tweets, then no newer tweets
+        assert ["until_id" in params for params in resumed] == [True, True, False]
+        assert "since_id" in resumed[-1]
+        assert len(run(1000)) == 0
+
+    tweets_csv = pd.read_csv(tmp_path / "tweets_response.csv")
+    assert tweets_csv["id"].nunique() == 50
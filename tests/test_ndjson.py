@@ -0,0 +1,62 @@
+import json
+import os
+
+import pandas as pd
+
+from tweetlytics.ndjson import iter_ndjson, read_ndjson, write_ndjson
+from tweetlytics.tweetlytics import analytics, get_store
+
+
+def test_ndjson_outputs(tmp_path, fake_session):
+    """
+    Test the NDJSON outputs of get_store() and analytics().
+    - Check that the records match the json outputs, decoded once
+    - Check that the records are read back lazily or in chunks
+    """
+    path = os.path.join(tmp_path, "records.ndjson")
+    write_ndjson([{"a": 1}, {"a": 2}], path)
+    records = iter_ndjson(path)
+    assert next(records) == {"a": 1}
+    assert list(records) == [{"a": 2}]
+
+    tweets_df = get_store(
+        "token",
+        keyword="vancouver",
+        start_date="2022-01-20",
+        end_date="2022-01-29",
+        store_path=str(tmp_path),
+        api_access_lvl="academic",
+        max_results=25,
+        max_tweets=80,
+        json_format="ndjson",
+    )
+    tweets = list(iter_ndjson(os.path.join(tmp_path, "tweets_response.ndjson")))
+    assert [tweet["id"] for tweet in tweets] == tweets_df["id"].unique().tolist()
+    users = list(iter_ndjson(os.path.join(tmp_path, "tweets_users.ndjson")))
+    assert len(users) == len({user["id"] for user in users}) > 0
+
+    for json_format in ["json", "ndjson"]:
+        analytics(
+            "output/clean_tweets.csv",
+            sentiment_backend="lexicon",
+            store_path=str(tmp_path),
+            json_format=json_format,
+        )
+    for name, ndjson_name in [
+        ("all_tweets.json", "all_tweets.ndjson"),
+        ("top_tweets.json", "top_tweets.ndjson"),
+        ("sentiment_group_detail_json.json", "sentiment_group_detail.ndjson"),
+        ("tokens_sentiments.json", "tokens_sentiments.ndjson"),
+    ]:
+        with open(os.path.join(tmp_path, name)) as file:
+            expected = json.loads(json.load(file))
+        assert list(iter_ndjson(os.path.join(tmp_path, ndjson_name))) == expected
+    with open(os.path.join(tmp_path, "tweets_sums.json")) as file:
+        assert list(iter_ndjson(os.path.join(tmp_path, "tweets_sums.ndjson"))) == [
+            json.load(file)
+        ]
+
+    all_tweets = os.path.join(tmp_path, "all_tweets.ndjson")
+    chunks = list(read_ndjson(all_tweets, chunksize=30))
+    assert [len(chunk) for chunk in chunks] == [30, 30, 30, 10]
+    pd.testing.assert_frame_equal(pd.concat(chunks), read_ndjson(all_tweets))
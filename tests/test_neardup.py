@@ -0,0 +1,61 @@
+import numpy as np
+import pandas as pd
+
+from tweetlytics.corpus import TokenCorpus
+from tweetlytics.neardup import (
+    cluster_near_duplicates,
+    minhash_signatures,
+    near_duplicate_clusters,
+)
+from tweetlytics.storage import read_table
+from tweetlytics.tweetlytics import analytics
+
+
+def test_near_duplicate_clusters():
+    """
+    Test the MinHash/LSH clustering on tweets with planted near-duplicates.
+    - Check that signatures estimate the Jaccard similarity
+    - Check that edited copies of a tweet share its cluster
+    - Check that unrelated tweets and tweets without tokens are alone
+    """
+    rng = np.random.default_rng(0)
+    vocabulary = [f"word{i}" for i in range(5000)]
+    originals = [list(rng.choice(vocabulary, 20, replace=False)) for _ in range(50)]
+    tokens, expected = [], []
+    for cluster, original in enumerate(originals):
+        for _ in range(5):
+            # swap one token, two copies keep a Jaccard similarity of 18/22
+            copy = list(original)
+            copy[rng.integers(20)] = f"edit{rng.integers(10 ** 9)}"
+            tokens.append(copy)
+            expected.append(cluster)
+    unrelated = [list(rng.choice(vocabulary, 20, replace=False)) for _ in range(200)]
+    tokens += unrelated + [[], np.nan]
+    expected += list(range(50, 252))
+
+    signatures = minhash_signatures([originals[0], originals[0][:10]], num_perm=256)
+    assert abs((signatures[0] == signatures[1]).mean() - 0.5) < 0.1
+
+    clusters = near_duplicate_clusters(tokens, threshold=0.7)
+    assert clusters.tolist() == expected
+
+
+def test_collapse_clusters():
+    """Test that analytics with collapse_clusters analyses one tweet per
+    cluster, with or without a corpus."""
+    df = read_table("output/clean_tweets.csv", list_columns=["tokens", "hashtags"])
+    clustered = cluster_near_duplicates(df, threshold=0.9)
+    assert clustered["cluster_id"].nunique() < len(df)
+    sizes = clustered.groupby("cluster_id")["cluster_size"]
+    assert (sizes.size() == sizes.first()).all()
+
+    representatives = clustered.drop_duplicates("cluster_id")
+    expected = analytics(representatives.copy(), sentiment_backend="lexicon")
+    corpus = TokenCorpus.from_tokens(clustered["tokens"])
+    for options in [{}, {"corpus": corpus}]:
+        results = analytics(
+            clustered.copy(), sentiment_backend="lexicon", collapse_clusters=True, **options
+        )
+        assert len(results[0]) == clustered["cluster_id"].nunique()
+        for table, expected_table in zip(results[1:], expected[1:]):
+            pd.testing.assert_frame_equal(table, expected_table)
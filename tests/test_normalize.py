@@ -0,0 +1,61 @@
+import json
+
+import pandas as pd
+
+from tweetlytics.normalize import RESPONSE_COLUMNS, normalize_tweets
+
+
+def normalize_tweets_rowwise(data, keyword):
+    """The row by row normalization normalize_tweets() replaces."""
+    tweets_df = pd.DataFrame.from_dict(data)
+    tweets_df[["retweetcount", "reply_count", "like_count", "quote_count"]] = tweets_df[
+        "public_metrics"
+    ].apply(pd.Series)
+    tweets_df = tweets_df.explode("referenced_tweets").reset_index(drop=True)
+    tweets_df["referenced_tweets"] = tweets_df.apply(
+        lambda x: x["referenced_tweets"]
+        if isinstance(x["referenced_tweets"], dict)
+        else {"type": "original", "id": x["id"]},
+        axis=1,
+    )
+    tweets_df[["reference_type", "reference_id"]] = tweets_df[
+        "referenced_tweets"
+    ].apply(pd.Series)
+    tweets_df["keyword"] = keyword
+    return tweets_df
+
+
+def test_normalize_tweets():
+    """
+    Test normalize_tweets() on the recorded sample response.
+    - Check that it matches the row by row normalization
+    - Check that the author of each tweet is added
+    """
+    with open("tests/output/tweets_response.json") as file:
+        response = json.load(file)
+    data, users = response["data"], response["includes"]["users"]
+
+    # the row by row version relies on the key order of the live API
+    for tweet in data:
+        metrics = tweet["public_metrics"]
+        tweet["public_metrics"] = {
+            key: metrics[key]
+            for key in ["retweet_count", "reply_count", "like_count", "quote_count"]
+        }
+        if "referenced_tweets" in tweet:
+            tweet["referenced_tweets"] = [
+                {"type": reference["type"], "id": reference["id"]}
+                for reference in tweet["referenced_tweets"]
+            ]
+
+    tweets_df = normalize_tweets(data, "vancouver", users)
+    expected = normalize_tweets_rowwise(data, "vancouver")
+
+    assert list(tweets_df.columns) == RESPONSE_COLUMNS
+    pd.testing.assert_frame_equal(
+        tweets_df[expected.columns], expected, check_dtype=False
+    )
+
+    usernames = {user["id"]: user["username"] for user in users}
+    assert tweets_df["author_username"].equals(tweets_df["author_id"].map(usernames))
+    assert tweets_df["author_followers_count"].notna().all()
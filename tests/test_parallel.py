@@ -0,0 +1,64 @@
+import functools
+import os
+import shutil
+
+import pandas as pd
+from wordcloud import STOPWORDS
+
+from tweetlytics.parallel import PartitionPool
+from tweetlytics.sentiment import sentiment_polarity
+from tweetlytics.storage import read_table
+from tweetlytics.tweetlytics import analytics, clean_tweets, plot_tweets
+
+
+def test_partition_pool():
+    """Test that the results of the partitions are merged in row order."""
+    texts = pd.Series(["good day", "bad day", "a day"] * 5, index=range(30, 0, -2))
+    with PartitionPool(3) as pool:
+        polarity = pool.map(sentiment_polarity, texts)
+    assert polarity.equals(sentiment_polarity(texts))
+    assert polarity.index.equals(texts.index)
+
+    tasks = [functools.partial(pow, 2, exponent) for exponent in range(5)]
+    with PartitionPool(2) as pool:
+        assert pool.run(tasks) == [1, 2, 4, 8, 16]
+
+
+def test_parallel_pipeline(tmp_path):
+    """
+    Test that clean_tweets() and analytics() give the same results with
+    several workers as with one.
+    """
+    shutil.copy("tests/output/tweets_response.csv", tmp_path)
+    file_path = os.path.join(tmp_path, "tweets_response.csv")
+
+    clean_df = clean_tweets(file_path, store_csv=False)
+    assert clean_tweets(file_path, workers=2).equals(clean_df)
+
+    clean_file = os.path.join(tmp_path, "clean_tweets.csv")
+    expected = analytics(clean_file, store_json=False)
+    results = analytics(clean_file, store_json=False, workers=2)
+    assert results[0]["sentiment_polarity"].equals(expected[0]["sentiment_polarity"])
+    assert results[3].equals(expected[3])
+
+    lexicon = analytics(clean_file, store_json=False, sentiment_backend="lexicon", workers=2)
+    assert lexicon[3]["sentiment_type"].equals(expected[3]["sentiment_type"])
+
+
+def test_parallel_plots():
+    """
+    Test the word clouds laid out in worker processes.
+    - Check that the words are weighted by their counts
+    - Check that stopwords and single characters are left out
+    """
+    tokens_df = read_table("output/analysis_tokens_sentiments.csv")
+    all_tweets_df = read_table("output/analysis_all_tweets.csv")
+    plots = plot_tweets(
+        all_tweets_df, analysis_tokens_sentiments_file=tokens_df, workers=2
+    )
+    positive = tokens_df.query('sentiment_type == "positive"').set_index("tokens")
+    words = plots[0].words_
+    assert max(words, key=words.get) == positive["count"].idxmax()
+    assert not set(words) & set(STOPWORDS)
+    assert all(len(word) >= 2 for word in words)
+    assert plots[2].mark == "bar"
@@ -0,0 +1,45 @@
+import os
+
+import pandas as pd
+import pyarrow as pa
+
+from tweetlytics.storage import read_table
+from tweetlytics.tweetlytics import analytics, clean_tweets, plot_tweets
+
+
+def test_in_memory_pipeline(tmp_path):
+    """
+    Test passing tables from one stage to the next.
+    - Check that the results equal those of the stored files
+    - Check that nothing is stored without a store_path
+    - Check that a store_path stores the results of a table
+    """
+    tweets_df = read_table("tests/output/tweets_response.csv")
+    folder = str(tmp_path)
+
+    clean_df = clean_tweets(tweets_df)
+    results = analytics(clean_df, sentiment_backend="lexicon")
+    plots = plot_tweets(results[0], analysis_tokens_sentiments_file=results[4])
+    assert os.listdir(folder) == []
+    assert plots[3].mark == "bar"
+
+    expected_clean = clean_tweets(pa.Table.from_pandas(tweets_df), store_path=folder)
+    assert clean_df.equals(expected_clean)
+    expected = analytics(
+        os.path.join(folder, "clean_tweets.csv"),
+        store_json=False,
+        store_csvs=True,
+        sentiment_backend="lexicon",
+    )
+    for result, expected_result in zip(results[1:], expected[1:]):
+        pd.testing.assert_frame_equal(result, expected_result)
+    assert sorted(os.listdir(folder)) == [
+        "analysis_all_tweets.csv",
+        "analysis_sentiment_group.csv",
+        "analysis_sums.csv",
+        "analysis_tokens_sentiments.csv",
+        "analysis_top_tweets.csv",
+        "clean_tweets.csv",
+    ]
+    # the dataframe handed to analytics is not changed
+    assert "sentiment_polarity" not in clean_df
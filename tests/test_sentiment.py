@@ -0,0 +1,67 @@
+import os
+
+import pandas as pd
+
+from tweetlytics.sentiment import (
+    SentimentCache,
+    lexicon_polarity,
+    sentiment_agreement,
+    sentiment_polarity,
+    sentiment_type,
+)
+
+
+def test_sentiment_cache(tmp_path):
+    """
+    Test the sentiment cache.
+    - Check that cached polarities equal TextBlob's
+    - Check that repeated texts are scored once
+    - Check that the on-disk cache persists and is bounded
+    """
+    texts = pd.Series(["good  day", "bad day", "good day", "a day", "bad day"])
+    scored = []
+
+    def scorer(missing):
+        scored.extend(missing)
+        return sentiment_polarity(missing)
+
+    path = os.path.join(tmp_path, "sentiment.sqlite")
+    with SentimentCache(max_size=2, path=path, max_disk_size=3) as cache:
+        assert cache.score(texts, scorer).equals(sentiment_polarity(texts))
+        # whitespace is collapsed in the cache key
+        assert scored == ["good  day", "bad day", "a day"]
+        cache.score(pd.Series(["a day"]), scorer)
+        assert cache.hits == 1
+
+    with SentimentCache(path=path, max_disk_size=3) as cache:
+        polarity = cache.score(pd.Series(["good day", "nice day"]), scorer)
+        assert polarity.to_list() == [0.7, 0.6]
+        assert scored[3:] == ["nice day"]
+        # the least recently used text was evicted
+        cache.score(pd.Series(["bad day", "good day", "a day"]), scorer)
+        assert scored[4:] == ["bad day"]
+
+
+def test_lexicon_polarity():
+    """
+    Test the lexicon backend against TextBlob.
+    - Check modifiers, negations and texts without lexicon words
+    - Check the agreement report on the sample tweets
+    """
+    texts = pd.Series(
+        ["not very good", "very good", "not good", "no words here", "", "terribly bad day"],
+        index=list("abcdef"),
+    )
+    assert lexicon_polarity(texts).round(9).equals(sentiment_polarity(texts).round(9))
+    assert sentiment_type(lexicon_polarity(texts)).to_list() == [
+        "negative",
+        "positive",
+        "negative",
+        "neutral",
+        "neutral",
+        "negative",
+    ]
+
+    report = sentiment_agreement(pd.read_csv("output/clean_tweets.csv")["text"])
+    assert report["texts"] == 100
+    assert report["same_sentiment_type"] == 1.0
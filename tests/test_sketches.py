@@ -0,0 +1,56 @@
+import numpy as np
+import pandas as pd
+
+from tweetlytics.sketches import SpaceSaving
+from tweetlytics.storage import read_table
+from tweetlytics.tweetlytics import analytics, plot_tweets
+
+
+def test_space_saving():
+    """
+    Test the error bounds of the SpaceSaving sketch on a skewed stream.
+    - Check that counts are overestimated by at most the bound
+    - Check that every item above the bound is in the sketch
+    - Check that merged sketches keep the guarantees
+    """
+    rng = np.random.default_rng(0)
+    items = pd.Series(rng.zipf(1.5, 20000) % 1000).astype(str)
+    exact = items.value_counts()
+
+    sketch = SpaceSaving.from_error(0.01)
+    for start in range(0, len(items), 1000):
+        sketch.update(items[start : start + 1000])
+    other = SpaceSaving(100).update(items[:5000])
+    merged = SpaceSaving(100).update(items[5000:]).merge(other)
+
+    for counted in [sketch, merged]:
+        assert counted.total == len(items)
+        assert len(counted.counts) == 100
+        true_counts = exact[counted.counts.index]
+        assert (counted.counts >= true_counts).all()
+        assert (counted.counts - true_counts <= counted.error_bound()).all()
+        assert (counted.counts - counted.errors <= true_counts).all()
+        assert set(exact[exact > counted.error_bound()].index) <= set(counted.counts.index)
+    assert sketch.top(5)["item"].to_list() == exact.index[:5].to_list()
+    assert SpaceSaving.from_dict(sketch.to_dict()).top().equals(sketch.top())
+
+
+def test_approximate_analytics():
+    """Test that the approximate mode reports the most frequent tokens and
+    hashtags with their exact counts on the sample tweets."""
+    df = read_table("output/clean_tweets.csv", list_columns=["tokens", "hashtags"])
+    expected = analytics(df, sentiment_backend="lexicon")
+    results = analytics(
+        df, sentiment_backend="lexicon", approximate=True, sketch_error=0.01
+    )
+    assert results[4].head(10)["count"].equals(expected[4].head(10)["count"])
+    assert len(results[4]) <= 300
+
+    plots = plot_tweets(
+        results[0],
+        analysis_tokens_sentiments_file=results[4],
+        approximate=True,
+        sketch_error=0.01,
+    )
+    exact_plots = plot_tweets(results[0], analysis_tokens_sentiments_file=results[4])
+    assert plots[3].data["count"].to_list() == exact_plots[3].data["count"].to_list()
@@ -0,0 +1,119 @@
+import os
+
+import pandas as pd
+
+from tweetlytics.corpus import TokenCorpus
+from tweetlytics.state import AnalyticsState
+from tweetlytics.storage import read_table
+from tweetlytics.tweetlytics import analytics
+
+
+def test_analytics_state(tmp_path):
+    """
+    Test the incremental analytics state.
+    - Check that updates in batches and merges equal a single update
+    - Check that the top tweets are the best row of each reference
+    - Check that a saved state is loaded back unchanged
+    - Check that analytics() folds new tweets into a state
+    """
+    df = read_table("output/clean_tweets.csv", list_columns=["tokens", "hashtags"])
+    first, second = df.iloc[:60].copy(), df.iloc[60:].copy()
+
+    expected = analytics(df, sentiment_backend="lexicon")
+    scored = expected[0]
+    whole = AnalyticsState().update(scored)
+    batches = AnalyticsState().update(scored.iloc[:30]).update(scored.iloc[30:])
+    merged = AnalyticsState(top_k=10).update(scored.iloc[50:])
+    merged = AnalyticsState().update(scored.iloc[:50]).merge(merged)
+    for state in [batches, merged]:
+        assert state.total_tweets == 100
+        for table, expected_table in zip(state.to_frames(), whole.to_frames()):
+            pd.testing.assert_frame_equal(table, expected_table)
+
+    best = (
+        scored.sort_values("sum_like_retweet", ascending=False, kind="stable")
+        .drop_duplicates("reference_id")
+        .head(10)
+    )
+    assert whole.to_frames()[1]["text"].to_list() == best["text"].to_list()
+
+    path = os.path.join(tmp_path, "state.json")
+    whole.save(path)
+    loaded = AnalyticsState.load(path)
+    assert loaded.totals() == whole.totals()
+    for table, expected_table in zip(loaded.to_frames(), whole.to_frames()):
+        pd.testing.assert_frame_equal(table, expected_table)
+
+    state = AnalyticsState.load(os.path.join(tmp_path, "missing.json"))
+    analytics(first, sentiment_backend="lexicon", state=state)
+    results = analytics(second, sentiment_backend="lexicon", state=state)
+    assert len(results[0]) == len(second)
+    for table, expected_table in zip(results[1:], expected[1:]):
+        pd.testing.assert_frame_equal(table, expected_table)
+
+
+def _keyword_rows(table, keyword):
+    """Returns the rows of a keyword of a table of analytics with
+    by_keyword, without the keyword column."""
+    rows = table[table["keyword"] == keyword].drop(columns="keyword")
+    return rows.reset_index(drop=True)
+
+
+def test_keyword_analytics(tmp_path):
+    """
+    Test analysing the tweets of several keywords in one pass.
+    - Check that the aggregates of each keyword equal those of its tweets
+    - Check that the totals over every keyword list the keywords
+    - Check the sketches, the corpus and dedup with several keywords
+    - Check that a state stored for a single keyword is loaded
+    """
+    df = read_table("output/clean_tweets.csv", list_columns=["tokens", "hashtags"])
+    vancouver = df.iloc[:70].assign(keyword="vancouver")
+    toronto = df.iloc[40:].assign(keyword="toronto")
+    tweets = pd.concat([vancouver, toronto], ignore_index=True)
+    subsets = {"vancouver": vancouver, "toronto": toronto}
+
+    results = analytics(tweets.copy(), sentiment_backend="lexicon", by_keyword=True)
+    totals = []
+    for keyword, subset in subsets.items():
+        expected = analytics(subset.copy(), sentiment_backend="lexicon")
+        totals.append(AnalyticsState().update(expected[0]).totals())
+        assert results[1].loc[keyword].equals(expected[1].loc[keyword])
+        pd.testing.assert_frame_equal(_keyword_rows(results[2], keyword), expected[2])
+        pd.testing.assert_frame_equal(_keyword_rows(results[3], keyword), expected[3])
+        tokens = _keyword_rows(results[4], keyword).sort_values(["tokens", "sentiment_type"])
+        expected_tokens = expected[4].sort_values(["tokens", "sentiment_type"])
+        assert tokens.values.tolist() == expected_tokens.values.tolist()
+    state = AnalyticsState().update(results[0])
+    assert sorted(state.keyword_totals(), key=str) == sorted(totals, key=str)
+    combined = state.totals()
+    assert combined["keyword"] == ["toronto", "vancouver"]
+    assert combined["total_number_of_tweets"] == len(tweets)
+    assert combined["total_number_of_likes"] == tweets["like_count"].sum()
+
+    # over every keyword, the tokens are counted over all the tweets
+    tables = analytics(tweets.copy(), sentiment_backend="lexicon")
+    counts = tweets.explode("tokens").groupby("tokens").size()
+    assert (tables[4].groupby("tokens")["count"].sum() == counts).all()
+    assert tables[3]["tweet_count"].sum() == len(tweets)
+
+    corpus = TokenCorpus.from_tokens(tweets["tokens"])
+    for options in [{"dedup": True}, {"approximate": True}, {"corpus": corpus}]:
+        other = analytics(
+            tweets.copy(), sentiment_backend="lexicon", by_keyword=True, **options
+        )
+        for table, expected_table in zip(other[1:4], results[1:4]):
+            pd.testing.assert_frame_equal(table, expected_table)
+        assert sorted(other[4].values.tolist()) == sorted(results[4].values.tolist())
+
+    # a state stored before the keywords were kept apart
+    stored = AnalyticsState().update(results[0].iloc[:70])
+    old = stored.to_dict()
+    del old["tweet_counts"]
+    for name in ["sentiment_sums", "token_counts", "top_tweets"]:
+        old[name]["data"] = [row[1:] for row in old[name]["data"]]
+        old[name]["columns"] = old[name]["columns"][1:]
+    loaded = AnalyticsState.from_dict(old)
+    assert loaded.keyword_totals() == stored.keyword_totals()
+    for table, expected_table in zip(loaded.to_frames(), stored.to_frames()):
+        pd.testing.assert_frame_equal(table, expected_table)
@@ -0,0 +1,85 @@
+import os
+import shutil
+
+import pandas as pd
+
+from tweetlytics.storage import TableAppender, read_table, write_table
+from tweetlytics.tweetlytics import analytics, clean_tweets
+
+
+def test_read_write_table(tmp_path):
+    """Test that list columns survive a round trip in both formats."""
+    df = pd.DataFrame({"text": ["a b", "c"], "tokens": [["a", "b"], ["c"]]})
+    for name in ["tokens.csv", "tokens.parquet"]:
+        file_path = os.path.join(tmp_path, name)
+        write_table(df, file_path)
+        assert read_table(file_path, list_columns=["tokens"]).equals(df)
+
+    file_path = os.path.join(tmp_path, "parts.parquet")
+    with TableAppender(file_path) as appender:
+        appender.append(pd.DataFrame({"id": ["1"], "reply_to": [None]}))
+        appender.append(pd.DataFrame({"id": ["2"], "reply_to": ["1"]}))
+    assert read_table(file_path)["reply_to"].to_list() == [None, "1"]
+
+
+def test_parquet_pipeline(tmp_path):
+    """
+    Test that clean_tweets() and analytics() read and write parquet
+    tables and give the same results as with csv tables.
+    """
+    folder = str(tmp_path)
+    csv_file = os.path.join(folder, "tweets_response.csv")
+    shutil.copy("tests/output/tweets_response.csv", csv_file)
+    parquet_file = os.path.join(folder, "tweets_response.parquet")
+    write_table(pd.read_csv(csv_file), parquet_file)
+
+    clean_df = clean_tweets(parquet_file)
+    clean_file = os.path.join(folder, "clean_tweets.parquet")
+    assert os.path.exists(clean_file)
+    assert read_table(clean_file, list_columns=["tokens"])["tokens"].map(type).eq(list).all()
+
+    results = analytics(clean_file, store_json=False, store_csvs=True)
+    expected = analytics("output/clean_tweets.csv", store_json=False)
+    assert results[1].equals(expected[1])
+    assert results[3]["tweet_count"].equals(expected[3]["tweet_count"])
+    assert os.path.exists(os.path.join(folder, "analysis_tokens_sentiments.parquet"))
+
+
+def test_chunked_pipeline(tmp_path):
+    """
+    Test that clean_tweets() and analytics() give the same results when
+    reading their input in chunks as when reading it at once.
+    """
+    folders = [os.path.join(tmp_path, name) for name in ["full", "chunked"]]
+    for folder in folders:
+        os.mkdir(folder)
+        shutil.copy("tests/output/tweets_response.csv", folder)
+    full_file, chunked_file = [
+        os.path.join(folder, "tweets_response.csv") for folder in folders
+    ]
+
+    clean_df = clean_tweets(full_file)
+    clean_file = clean_tweets(chunked_file, chunksize=40)
+    assert clean_file == os.path.join(folders[1], "clean_tweets.csv")
+    assert pd.read_csv(clean_file).equals(
+        pd.read_csv(os.path.join(folders[0], "clean_tweets.csv"))
+    )
+    assert len(clean_df) == len(pd.read_csv(clean_file))
+
+    expected = analytics(os.path.join(folders[0], "clean_tweets.csv"), store_csvs=True)
+    results = analytics(clean_file, store_csvs=True, chunksize=25)
+    assert results[0] == os.path.join(folders[1], "analysis_all_tweets.csv")
+    pd.testing.assert_frame_equal(results[1], expected[1])
+    assert (results[2]["like_count"] + results[2]["retweetcount"]).to_list() == (
+        expected[2]["like_count"] + expected[2]["retweetcount"]
+    ).to_list()
+    pd.testing.assert_frame_equal(results[3], expected[3])
+    pd.testing.assert_frame_equal(
+        results[4].sort_values(["tokens", "sentiment_type"], ignore_index=True),
+        expected[4].sort_values(["tokens", "sentiment_type"], ignore_index=True),
+    )
+    for name in ["all_tweets.json", "tweets_sums.json", "analysis_all_tweets.csv"]:
+        with open(os.path.join(folders[0], name)) as full, open(
+            os.path.join(folders[1], name)
+        ) as chunked:
+            assert full.read() == chunked.read()
@@ -0,0 +1,75 @@
+import json
+
+from tweetlytics.normalize import normalize_tweets
+from tweetlytics.synthetic import TweetGenerator, generate_response
+from tweetlytics.tweetlytics import analytics, clean_tweets
+
+
+def test_generate_response():
+    """
+    Test that the synthetic responses look like the real ones.
+    - Check that the tweets and users have the keys of the sample response
+    - Check that the same seed gives the same tweets, another seed others
+    - Check the shares of retweets, replies and quotes
+    - Check that retweets repeat the text of the tweets they reference
+    """
+    with open("tests/output/tweets_response.json") as file:
+        sample = json.load(file)
+    response = generate_response(2000)
+    assert set(response) == set(sample)
+    for key in ["data", "includes"]:
+        records = response[key] if key == "data" else response[key]["users"]
+        sample_records = sample[key] if key == "data" else sample[key]["users"]
+        keys = set().union(*map(set, records))
+        # optional keys, such as entities, are not generated
+        assert set.intersection(*map(set, sample_records)) <= keys
+    assert response["meta"]["result_count"] == 2000
+    assert "next_token" not in response["meta"]
+
+    assert generate_response(2000) == response
+    assert generate_response(2000, seed=1)["data"] != response["data"]
+
+    types = [
+        tweet.get("referenced_tweets", [{"type": "original"}])[0]["type"]
+        for tweet in response["data"]
+    ]
+    assert abs(types.count("retweeted") / 2000 - 0.65) < 0.05
+    assert abs(types.count("replied_to") / 2000 - 0.13) < 0.03
+    assert abs(types.count("original") / 2000 - 0.2) < 0.03
+
+    retweets = [
+        tweet for tweet, kind in zip(response["data"], types) if kind == "retweeted"
+    ]
+    texts = {}
+    for tweet in retweets:
+        reference = tweet["referenced_tweets"][0]["id"]
+        assert tweet["text"].startswith("RT @")
+        assert texts.setdefault(reference, tweet["text"]) == tweet["text"]
+    # popular tweets are retweeted many times
+    assert len(texts) < len(retweets) / 2
+
+
+def test_generated_pages():
+    """
+    Test generating a corpus page by page.
+    - Check that the pages hold the same tweets as a single response
+    - Check that every author of a page is in its users
+    - Check that the generated tweets run through the pipeline
+    """
+    generator = TweetGenerator(seed=3, users_size=500)
+    pages = list(generator.pages(1050, page_size=100))
+    assert [page["meta"]["result_count"] for page in pages] == [100] * 10 + [50]
+    assert all("next_token" in page["meta"] for page in pages[:-1])
+    assert [tweet for page in pages for tweet in page["data"]] == generator.response(1050)["data"]
+    for page in pages:
+        user_ids = {user["id"] for user in page["includes"]["users"]}
+        assert {tweet["author_id"] for tweet in page["data"]} <= user_ids
+
+    tweets_df = normalize_tweets(
+        pages[0]["data"], "vancouver", pages[0]["includes"]["users"]
+    )
+    assert tweets_df["author_username"].notna().all()
+    results = analytics(clean_tweets(tweets_df), sentiment_backend="lexicon")
+    assert len(results[0]) == 100
+    sentiments = set(results[0]["sentiment_type"])
+    assert {"positive", "negative"} <= sentiments
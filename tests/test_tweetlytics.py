@@ -68,6 +68,10 @@ def test_get_store():
                 "reference_type",
                 "reference_id",
                 "keyword",
+                "author_username",
+                "author_name",
+                "author_verified",
+                "author_followers_count",
             ]
         )
 